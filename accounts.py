@@ -0,0 +1,662 @@
+"""Многопользовательский режим: опрос многих аккаунтов одним процессом."""
+import heapq
+import itertools
+from collections import Counter
+from functools import partial
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from alerts import ErrorAggregator
+from breaker import CircuitBreaker
+from budget import POLL_BUDGET, make_deadline, record_deferred
+from cache import ResponseCache
+from exceptions import CircuitOpenError, DeadlineExceeded
+from fanout import (
+    MAX_IN_FLIGHT,
+    POLL_WORKERS,
+    fan_out,
+    in_flight_limit,
+    make_executor,
+    outcome,
+)
+from homework import (
+    EXCEPTION_MESSAGE_NOT_SUBMITTED,
+    EXIT_CHANGES_SENT,
+    EXIT_ERROR,
+    EXIT_NO_CHANGES,
+    HOMEWORK_NOT_SUBMITTED,
+    RETRY_PERIOD,
+    STATUS_DEBUG,
+    TELEGRAM_TOKEN,
+    LazyBot,
+    configure_logging,
+    make_bot,
+    make_headers,
+    request_api_answer,
+    send_chat_message,
+)
+from locales import LOCALE, TEMPLATES, render_status
+from metrics import (
+    LOOP_LAG,
+    METRICS_PORT,
+    count_exception,
+    start_metrics_server,
+)
+from recording import open_recorder, redact
+from scheduling import AdaptivePolicy
+from session import POOL_MAXSIZE, get_session
+from sharding import SHARD_COUNT, SHARD_INDEX, shard_accounts, shard_port
+from state import MemoryStateBackend, account_key, open_state_backend
+from tracing import install_profiler, span
+from validation import validate_response
+
+ACCOUNTS_FILE = os.getenv('ACCOUNTS_FILE', 'accounts.json')
+OPERATOR_CHAT_ID = os.getenv('OPERATOR_CHAT_ID')
+ACCOUNTS_FILE_ERROR = 'Файл аккаунтов {path} не содержит список аккаунтов'
+ACCOUNT_KEY_ERROR = 'Аккаунт №{index} в файле {path}: нет ключа {key}'
+ACCOUNTS_LOADED = 'Загружено аккаунтов: {count}'
+TELEGRAM_TOKEN_ERROR = 'Токен TELEGRAM_TOKEN отсутствует'
+SHARD_IDLE = 'Шард {index} из {count} не владеет аккаунтами и простаивает'
+ACCOUNT_KEYS = ('practicum_token', 'chat_id')
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+FAILED = 'failed'
+DEFERRED = 'deferred'
+
+logger = logging.getLogger(__name__)
+
+
+class Account:
+    """Аккаунт студента и его состояние опроса.
+
+    Слоты фиксируют набор полей: память на аккаунт не растёт со временем
+    и складывается из объекта, хранимых строк и словаря статусов работ.
+    """
+
+    __slots__ = (
+        'practicum_token', 'chat_id', 'key', 'timestamp',
+        'statuses', 'failures', 'idle_polls',
+        'locale',
+    )
+
+    def __init__(self, practicum_token, chat_id, timestamp=None,
+                 locale=LOCALE):
+        """Создаём аккаунт с курсором на текущий момент."""
+        self.practicum_token = practicum_token
+        self.chat_id = chat_id
+        self.locale = locale
+        self.key = account_key(practicum_token)
+        self.timestamp = (
+            int(time.time()) if timestamp is None else timestamp
+        )
+        self.statuses = {}
+        self.failures = 0
+        self.idle_polls = 0
+
+    def __repr__(self):
+        """Не показываем токен в логах и отладке."""
+        return f'Account(chat_id={self.chat_id!r})'
+
+
+def operator_account(chat_id=OPERATOR_CHAT_ID, locale=LOCALE):
+    """Чат оператора для общих ошибок или None, если он не задан.
+
+    У оператора нет токена Практикума, его ключ — account_key(None).
+    """
+    if not chat_id:
+        return None
+    return Account(None, str(chat_id), locale=locale)
+
+
+def load_accounts(path=ACCOUNTS_FILE):
+    """Читаем пары (practicum_token, chat_id) из JSON-файла.
+
+    Необязательное поле locale задаёт язык сообщений в чат.
+    """
+    with open(path, encoding='utf-8') as file:
+        records = json.load(file)
+    if not isinstance(records, list):
+        raise ValueError(ACCOUNTS_FILE_ERROR.format(path=path))
+    accounts = []
+    for index, record in enumerate(records):
+        for key in ACCOUNT_KEYS:
+            if key not in record:
+                raise KeyError(
+                    ACCOUNT_KEY_ERROR.format(index=index, path=path, key=key)
+                )
+        accounts.append(Account(
+            record['practicum_token'], str(record['chat_id']),
+            locale=record.get('locale', LOCALE)
+        ))
+    logger.info(ACCOUNTS_LOADED.format(count=len(accounts)))
+    return accounts
+
+
+class DeliveryReceipt:
+    """Статусы одного опроса, отправленные через очередь доставки.
+
+    Статус отмечается в памяти сразу, чтобы следующий опрос не поставил
+    его в очередь ещё раз, а в хранилище и историю попадает только после
+    доставки. Курсор опроса сохраняется, когда доставлены все его
+    статусы: если процесс упадёт раньше, изменения придут снова. Если
+    очередь отбросила сообщение, статус и курсор аккаунта откатываются,
+    и следующий опрос отправит изменение повторно.
+    """
+
+    def __init__(self, poller, account):
+        """Запоминаем курсор аккаунта до опроса."""
+        self.poller = poller
+        self.account = account
+        self.previous = account.timestamp
+        self.cursor = None
+        self.waiting = 0
+        self.dropped = False
+        self.lock = threading.Lock()
+
+    def track(self, change):
+        """Отмечаем статус в памяти; возвращает callback для очереди."""
+        name, status = change
+        old = self.account.statuses.get(name)
+        self.account.statuses[name] = status
+        with self.lock:
+            self.waiting += 1
+        return partial(self.done, change, old)
+
+    def done(self, change, old, delivered):
+        """Итог доставки статуса change; old — статус до опроса."""
+        if delivered:
+            self.poller.save_sent(self.account, change)
+        else:
+            self.rollback(change, old)
+        with self.lock:
+            self.waiting -= 1
+            self.dropped = self.dropped or not delivered
+            ready = self.ready()
+        if ready:
+            self.poller.state.save_cursor(self.account.key, self.cursor)
+
+    def rollback(self, change, old):
+        """Возвращаем статус и курсор, как до опроса."""
+        name, status = change
+        statuses = self.account.statuses
+        if statuses.get(name) == status:
+            if old is None:
+                statuses.pop(name, None)
+            else:
+                statuses[name] = old
+        with self.lock:
+            self.account.timestamp = min(
+                self.account.timestamp, self.previous
+            )
+
+    def advance(self, cursor):
+        """Сдвигаем курсор; в хранилище — после доставки всех статусов."""
+        with self.lock:
+            self.cursor = cursor
+            if not self.dropped:
+                self.account.timestamp = cursor
+            ready = self.ready()
+        if ready:
+            self.poller.state.save_cursor(self.account.key, cursor)
+
+    def ready(self):
+        """Курсор можно сохранить: всё доставлено, курсор известен."""
+        return (
+            not self.waiting and not self.dropped and self.cursor is not None
+        )
+
+
+class AccountPoller:
+    """Опрос аккаунтов с общими для процесса сессией, кэшем и хранилищем."""
+
+    def __init__(self, bot, session=None, cache=None, state=None,
+                 policy=None, delivery=None, breaker=None,
+                 budget=POLL_BUDGET, errors=None, history=None,
+                 recorder=None, operator=None):
+        """Запоминаем бота и общие для всех аккаунтов ресурсы опроса.
+
+        Разные аккаунты можно опрашивать из разных потоков.
+        """
+        self.bot = bot
+        self.recorder = recorder
+        self.operator = operator
+        self.targets = {}
+        if operator is not None:
+            self.targets[operator.key] = operator
+        self.errors = ErrorAggregator() if errors is None else errors
+        self.history = history
+        self.outcomes = Counter()
+        self.outcomes_lock = threading.Lock()
+        self.budget = budget
+        self.breaker = breaker
+        self.delivery = delivery
+        self.session = session
+        self.cache = cache
+        self.state = MemoryStateBackend() if state is None else state
+        if policy is None:
+            policy = AdaptivePolicy(RETRY_PERIOD)
+        self.policy = policy
+
+    def restore(self, accounts):
+        """Восстанавливаем курсоры и статусы аккаунтов из хранилища."""
+        for account in accounts:
+            self.targets[account.key] = account
+            timestamp, statuses = self.state.load(account.key)
+            if timestamp is not None:
+                account.timestamp = timestamp
+            account.statuses = statuses
+
+    def fetch(self, account, deadline=None):
+        """Запрашиваем статусы работ аккаунта."""
+        timestamp = account.timestamp - RETRY_PERIOD
+        try:
+            answer = request_api_answer(
+                timestamp,
+                make_headers(account.practicum_token),
+                self.session,
+                self.cache,
+                self.breaker,
+                deadline
+            )
+        except Exception as error:
+            if self.recorder is not None:
+                self.recorder.error(account, timestamp, error)
+            raise
+        if self.recorder is not None:
+            self.recorder.answer(account, timestamp, answer)
+        return answer
+
+    def send(self, account, message, callback=None):
+        """Отправляем сообщение в чат аккаунта.
+
+        С очередью доставки callback(delivered) получит итог отправки.
+        """
+        if self.recorder is not None:
+            self.recorder.message(account, message)
+        if self.delivery is not None:
+            self.delivery.submit(account.chat_id, message, callback)
+            return
+        send_chat_message(self.bot, account.chat_id, message)
+
+    def receipt(self, account, changed):
+        """Учёт доставки изменений через очередь или None без неё."""
+        if self.delivery is None or not changed:
+            return None
+        return DeliveryReceipt(self, account)
+
+    def deliver(self, account, change, message, receipt=None):
+        """Отправляем статус; без очереди сразу отмечаем отправленным."""
+        if receipt is None:
+            self.send(account, message)
+            self.mark_sent(account, change)
+            return
+        self.send(account, message, receipt.track(change))
+
+    def validate(self, account, response):
+        """Проверяем ответ и находим изменившиеся работы за один проход."""
+        return validate_response(response, account.statuses)
+
+    def changed_homeworks(self, account, response):
+        """Пары (homework_name, status) ещё не отправленных статусов.
+
+        response — результат validate. Текст сообщений здесь не строится.
+        """
+        extra = {'account': account.key}
+        if not response.homeworks:
+            logger.debug(HOMEWORK_NOT_SUBMITTED, extra=extra)
+            return []
+        if not response.changed:
+            logger.debug(STATUS_DEBUG, extra=extra)
+        return response.changed
+
+    def mark_sent(self, account, change):
+        """Запоминаем отправленный статус работы."""
+        name, status = change
+        account.statuses[name] = status
+        self.save_sent(account, change)
+
+    def save_sent(self, account, change):
+        """Сохраняем доставленный статус в хранилище и историю."""
+        name, status = change
+        self.state.save_status(account.key, name, status)
+        if self.history is not None:
+            self.history.record(account.key, name, status)
+
+    def advance(self, account, response, receipt=None):
+        """Сдвигаем курсор аккаунта на дату ответа."""
+        if receipt is not None:
+            receipt.advance(response.current_date)
+            return
+        account.timestamp = response.current_date
+        self.state.save_cursor(account.key, account.timestamp)
+
+    def error_message(self, account, error):
+        """Пара (адресат, сообщение) или None, если повтор ждёт дайджеста.
+
+        Ошибки соединения общие для всех аккаунтов. С чатом оператора окно
+        у них одно: при сбое эндпоинта оператору уходит одно сообщение, а
+        сводка считает повторы всех аккаунтов. Без оператора окно у
+        каждого аккаунта своё, и каждый затронутый чат получает одно
+        сообщение и сводку только о своих повторах. Из сообщения
+        оператору вырезаются заголовки авторизации аккаунта.
+        """
+        target, scope = account, account.key
+        message = TEMPLATES.error(error, account.locale)
+        if self.operator is not None and isinstance(error, ConnectionError):
+            target, scope = self.operator, None
+            message = redact(
+                TEMPLATES.error(error, target.locale), account.practicum_token
+            )
+        logger.error(message)
+        count_exception(error)
+        if not self.errors.admit(error, scope, target):
+            return None
+        return target, message
+
+    def digest_messages(self):
+        """Пары (аккаунт, сводка) по ошибкам, окно которых истекло.
+
+        Адресат окна, восстановленного из хранилища, — ключ аккаунта;
+        сводки аккаунтов, которых больше нет, не отправляются.
+        """
+        messages = []
+        for target, name, count, minutes in self.errors.digests():
+            if isinstance(target, str):
+                target = self.targets.get(target)
+            if target is not None:
+                messages.append((target, TEMPLATES.digest(
+                    name, count, minutes, target.locale
+                )))
+        return messages
+
+    def count_outcome(self, result):
+        """Считаем итог опроса; опросы идут и из потоков пула."""
+        with self.outcomes_lock:
+            self.outcomes[result] += 1
+
+    def after_success(self, account, changed):
+        """Учитываем удачный опрос; возвращает интервал до следующего."""
+        self.count_outcome(CHANGED if changed else UNCHANGED)
+        return self.policy.after_success(account, changed, account.statuses)
+
+    def after_failure(self, account):
+        """Учитываем сбой опроса; возвращает интервал до следующего."""
+        self.count_outcome(FAILED)
+        return self.policy.after_failure(account)
+
+    def defer(self, account, error):
+        """Откладываем опрос без запроса: бюджет исчерпан до его начала."""
+        self.count_outcome(DEFERRED)
+        record_deferred(error)
+        return self.policy.min_interval
+
+    def poll(self, account, deadline=None):
+        """Один цикл опроса аккаунта; возвращает интервал до следующего.
+
+        Без deadline бюджет отсчитывается от начала опроса.
+        """
+        if deadline is None:
+            deadline = make_deadline(self.budget)
+        for target, message in self.digest_messages():
+            self.notify(target, message)
+        try:
+            with span('get_api_answer'):
+                answer = self.fetch(account, deadline)
+            with span('check_response'):
+                response = self.validate(account, answer)
+            changed = self.changed_homeworks(account, response)
+            receipt = self.receipt(account, changed)
+            for change in changed:
+                with span('parse_status'):
+                    message = render_status(*change, account.locale)
+                with span('send_message'):
+                    self.deliver(account, change, message, receipt)
+            self.advance(account, response, receipt)
+            return self.after_success(account, len(changed))
+        except CircuitOpenError as error:
+            logger.debug(error)
+            return self.after_failure(account)
+        except DeadlineExceeded as error:
+            return self.defer(account, error)
+        except Exception as error:
+            self.report_error(account, error)
+            return self.after_failure(account)
+
+    def report_error(self, account, error):
+        """Отправляем сообщение об ошибке в чат, если оно новое."""
+        notice = self.error_message(account, error)
+        if notice is not None:
+            self.notify(*notice)
+
+    def notify(self, account, message):
+        """Отправляем служебное сообщение, не прерывая опрос при сбое."""
+        try:
+            self.send(account, message)
+        except Exception as send_error:
+            count_exception(send_error)
+            logger.critical(EXCEPTION_MESSAGE_NOT_SUBMITTED.format(
+                error=send_error
+            ))
+
+
+class PollScheduler:
+    """Общий планировщик опроса аккаунтов на куче по времени запуска.
+
+    Первые запросы равномерно распределяются по периоду, чтобы тысячи
+    аккаунтов не опрашивались одновременно. Дальше каждый аккаунт
+    встаёт в очередь через интервал, который вернул его опрос.
+    """
+
+    def __init__(self, accounts, period=RETRY_PERIOD,
+                 clock=time.monotonic, sleep=time.sleep):
+        """Ставим аккаунты в очередь со сдвигом по периоду."""
+        self.period = period
+        self.clock = clock
+        self.sleep = sleep
+        self.counter = itertools.count()
+        now = clock()
+        step = period / len(accounts) if accounts else 0
+        self.queue = [
+            (now + index * step, next(self.counter), account)
+            for index, account in enumerate(accounts)
+        ]
+        heapq.heapify(self.queue)
+
+    def __len__(self):
+        """Число аккаунтов в очереди."""
+        return len(self.queue)
+
+    def next_account(self):
+        """Ждём и забираем из очереди аккаунт, которому пора на опрос."""
+        due, _, account = heapq.heappop(self.queue)
+        delay = due - self.clock()
+        if delay > 0:
+            self.sleep(delay)
+        LOOP_LAG.set(max(0, self.clock() - due))
+        return account
+
+    def schedule(self, account, delay):
+        """Ставим аккаунт в очередь через delay секунд."""
+        heapq.heappush(
+            self.queue, (self.clock() + delay, next(self.counter), account)
+        )
+
+    def run(self, poll):
+        """Бесконечно опрашиваем аккаунты в порядке очереди."""
+        while self.queue:
+            account = self.next_account()
+            self.schedule(account, poll(account))
+
+    def due_account(self):
+        """Забираем из очереди аккаунт, которому уже пора, или None."""
+        if not self.queue or self.queue[0][0] > self.clock():
+            return None
+        due, _, account = heapq.heappop(self.queue)
+        LOOP_LAG.set(max(0, self.clock() - due))
+        return account
+
+    def wait_pool(self, in_flight, limit):
+        """Ждём завершения опросов или срока следующего аккаунта."""
+        timeout = None
+        if self.queue and len(in_flight) < limit:
+            timeout = max(0, self.queue[0][0] - self.clock())
+        if not in_flight:
+            self.sleep(timeout)
+            return ()
+        done, _ = wait(in_flight, timeout, FIRST_COMPLETED)
+        return done
+
+    def run_pool(self, poll, workers=POLL_WORKERS,
+                 max_in_flight=MAX_IN_FLIGHT):
+        """Бесконечно опрашиваем аккаунты пулом из workers потоков.
+
+        Одновременно идёт не больше max_in_flight опросов. Аккаунт
+        возвращается в очередь, когда его опрос завершился, поэтому
+        дважды одновременно не опрашивается. Если опрос упал с
+        исключением, аккаунт повторяется через период.
+        """
+        limit = in_flight_limit(workers, max_in_flight)
+        in_flight = {}
+        with make_executor(workers) as executor:
+            while self.queue or in_flight:
+                while len(in_flight) < limit:
+                    account = self.due_account()
+                    if account is None:
+                        break
+                    in_flight[executor.submit(poll, account)] = account
+                for future in self.wait_pool(in_flight, limit):
+                    account = in_flight.pop(future)
+                    delay, error = outcome(future, account)
+                    self.schedule(
+                        account, self.period if error is not None else delay
+                    )
+
+
+def pool_size(workers=POLL_WORKERS, max_in_flight=MAX_IN_FLIGHT):
+    """Размер пула соединений: не меньше числа одновременных опросов.
+
+    Сессия не открывает соединений сверх пула, и лишние потоки опроса
+    ждали бы свободное соединение вне всяких таймаутов.
+    """
+    return max(POOL_MAXSIZE, in_flight_limit(workers, max_in_flight))
+
+
+def check_bot_token():
+    """Проверяем токен бота: в этом режиме он единственный общий."""
+    if TELEGRAM_TOKEN is None:
+        logger.critical(TELEGRAM_TOKEN_ERROR)
+        raise ValueError(TELEGRAM_TOKEN_ERROR)
+
+
+def idle(shard_index, shard_count):
+    """Бесконечно ждём, если шарду не досталось аккаунтов.
+
+    Пустой шард не завершается: иначе лаунчер и супервизор сочли бы его
+    упавшим и перезапускали по кругу.
+    """
+    logger.warning(SHARD_IDLE.format(index=shard_index, count=shard_count))
+    while True:
+        time.sleep(RETRY_PERIOD)
+
+
+def main(path=ACCOUNTS_FILE, shard_index=SHARD_INDEX,
+         shard_count=SHARD_COUNT):
+    """Опрос аккаунтов из файла в одном процессе.
+
+    Процесс опрашивает только аккаунты своего шарда (SHARD_INDEX из
+    SHARD_COUNT), по умолчанию — все; шард без аккаунтов простаивает.
+    Бот, очередь доставки и команды
+    импортируются здесь: разовому опросу (--once) они не нужны. Бот
+    держит по соединению на поток доставки и на приём команд.
+    """
+    from commands import CommandHandler, StatusHistory, start_commands
+    from delivery import DELIVERY_WORKERS, DeliveryQueue
+
+    check_bot_token()
+    accounts = shard_accounts(load_accounts(path), shard_index, shard_count)
+    if not accounts:
+        idle(shard_index, shard_count)
+    bot = make_bot(TELEGRAM_TOKEN, DELIVERY_WORKERS + 1)
+    start_metrics_server(shard_port(METRICS_PORT, shard_index))
+    history = StatusHistory()
+    poller = AccountPoller(
+        bot, get_session(pool_size()), ResponseCache(), open_state_backend(),
+        delivery=DeliveryQueue(bot).start(), breaker=CircuitBreaker(),
+        history=history, recorder=open_recorder(),
+        operator=operator_account()
+    )
+    poller.restore(accounts)
+    start_commands(bot, CommandHandler(accounts, history))
+    scheduler = PollScheduler(accounts)
+    try:
+        if POLL_WORKERS > 1:
+            scheduler.run_pool(poller.poll)
+        else:
+            scheduler.run(poller.poll)
+    finally:
+        poller.delivery.stop()
+        poller.state.close()
+        close_recorder(poller)
+
+
+def close_recorder(poller):
+    """Закрываем запись ответов API, если она включена."""
+    if poller.recorder is not None:
+        poller.recorder.close()
+
+
+def exit_code(outcomes):
+    """Код выхода разового опроса по итогам опросов аккаунтов."""
+    if outcomes[FAILED] or outcomes[DEFERRED]:
+        return EXIT_ERROR
+    if outcomes[CHANGED]:
+        return EXIT_CHANGES_SENT
+    return EXIT_NO_CHANGES
+
+
+def run_once(path=ACCOUNTS_FILE, shard_index=SHARD_INDEX,
+             shard_count=SHARD_COUNT):
+    """Разовый опрос аккаунтов шарда (--once) для запуска по расписанию.
+
+    Каждый аккаунт опрашивается один раз, курсоры сохраняются в
+    хранилище. Сообщения отправляются сразу, без очереди доставки: не
+    отправленный статус не отмечается и уйдёт при следующем запуске.
+    Окна агрегации ошибок хранятся вместе с курсорами, поэтому
+    повторяющаяся ошибка не отправляется каждым запуском.
+    Внешний планировщик запускает пачки аккаунтов через SHARD_INDEX и
+    SHARD_COUNT. С POLL_WORKERS > 1 аккаунты опрашиваются пулом потоков.
+    Возвращает код выхода, см. exit_code.
+    """
+    check_bot_token()
+    accounts = shard_accounts(load_accounts(path), shard_index, shard_count)
+    state = open_state_backend()
+    size = pool_size()
+    poller = AccountPoller(
+        LazyBot(TELEGRAM_TOKEN, size), get_session(size), state=state,
+        breaker=CircuitBreaker(), recorder=open_recorder(),
+        errors=ErrorAggregator(clock=time.time, store=state),
+        operator=operator_account()
+    )
+    poller.restore(accounts)
+    try:
+        for account, _, error in fan_out(poller.poll, accounts):
+            if error is not None:
+                poller.count_outcome(FAILED)
+    finally:
+        poller.state.close()
+        close_recorder(poller)
+    return exit_code(poller.outcomes)
+
+
+if __name__ == '__main__':
+    configure_logging(__file__ + '.log')
+    arguments = [argument for argument in sys.argv[1:] if argument != '--once']
+    if '--once' in sys.argv[1:]:
+        sys.exit(run_once(*arguments[:1]))
+    install_profiler()
+    main(*arguments[:1])
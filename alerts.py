@@ -0,0 +1,165 @@
+"""Дедупликация и агрегация уведомлений об ошибках."""
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import ERRORS_SUPPRESSED
+
+ERROR_WINDOW = float(os.getenv('ERROR_WINDOW', 600))
+ERROR_CAPACITY = int(os.getenv('ERROR_CAPACITY', 1024))
+SWEEPS_PER_WINDOW = 10
+NORMALIZERS = (
+    (re.compile(r'OAuth [^\s\'",}]+'), 'OAuth <token>'),
+    (re.compile(r'\b[0-9a-f]{8,}\b'), '<id>'),
+    (re.compile(r'\d+\.\d+'), '<f>'),
+    (re.compile(r'\d{5,}'), '<n>'),
+)
+
+
+def normalize(message):
+    """Текст ошибки без токенов, меток времени и идентификаторов.
+
+    Короткие числа вроде кода ответа остаются: 401 и 502 — разные ошибки.
+    """
+    for pattern, replacement in NORMALIZERS:
+        message = pattern.sub(replacement, message)
+    return message
+
+
+def fingerprint(error, scope=None):
+    """Отпечаток ошибки: область, тип и нормализованный текст."""
+    return scope, type(error).__name__, normalize(str(error))
+
+
+class ErrorEntry:
+    """Повторы одной ошибки в текущем окне."""
+
+    __slots__ = ('name', 'target', 'started', 'seen', 'count', 'suppressed')
+
+    def __init__(self, name, target, now):
+        """Первое появление ошибки открывает окно."""
+        self.name = name
+        self.target = target
+        self.started = now
+        self.seen = now
+        self.count = 1
+        self.suppressed = 0
+
+
+class ErrorAggregator:
+    """Пропускает первое появление ошибки, повторы сводит в дайджесты.
+
+    Повторы ошибки с тем же отпечатком в течение window секунд не
+    отправляются, а считаются; по истечении окна digests отдаёт сводку
+    (target, name, count, minutes) с числом появлений за окно и
+    открывает новое окно. Ошибка, не повторявшаяся целое окно,
+    забывается и снова будет отправлена сразу.
+    Отпечатков хранится не больше capacity: при переполнении вытесняется
+    давно не встречавшийся.
+
+    С хранилищем состояния store окна ошибок переживают перезапуск:
+    разовые запуски по расписанию не отправляют одну и ту же ошибку
+    каждый раз. Часы clock тогда должны идти между запусками
+    (time.time), а адресат восстановленного окна — ключ аккаунта
+    (атрибут key адресата), пока ошибка не повторится.
+    """
+
+    def __init__(self, window=ERROR_WINDOW, capacity=ERROR_CAPACITY,
+                 clock=time.monotonic, store=None):
+        """Создаём агрегатор и восстанавливаем окна из store."""
+        self.window = window
+        self.capacity = capacity
+        self.clock = clock
+        self.store = store
+        self.entries = OrderedDict()
+        self.next_sweep = clock() + window / SWEEPS_PER_WINDOW
+        self.lock = threading.Lock()
+        if store is not None:
+            self.restore(store.load_errors())
+
+    def restore(self, rows):
+        """Восстанавливаем окна из строк хранилища; проверка — сразу."""
+        for key, name, target, started, seen, count, suppressed in rows:
+            entry = ErrorEntry(name, target, started)
+            entry.seen = seen
+            entry.count = count
+            entry.suppressed = suppressed
+            self.entries[tuple(json.loads(key))] = entry
+        if self.entries:
+            self.next_sweep = self.clock()
+
+    def persist(self, key, entry=None):
+        """Сохраняем окно ошибки в хранилище; без entry — удаляем."""
+        if self.store is None:
+            return
+        key = json.dumps(key, ensure_ascii=False)
+        if entry is None:
+            self.store.delete_error(key)
+            return
+        self.store.save_error(
+            key, entry.name, getattr(entry.target, 'key', entry.target),
+            entry.started, entry.seen, entry.count, entry.suppressed
+        )
+
+    def __len__(self):
+        """Число отслеживаемых отпечатков."""
+        return len(self.entries)
+
+    def admit(self, error, scope=None, target=None):
+        """Нужно ли отправить уведомление об ошибке сейчас.
+
+        scope отделяет ошибки разных аккаунтов, target — адресат будущих
+        дайджестов по этой ошибке.
+        """
+        key = fingerprint(error, scope)
+        now = self.clock()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                entry.seen = now
+                if target is not None:
+                    entry.target = target
+                entry.count += 1
+                entry.suppressed += 1
+                self.entries.move_to_end(key)
+                self.persist(key, entry)
+                ERRORS_SUPPRESSED.inc((entry.name,))
+                return False
+            if len(self.entries) >= self.capacity:
+                self.persist(self.entries.popitem(last=False)[0])
+            entry = self.entries[key] = ErrorEntry(
+                type(error).__name__, target, now
+            )
+            self.persist(key, entry)
+            return True
+
+    def digests(self):
+        """Сводки по ошибкам, окно которых истекло.
+
+        Проверка идёт не чаще SWEEPS_PER_WINDOW раз за окно, так что
+        вызывать метод можно на каждом опросе.
+        """
+        now = self.clock()
+        if now < self.next_sweep:
+            return []
+        ready = []
+        with self.lock:
+            self.next_sweep = now + self.window / SWEEPS_PER_WINDOW
+            for key, entry in list(self.entries.items()):
+                if now - entry.started < self.window:
+                    continue
+                if entry.suppressed:
+                    ready.append((
+                        entry.target, entry.name, entry.count,
+                        self.window / 60
+                    ))
+                    entry.started = now
+                    entry.count = entry.suppressed = 0
+                    self.persist(key, entry)
+                elif now - entry.seen >= self.window:
+                    del self.entries[key]
+                    self.persist(key)
+        return ready
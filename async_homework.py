@@ -0,0 +1,422 @@
+"""Асинхронный цикл опроса: запросы к API и отправка без блокировок."""
+import asyncio
+import contextlib
+import logging
+import os
+import sys
+from http import HTTPStatus
+
+import telegram
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+import decoding
+from accounts import (
+    Account,
+    AccountPoller,
+    check_bot_token,
+    close_recorder,
+    load_accounts,
+    operator_account,
+)
+from breaker import CircuitBreaker
+from budget import (
+    BUDGET_CANCELLED,
+    make_deadline,
+    record_cancelled,
+    remaining,
+    request_timeout,
+)
+from cache import ResponseCache
+from commands import (
+    COMMANDS_MODE,
+    LONG_POLL_TIMEOUT,
+    RETRY_DELAY,
+    UPDATES_ERROR,
+    CommandHandler,
+    StatusHistory,
+    answer_update,
+    start_commands,
+)
+from exceptions import CircuitOpenError, DeadlineExceeded, SendMessageError
+from homework import (
+    DEBUG_SEND_MESSAGE,
+    ENDPOINT,
+    ENDPOINT_RESPONSE_ERROR,
+    ERROR_SEND_MESSAGE,
+    EXCEPTION_MESSAGE_NOT_SUBMITTED,
+    HEADERS,
+    PRACTICUM_TOKEN,
+    RETRY_PERIOD,
+    TELEGRAM_CHAT_ID,
+    TELEGRAM_TOKEN,
+    check_api_error,
+    check_status_code,
+    check_tokens,
+    configure_logging,
+    make_headers,
+    request_api_answer,
+    send_chat_message,
+)
+from locales import render_status
+from metrics import (
+    HTTP_RESPONSES,
+    LOOP_LAG,
+    MESSAGES,
+    POLL_LATENCY,
+    count_exception,
+    start_metrics_server,
+)
+from recording import open_recorder
+from session import get_session
+from state import open_state_backend
+from tracing import install_profiler
+
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+TELEGRAM_SEND_URL = TELEGRAM_API_URL + '/bot{token}/sendMessage'
+TELEGRAM_UPDATES_URL = TELEGRAM_API_URL + '/bot{token}/getUpdates'
+MAX_CONCURRENCY = int(os.getenv('MAX_CONCURRENCY', 100))
+CONNECTION_LIMIT = int(os.getenv('CONNECTION_LIMIT', 100))
+
+logger = logging.getLogger(__name__)
+
+
+@contextlib.asynccontextmanager
+async def open_session(limit=CONNECTION_LIMIT):
+    """Открываем общую HTTP-сессию aiohttp.
+
+    Без установленного aiohttp возвращаем общую сессию requests: запросы
+    тогда уходят синхронными функциями в пул потоков.
+    """
+    if aiohttp is None:
+        yield get_session()
+        return
+    connector = aiohttp.TCPConnector(limit=limit)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        yield session
+
+
+def is_aiohttp_session(session):
+    """Проверяем, что запросы можно отправлять через aiohttp."""
+    return aiohttp is not None and isinstance(session, aiohttp.ClientSession)
+
+
+async def async_send_request(session, request_parameters, breaker=None,
+                             deadline=None):
+    """Асинхронный аналог send_request: код, заголовки и тело ответа."""
+    if breaker is not None:
+        breaker.before_call()
+    with POLL_LATENCY.time():
+        try:
+            async with session.get(**request_parameters) as response:
+                status = response.status
+                response_headers = response.headers
+                body = await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            if breaker is not None:
+                breaker.record_failure()
+            if isinstance(error, asyncio.TimeoutError):
+                record_cancelled(deadline)
+            raise ConnectionError(ENDPOINT_RESPONSE_ERROR.format(
+                error=error, **request_parameters
+            ))
+    HTTP_RESPONSES.inc((status,))
+    if breaker is not None:
+        if status >= HTTPStatus.INTERNAL_SERVER_ERROR:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+    return status, response_headers, body
+
+
+async def async_request_api_answer(session, timestamp, headers, cache=None,
+                                   breaker=None, deadline=None):
+    """Асинхронный аналог request_api_answer."""
+    if not is_aiohttp_session(session):
+        return await asyncio.to_thread(
+            request_api_answer, timestamp, headers, session, cache, breaker,
+            deadline
+        )
+    connect, read = request_timeout(deadline)
+    payload = {'from_date': timestamp}
+    request_parameters = dict(
+        url=ENDPOINT, headers=headers, params=payload,
+        timeout=aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+    )
+    if cache is not None:
+        key = headers['Authorization']
+        request_parameters['headers'] = cache.request_headers(key, headers)
+    status, response_headers, body = await async_send_request(
+        session, request_parameters, breaker, deadline
+    )
+    if cache is not None and status == HTTPStatus.NOT_MODIFIED:
+        answer = cache.not_modified(key)
+        if answer is not None:
+            return answer
+    check_status_code(status, request_parameters)
+
+    def decode():
+        return check_api_error(decoding.loads(body), request_parameters)
+
+    if cache is None:
+        return decode()
+    return cache.decode(key, body, response_headers, decode)
+
+
+async def async_get_api_answer(session, timestamp):
+    """Асинхронный аналог get_api_answer."""
+    return await async_request_api_answer(session, timestamp, HEADERS)
+
+
+async def async_send_chat_message(session, bot, chat_id, message):
+    """Асинхронный аналог send_chat_message через Bot API."""
+    if not is_aiohttp_session(session):
+        await asyncio.to_thread(send_chat_message, bot, chat_id, message)
+        return
+    try:
+        async with session.post(
+            TELEGRAM_SEND_URL.format(token=bot.token),
+            json={'chat_id': chat_id, 'text': message}
+        ) as response:
+            answer = await response.json(content_type=None)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+        MESSAGES.inc(('failed',))
+        logger.exception(
+            ERROR_SEND_MESSAGE.format(message=message, error=error)
+        )
+        raise SendMessageError(
+            ERROR_SEND_MESSAGE.format(message=message, error=error)
+        )
+    if not answer.get('ok'):
+        MESSAGES.inc(('failed',))
+        error = answer.get('description')
+        logger.error(ERROR_SEND_MESSAGE.format(message=message, error=error))
+        raise SendMessageError(
+            ERROR_SEND_MESSAGE.format(message=message, error=error)
+        )
+    MESSAGES.inc(('sent',))
+    logger.debug(DEBUG_SEND_MESSAGE.format(message=message))
+
+
+async def async_send_message(session, bot, message):
+    """Асинхронный аналог send_message."""
+    await async_send_chat_message(session, bot, TELEGRAM_CHAT_ID, message)
+
+
+class AsyncAccountPoller(AccountPoller):
+    """Асинхронный аналог AccountPoller: запросы и отправка в цикле событий."""
+
+    async def fetch(self, account, deadline=None):
+        """Асинхронно запрашиваем статусы работ аккаунта, как fetch."""
+        timestamp = account.timestamp - RETRY_PERIOD
+        try:
+            answer = await self.request(account, timestamp, deadline)
+        except Exception as error:
+            if self.recorder is not None:
+                self.recorder.error(account, timestamp, error)
+            raise
+        if self.recorder is not None:
+            self.recorder.answer(account, timestamp, answer)
+        return answer
+
+    async def request(self, account, timestamp, deadline=None):
+        """Запрос к API; не уложившийся в остаток бюджета отменяется."""
+        if deadline is None:
+            left = None
+        else:
+            left = remaining(deadline)
+        request = async_request_api_answer(
+            self.session,
+            timestamp,
+            make_headers(account.practicum_token),
+            self.cache,
+            self.breaker,
+            deadline
+        )
+        try:
+            return await asyncio.wait_for(request, left)
+        except DeadlineExceeded:
+            raise
+        except asyncio.TimeoutError:
+            record_cancelled(deadline)
+            raise ConnectionError(BUDGET_CANCELLED.format(budget=self.budget))
+
+    async def send(self, account, message, callback=None):
+        """Асинхронно отправляем сообщение в чат аккаунта."""
+        if self.recorder is not None:
+            self.recorder.message(account, message)
+        if self.delivery is not None:
+            self.delivery.submit(account.chat_id, message, callback)
+            return
+        await async_send_chat_message(
+            self.session, self.bot, account.chat_id, message
+        )
+
+    async def poll(self, account, deadline=None):
+        """Асинхронный цикл опроса; возвращает интервал до следующего."""
+        if deadline is None:
+            deadline = make_deadline(self.budget)
+        for target, message in self.digest_messages():
+            await self.notify(target, message)
+        try:
+            response = self.validate(
+                account, await self.fetch(account, deadline)
+            )
+            changed = self.changed_homeworks(account, response)
+            receipt = self.receipt(account, changed)
+            for change in changed:
+                await self.deliver(
+                    account, change,
+                    render_status(*change, account.locale), receipt
+                )
+            self.advance(account, response, receipt)
+            return self.after_success(account, len(changed))
+        except CircuitOpenError as error:
+            logger.debug(error)
+            return self.after_failure(account)
+        except DeadlineExceeded as error:
+            return self.defer(account, error)
+        except Exception as error:
+            await self.report_error(account, error)
+            return self.after_failure(account)
+
+    async def deliver(self, account, change, message, receipt=None):
+        """Асинхронно отправляем статус, как AccountPoller.deliver."""
+        if receipt is None:
+            await self.send(account, message)
+            self.mark_sent(account, change)
+            return
+        await self.send(account, message, receipt.track(change))
+
+    async def report_error(self, account, error):
+        """Асинхронно отправляем сообщение об ошибке, если оно новое."""
+        notice = self.error_message(account, error)
+        if notice is not None:
+            await self.notify(*notice)
+
+    async def notify(self, account, message):
+        """Асинхронно отправляем служебное сообщение."""
+        try:
+            await self.send(account, message)
+        except Exception as send_error:
+            count_exception(send_error)
+            logger.critical(EXCEPTION_MESSAGE_NOT_SUBMITTED.format(
+                error=send_error
+            ))
+
+
+async def watch_account(poller, account, semaphore, delay):
+    """Бесконечно опрашиваем один аккаунт с адаптивным интервалом.
+
+    Опоздание пробуждения относительно плана показывает загрузку цикла
+    событий. Бюджет опроса отсчитывается до ожидания семафора: если
+    очередь к семафору съела его целиком, опрос откладывается.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        due = loop.time() + delay
+        await asyncio.sleep(delay)
+        deadline = make_deadline(poller.budget)
+        async with semaphore:
+            LOOP_LAG.set(max(0, loop.time() - due))
+            delay = await poller.poll(account, deadline)
+
+
+async def async_get_updates(session, bot, offset,
+                            timeout=LONG_POLL_TIMEOUT):
+    """Асинхронный getUpdates: список обновлений Bot API словарями."""
+    if not is_aiohttp_session(session):
+        updates = await asyncio.to_thread(
+            bot.get_updates, offset=offset, timeout=timeout
+        )
+        return [update.to_dict() for update in updates]
+    async with session.get(
+        TELEGRAM_UPDATES_URL.format(token=bot.token),
+        params={'offset': offset or 0, 'timeout': timeout},
+        timeout=aiohttp.ClientTimeout(sock_read=timeout + 10)
+    ) as response:
+        answer = await response.json(content_type=None)
+    if not answer.get('ok'):
+        raise ConnectionError(answer.get('description'))
+    return answer['result']
+
+
+async def listen_commands(session, bot, handler):
+    """Длинный опрос команд бота в общем с опросом цикле событий."""
+    offset = None
+    while True:
+        try:
+            updates = await async_get_updates(session, bot, offset)
+        except Exception as error:
+            count_exception(error)
+            logger.error(UPDATES_ERROR.format(error=error))
+            await asyncio.sleep(RETRY_DELAY)
+            continue
+        for update in updates:
+            offset = update['update_id'] + 1
+            answer = answer_update(handler, update)
+            if answer is not None:
+                with contextlib.suppress(SendMessageError):
+                    await async_send_chat_message(session, bot, *answer)
+
+
+async def run_accounts(bot, accounts, state, concurrency=MAX_CONCURRENCY,
+                       commands=COMMANDS_MODE):
+    """Опрашиваем все аккаунты в одном цикле событий.
+
+    Семафор ограничивает число одновременных опросов, первые запросы
+    распределены по периоду. Команды бота в режиме polling принимаются
+    в том же цикле событий. С RECORD_FILE опрос пишется для replay.py.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    step = RETRY_PERIOD / len(accounts) if accounts else 0
+    history = StatusHistory()
+    handler = CommandHandler(accounts, history)
+    async with open_session() as session:
+        poller = AsyncAccountPoller(
+            bot, session, ResponseCache(), state, breaker=CircuitBreaker(),
+            history=history, operator=operator_account(),
+            recorder=open_recorder()
+        )
+        poller.restore(accounts)
+        tasks = [
+            watch_account(poller, account, semaphore, index * step)
+            for index, account in enumerate(accounts)
+        ]
+        if commands == 'polling':
+            tasks.append(listen_commands(session, bot, handler))
+        else:
+            start_commands(bot, handler, commands)
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            close_recorder(poller)
+
+
+def main(path=None):
+    """Асинхронная логика работы бота.
+
+    Без файла аккаунтов опрашиваем единственный аккаунт из окружения.
+    """
+    if path is None:
+        check_tokens()
+        accounts = [Account(PRACTICUM_TOKEN, TELEGRAM_CHAT_ID)]
+    else:
+        check_bot_token()
+        accounts = load_accounts(path)
+    bot = telegram.Bot(token=TELEGRAM_TOKEN)
+    start_metrics_server()
+    state = open_state_backend()
+    try:
+        asyncio.run(run_accounts(bot, accounts, state))
+    finally:
+        state.close()
+
+
+if __name__ == '__main__':
+    configure_logging(__file__ + '.log')
+    install_profiler()
+    main(*sys.argv[1:2])
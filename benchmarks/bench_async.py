@@ -0,0 +1,64 @@
+"""Пропускная способность асинхронного опроса в зависимости от параллелизма.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_async.py --accounts 256 --latency 0.02
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_server import MockServer  # noqa: E402
+
+CONCURRENCY_LEVELS = (1, 8, 32, 128)
+
+
+async def poll_all(async_homework, bot, accounts, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def poll(account):
+        async with semaphore:
+            await poller.poll(account)
+
+    async with async_homework.open_session() as session:
+        poller = async_homework.AsyncAccountPoller(bot, session)
+        await asyncio.gather(*(poll(account) for account in accounts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--accounts', type=int, default=256)
+    parser.add_argument('--latency', type=float, default=0.02)
+    args = parser.parse_args()
+    with MockServer(latency=args.latency) as server:
+        os.environ['PRACTICUM_ENDPOINT'] = server.url
+        os.environ['TELEGRAM_API_URL'] = server.base_url
+        import telegram
+
+        import async_homework
+        from accounts import Account
+
+        bot = telegram.Bot(token='1234:abcdefg', base_url=server.bot_url)
+        backend = 'aiohttp' if async_homework.aiohttp else 'threads'
+        print(f'backend={backend} accounts={args.accounts} '
+              f'latency={args.latency}s')
+        for concurrency in CONCURRENCY_LEVELS:
+            accounts = [
+                Account(f'token{index}', str(index))
+                for index in range(args.accounts)
+            ]
+            started = time.perf_counter()
+            asyncio.run(
+                poll_all(async_homework, bot, accounts, concurrency)
+            )
+            elapsed = time.perf_counter() - started
+            print(f'concurrency={concurrency:4d} '
+                  f'polls/s={args.accounts / elapsed:9.1f} '
+                  f'elapsed={elapsed:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Скорость разбора ответа API и память, которую удерживает результат.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_decode.py
+"""
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from decoding import DECODERS  # noqa: E402
+from mock_server import make_payload  # noqa: E402
+
+SIZES = (1, 100, 1000, 10000)
+
+
+def retained(decoder, body):
+    tracemalloc.start()
+    answer = decoder(body)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del answer
+    return size
+
+
+def main():
+    for size in SIZES:
+        body = json.dumps(make_payload(size), ensure_ascii=False).encode()
+        number = max(1, 20000 // size)
+        for name, decoder in sorted(DECODERS.items()):
+            elapsed = min(timeit.repeat(
+                lambda: decoder(body), number=number, repeat=5
+            )) / number
+            print(f'homeworks={size:5d} body={len(body):9d}B '
+                  f'decoder={name:6s} '
+                  f'per_call={elapsed * 1e6:10.1f}us '
+                  f'retained={retained(decoder, body):10d}B')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""Скорость поиска изменившихся статусов на больших ответах API.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_diff.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from diff import diff_homeworks  # noqa: E402
+from mock_server import make_payload  # noqa: E402
+
+SIZES = (1, 10, 100, 1000)
+
+
+def main():
+    for size in SIZES:
+        homeworks = make_payload(size)['homeworks']
+        statuses = {hw['homework_name']: hw['status'] for hw in homeworks}
+        statuses[homeworks[-1]['homework_name']] = 'reviewing'
+        number = max(1, 100000 // size)
+        elapsed = timeit.timeit(
+            lambda: diff_homeworks(statuses, homeworks), number=number
+        )
+        print(f'homeworks={size:5d} '
+              f'per_call={elapsed / number * 1e6:9.2f}us '
+              f'per_homework={elapsed / number / size * 1e9:7.1f}ns')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Время импорта модулей бота по -X importtime.
+
+Для каждого модуля берётся лучшее из нескольких запусков свежего
+интерпретатора время импорта (включая зависимости) и список тяжёлых
+пакетов, которые он подтянул.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --output import.json
+    python benchmarks/bench_import.py --baseline import.json --tolerance 0.3
+
+С --baseline процесс завершается с кодом 1, если импорт какого-либо
+модуля стал медленнее больше чем на tolerance.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ('telegram', 'requests', 'aiohttp', 'dotenv', 'http.server')
+
+
+def import_times(module):
+    """Время импорта каждого модуля в микросекундах: {имя: cumulative}."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def measure(module, repeat):
+    """Лучшее время импорта модуля и подтянутые тяжёлые пакеты."""
+    runs = [import_times(module) for _ in range(repeat)]
+    return {
+        'module': module,
+        'import_ms': min(run[module] for run in runs) / 1000,
+        'heavy': [name for name in HEAVY if name in runs[0]],
+    }
+
+
+def check_baseline(results, path, tolerance):
+    """Сравниваем с сохранёнными результатами; True — без регрессий."""
+    with open(path, encoding='utf-8') as file:
+        baseline = {item['module']: item for item in json.load(file)}
+    ok = True
+    for result in results:
+        previous = baseline.get(result['module'])
+        if previous is None:
+            continue
+        ceiling = previous['import_ms'] * (1 + tolerance)
+        if result['import_ms'] > ceiling:
+            ok = False
+            print(f"РЕГРЕССИЯ {result['module']}: "
+                  f"{result['import_ms']:.1f} > {ceiling:.1f} ms")
+    return ok
+
+
+def main():
+    """Замеряем модули, печатаем и при необходимости сравниваем."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--modules', default='homework,accounts,async_homework')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=0.3)
+    args = parser.parse_args()
+
+    results = []
+    for module in args.modules.split(','):
+        result = measure(module, args.repeat)
+        results.append(result)
+        print(f"{module:15s} import={result['import_ms']:7.1f}ms "
+              f"heavy={','.join(result['heavy']) or '-'}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+    if args.baseline and not check_baseline(
+            results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Скорость формирования сообщений: str.format против шаблонов локалей.
+
+Для каждой локали сравниваются прежний VERDICT.format с поиском в
+HOMEWORK_VERDICTS, скомпилированный шаблон TemplateRegistry и
+render_status с LRU-кэшем.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_locales.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homework import HOMEWORK_VERDICTS, VERDICT  # noqa: E402
+from locales import TEMPLATES, render_status  # noqa: E402
+
+NAMES = [f'student__hw{index:05d}.zip' for index in range(1000)]
+STATUSES = list(HOMEWORK_VERDICTS)
+
+
+def str_format():
+    for index, name in enumerate(NAMES):
+        status = STATUSES[index % 3]
+        VERDICT.format(
+            homework_name=name, status=status,
+            verdict=HOMEWORK_VERDICTS[status]
+        )
+
+
+def compiled(locale):
+    status_message = TEMPLATES.status
+    for index, name in enumerate(NAMES):
+        status_message(name, STATUSES[index % 3], locale)
+
+
+def cached(locale):
+    for index, name in enumerate(NAMES):
+        render_status(name, STATUSES[index % 3], locale)
+
+
+def measure(function, *args):
+    number = 200
+    return min(timeit.repeat(
+        lambda: function(*args), number=number, repeat=5
+    )) / number / len(NAMES)
+
+
+def main():
+    baseline = measure(str_format)
+    print(f'str.format          per_message={baseline * 1e9:7.1f}ns')
+    for locale in TEMPLATES.locales():
+        for name, function in (('compiled', compiled), ('cached', cached)):
+            elapsed = measure(function, locale)
+            print(f'{locale:3s} {name:15s} '
+                  f'per_message={elapsed * 1e9:7.1f}ns '
+                  f'speedup={baseline / elapsed:5.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Пропускная способность опроса пулом потоков в зависимости от их числа.
+
+Каждый опрос проходит весь синхронный конвейер (requests, проверка,
+отправка через telegram.Bot) против MockServer. Пулы соединений сессии
+и бота считаются так же, как в accounts.run_once (accounts.pool_size).
+
+Запуск из корня репозитория:
+    python benchmarks/bench_threads.py --accounts 256 --latency 0.02
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_server import MockServer  # noqa: E402
+
+WORKER_LEVELS = (1, 8, 32, 128)
+BOT_TOKEN = '1234:abcdefg'
+
+
+def percentile(values, fraction):
+    """Перцентиль по списку значений."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def poll_all(server, accounts, workers):
+    """Опрашиваем все аккаунты пулом; длительности опросов в секундах."""
+    from accounts import AccountPoller, pool_size
+    from fanout import fan_out
+    from homework import make_bot
+    from session import make_session
+
+    size = pool_size(workers, 0)
+    bot = make_bot(BOT_TOKEN, size, base_url=server.bot_url)
+    poller = AccountPoller(bot, make_session(pool_maxsize=size))
+
+    def timed_poll(account):
+        started = time.perf_counter()
+        poller.poll(account)
+        return time.perf_counter() - started
+
+    durations = []
+    for _, duration, error in fan_out(timed_poll, accounts, workers):
+        if error is None:
+            durations.append(duration)
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--accounts', type=int, default=256)
+    parser.add_argument('--latency', type=float, default=0.02)
+    args = parser.parse_args()
+    with MockServer(latency=args.latency) as server:
+        os.environ['PRACTICUM_ENDPOINT'] = server.url
+        os.environ['TELEGRAM_API_URL'] = server.base_url
+        os.environ.setdefault('STATE_BACKEND', 'memory')
+        from accounts import Account
+
+        print(f'accounts={args.accounts} latency={args.latency}s')
+        for workers in WORKER_LEVELS:
+            accounts = [
+                Account(f'token{index}', str(index + 1))
+                for index in range(args.accounts)
+            ]
+            started = time.perf_counter()
+            durations = poll_all(server, accounts, workers)
+            elapsed = time.perf_counter() - started
+            print(f'workers={workers:4d} '
+                  f'polls/s={args.accounts / elapsed:9.1f} '
+                  f'p50={percentile(durations, 0.5) * 1000:7.1f}ms '
+                  f'p99={percentile(durations, 0.99) * 1000:7.1f}ms '
+                  f'errors={args.accounts - len(durations)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""Цена разметки стадий: без span, с выключенной и включённой трассировкой.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_tracing.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tracing import Tracer  # noqa: E402
+
+NUMBER = 200000
+
+
+def bare():
+    pass
+
+
+def traced(tracer):
+    with tracer.span('stage'):
+        pass
+
+
+def measure(function, *args):
+    return min(timeit.repeat(
+        lambda: function(*args), number=NUMBER, repeat=5
+    )) / NUMBER
+
+
+def main():
+    baseline = measure(bare)
+    print(f'no span         per_call={baseline * 1e9:7.1f}ns')
+    for name, tracer in (('disabled', Tracer(enabled=False)),
+                         ('enabled', Tracer(enabled=True))):
+        elapsed = measure(traced, tracer)
+        print(f'{name:15s} per_call={elapsed * 1e9:7.1f}ns '
+              f'overhead={(elapsed - baseline) * 1e9:7.1f}ns')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Проверка ответа API: check_response + parse_status против validate_response.
+
+legacy — прежний путь AccountPoller: check_response, поиск изменившихся
+работ и parse_status только для них. compiled проверяет все работы
+ответа за тот же проход, что и поиск изменившихся статусов.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_validate.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from diff import diff_homeworks  # noqa: E402
+from homework import check_response, parse_status  # noqa: E402
+from mock_server import make_payload  # noqa: E402
+from locales import render_status  # noqa: E402
+from validation import validate_response  # noqa: E402
+
+SIZES = (1, 10, 100, 1000, 10000)
+
+
+def legacy(response, statuses):
+    homeworks = check_response(response)
+    return [
+        parse_status(homework)
+        for homework in diff_homeworks(statuses, homeworks)
+    ]
+
+
+def compiled(response, statuses):
+    result = validate_response(response, statuses)
+    return [render_status(*change) for change in result.changed]
+
+
+def main():
+    for size in SIZES:
+        response = make_payload(size)
+        homeworks = response['homeworks']
+        statuses = {hw['homework_name']: hw['status'] for hw in homeworks}
+        statuses[homeworks[0]['homework_name']] = 'reviewing'
+        assert legacy(response, statuses) == compiled(response, statuses)
+        number = max(1, 200000 // size)
+        results = {}
+        for name, function in (('legacy', legacy), ('compiled', compiled)):
+            results[name] = min(timeit.repeat(
+                lambda: function(response, statuses), number=number, repeat=5
+            )) / number
+        print(f'homeworks={size:5d} '
+              f"legacy={results['legacy'] * 1e6:9.2f}us "
+              f"compiled={results['compiled'] * 1e6:9.2f}us "
+              f"speedup={results['legacy'] / results['compiled']:5.2f}x")
+
+
+if __name__ == '__main__':
+    main()
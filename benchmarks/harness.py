@@ -0,0 +1,246 @@
+"""Сквозной бенчмарк конвейера опроса против локальных моков.
+
+Каждый опрос проходит request_api_answer -> check_response ->
+parse_status -> send_chat_message через настоящие HTTP-запросы к
+MockServer. Для каждого сценария (число работ в ответе, задержка
+сервера) печатаются опросы в секунду, p50/p99 длительности опроса,
+p50 отправки сообщения и память на аккаунт. По умолчанию каждый ответ
+меняет статус одной работы (--no-churn — ответы не меняются).
+
+Запуск из корня репозитория:
+    python benchmarks/harness.py --homeworks 1,100,1000 --latency 0,0.01
+    python benchmarks/harness.py --output bench.json
+    python benchmarks/harness.py --baseline bench.json --tolerance 0.2
+
+С --baseline процесс завершается с кодом 1, если пропускная способность
+какого-либо сценария упала больше чем на tolerance.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+from mock_server import MockServer, make_payload, STATUSES  # noqa: E402
+
+BOT_TOKEN = '1234:abcdefg'
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, fraction):
+    """Перцентиль по отсортированному списку значений."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def parse_list(text, kind):
+    """Список чисел из строки через запятую."""
+    return [kind(item) for item in text.split(',') if item]
+
+
+def start_mock_server(**kwargs):
+    """Запускаем мок и направляем на него бота до импорта модулей бота."""
+    server = MockServer(**kwargs).__enter__()
+    os.environ['PRACTICUM_ENDPOINT'] = server.url
+    os.environ['TELEGRAM_API_URL'] = server.base_url
+    os.environ.setdefault('STATE_BACKEND', 'memory')
+    return server
+
+
+def make_poller(server):
+    """Создаём AccountPoller с общими сессией, кэшем и ботом, как в main."""
+    import telegram
+
+    from accounts import AccountPoller
+    from cache import ResponseCache
+    from session import make_session
+
+    bot = telegram.Bot(token=BOT_TOKEN, base_url=server.bot_url)
+    return AccountPoller(bot, make_session(), ResponseCache())
+
+
+def make_accounts(count):
+    """Аккаунты с разными токенами и числовыми chat_id."""
+    from accounts import Account
+
+    return [Account(f'token{index}', str(index + 1)) for index in range(count)]
+
+
+def set_scenario(server, homeworks, latency, churn):
+    """Переключаем ответы и задержку мока под сценарий."""
+    server.latency = latency
+    if churn:
+        server.set_payloads([
+            make_payload(homeworks, first_status=status)
+            for status in STATUSES
+        ])
+    else:
+        server.set_payload(make_payload(homeworks))
+
+
+def warm_up(poller, accounts):
+    """Первый опрос каждого аккаунта без отправки сообщений.
+
+    Статусы всех работ из ответа считаются уже отправленными, как у
+    давно опрашиваемого аккаунта, и в Телеграм не уходит по сообщению
+    на каждую работу.
+    """
+    poller.send = lambda account, message, callback=None: None
+    try:
+        for account in accounts:
+            poller.poll(account)
+    finally:
+        del poller.send
+
+
+def time_sends(poller, durations):
+    """Замеряем каждую отправку сообщения опросом в durations."""
+    send = poller.send
+
+    def timed_send(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return send(*args, **kwargs)
+        finally:
+            durations.append(time.perf_counter() - started)
+
+    poller.send = timed_send
+
+
+def run_scenario(server, accounts_count, polls, homeworks, latency, churn):
+    """Опрашиваем аккаунты polls раз и собираем длительности опросов.
+
+    Первый опрос каждого аккаунта не замеряется и ничего не отправляет
+    (warm_up). С churn каждый ответ меняет статус одной работы, и каждый
+    замеряемый опрос отправляет одно сообщение; длительность отправок
+    печатается отдельно.
+    """
+    set_scenario(server, homeworks, latency, churn)
+    poller = make_poller(server)
+    accounts = make_accounts(accounts_count)
+    warm_up(poller, accounts)
+    messages_before = server.messages
+    durations = []
+    sends = []
+    time_sends(poller, sends)
+    started = time.perf_counter()
+    for _ in range(polls):
+        for account in accounts:
+            poll_started = time.perf_counter()
+            poller.poll(account)
+            durations.append(time.perf_counter() - poll_started)
+    elapsed = time.perf_counter() - started
+    poller.session.close()
+    return {
+        'homeworks': homeworks,
+        'latency': latency,
+        'polls': len(durations),
+        'messages': server.messages - messages_before,
+        'polls_per_sec': len(durations) / elapsed,
+        'p50_ms': percentile(durations, 0.5) * 1000,
+        'p99_ms': percentile(durations, 0.99) * 1000,
+        'send_p50_ms': percentile(sends, 0.5) * 1000,
+        'send_p99_ms': percentile(sends, 0.99) * 1000,
+    }
+
+
+def measure_memory(server, accounts_count, homeworks):
+    """Память, которую удерживают аккаунты после одного опроса."""
+    set_scenario(server, homeworks, 0, False)
+    poller = make_poller(server)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    accounts = make_accounts(accounts_count)
+    warm_up(poller, accounts)
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    poller.session.close()
+    retained = sum(
+        stat.size_diff for stat in after.compare_to(before, 'filename')
+        if stat.traceback[0].filename.startswith(ROOT_DIR)
+    )
+    del accounts
+    return retained / accounts_count
+
+
+def scenario_key(result):
+    """Ключ сценария для сравнения с базовой линией."""
+    return f"{result['homeworks']}:{result['latency']}"
+
+
+def check_baseline(results, path, tolerance):
+    """Сравниваем с сохранёнными результатами; True — без регрессий."""
+    with open(path, encoding='utf-8') as file:
+        baseline = {scenario_key(item): item for item in json.load(file)}
+    ok = True
+    for result in results:
+        previous = baseline.get(scenario_key(result))
+        if previous is None:
+            continue
+        floor = previous['polls_per_sec'] * (1 - tolerance)
+        if result['polls_per_sec'] < floor:
+            ok = False
+            print(f"РЕГРЕССИЯ {scenario_key(result)}: "
+                  f"{result['polls_per_sec']:.1f} < {floor:.1f} polls/s")
+    return ok
+
+
+def main():
+    """Прогоняем сценарии, печатаем и при необходимости сравниваем."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--accounts', type=int, default=50)
+    parser.add_argument('--polls', type=int, default=4)
+    parser.add_argument('--homeworks', default='1,100,1000')
+    parser.add_argument('--latency', default='0,0.01')
+    parser.add_argument('--churn', action=argparse.BooleanOptionalAction,
+                        default=True,
+                        help='менять статус в каждом ответе (по умолчанию)')
+    parser.add_argument('--output')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    server = start_mock_server()
+    results = []
+    try:
+        for homeworks in parse_list(args.homeworks, int):
+            memory = measure_memory(server, args.accounts, homeworks)
+            for latency in parse_list(args.latency, float):
+                result = run_scenario(
+                    server, args.accounts, args.polls, homeworks, latency,
+                    args.churn
+                )
+                result['memory_per_account'] = memory
+                results.append(result)
+                print(f"homeworks={homeworks:5d} latency={latency:.3f}s "
+                      f"polls/s={result['polls_per_sec']:8.1f} "
+                      f"p50={result['p50_ms']:7.2f}ms "
+                      f"p99={result['p99_ms']:7.2f}ms "
+                      f"messages={result['messages']:5d} "
+                      f"send_p50={result['send_p50_ms']:6.2f}ms "
+                      f"memory/account={memory:9.0f}B")
+    finally:
+        server.__exit__()
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+    if args.baseline and not check_baseline(
+            results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Локальный мок API Практикума и Bot API Телеграма для бенчмарков."""
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+STATUSES = ('approved', 'reviewing', 'rejected')
+
+
+def make_payload(homeworks_count, current_date=None, first_status=None):
+    """Синтетический ответ homework_statuses с заданным числом работ."""
+    homeworks = [
+        {
+            'id': index,
+            'homework_name': f'student__hw{index:05d}.zip',
+            'status': STATUSES[index % len(STATUSES)],
+            'reviewer_comment': 'Всё хорошо.',
+            'lesson_name': f'Урок {index}',
+            'date_updated': '2026-01-01T00:00:00Z',
+        }
+        for index in range(homeworks_count)
+    ]
+    if homeworks and first_status is not None:
+        homeworks[0]['status'] = first_status
+    return {
+        'homeworks': homeworks,
+        'current_date': current_date or int(time.time()),
+    }
+
+
+def sent_message(chat_id, text):
+    """Ответ Bot API на sendMessage, который понимает python-telegram-bot."""
+    return {
+        'ok': True,
+        'result': {
+            'message_id': 1,
+            'date': int(time.time()),
+            'chat': {'id': int(chat_id), 'type': 'private'},
+            'text': text,
+        },
+    }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Отвечает на GET статусов и POST sendMessage с задержкой."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def _reply(self, body):
+        time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.requests += 1
+        self._reply(next(self.server.bodies))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        data = self.rfile.read(length)
+        if self.headers.get('Content-Type', '').startswith(
+                'application/json'):
+            fields = json.loads(data or b'{}')
+        else:
+            fields = dict(parse_qsl(data.decode()))
+        self.server.messages += 1
+        self._reply(json.dumps(sent_message(
+            fields.get('chat_id', 0), fields.get('text', '')
+        )).encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockServer(ThreadingHTTPServer):
+    """Сервер в фоновом потоке; url указывает на эндпоинт статусов.
+
+    С churn=True статус первой работы меняется в каждом ответе, и каждый
+    опрос заканчивается отправкой сообщения.
+    """
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, homeworks_count=1, latency=0.0, churn=False):
+        super().__init__(('127.0.0.1', 0), MockHandler)
+        self.latency = latency
+        self.requests = 0
+        self.messages = 0
+        if churn:
+            self.set_payloads([
+                make_payload(homeworks_count, first_status=status)
+                for status in STATUSES
+            ])
+        else:
+            self.set_payloads([make_payload(homeworks_count)])
+
+    def set_payloads(self, payloads):
+        self.bodies = itertools.cycle(
+            [json.dumps(payload).encode() for payload in payloads]
+        )
+
+    def set_payload(self, payload):
+        self.set_payloads([payload])
+
+    @property
+    def base_url(self):
+        return 'http://{}:{}'.format(*self.server_address)
+
+    @property
+    def url(self):
+        return self.base_url + '/api/user_api/homework_statuses/'
+
+    @property
+    def bot_url(self):
+        """base_url для telegram.Bot: к нему дописывается токен."""
+        return self.base_url + '/bot'
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
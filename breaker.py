@@ -0,0 +1,115 @@
+"""Предохранитель (circuit breaker) для запросов к API Практикума."""
+import logging
+import os
+import threading
+import time
+
+from exceptions import CircuitOpenError
+from metrics import BREAKER_STATE, BREAKER_TRANSITIONS
+
+BREAKER_FAILURES = int(os.getenv('BREAKER_FAILURES', 5))
+BREAKER_RESET_TIMEOUT = float(os.getenv('BREAKER_RESET_TIMEOUT', 60))
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+BREAKER_TRANSITION = 'Предохранитель эндпоинта: {old} -> {new}'
+BREAKER_OPEN = (
+    'Эндпоинт недоступен, запрос пропущен до пробного через {wait:.0f} с'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def log_transition(old, new):
+    """Событие перехода по умолчанию: лог и метрики."""
+    level = logging.WARNING if new == OPEN else logging.INFO
+    logger.log(level, BREAKER_TRANSITION.format(old=old, new=new))
+    BREAKER_STATE.set(STATE_VALUES[new])
+    BREAKER_TRANSITIONS.inc((old, new))
+
+
+class CircuitBreaker:
+    """Общий для всех аккаунтов предохранитель эндпоинта.
+
+    - closed: запросы идут; после failures подряд сбоев — open;
+    - open: запросы не отправляются (CircuitOpenError), пока не пройдёт
+      reset_timeout секунд;
+    - half_open: пропускается один пробный запрос; успех закрывает
+      предохранитель, сбой снова открывает. Если проба не завершилась
+      за reset_timeout, пропускается следующая.
+
+    Сбоем считаются ошибки соединения и ответы 5xx: ошибки одного
+    аккаунта вроде 401 предохранитель не открывают. При каждом переходе
+    вызываются подписчики listener(old, new).
+    """
+
+    def __init__(self, failures=BREAKER_FAILURES,
+                 reset_timeout=BREAKER_RESET_TIMEOUT,
+                 clock=time.monotonic, listeners=(log_transition,)):
+        """Создаём закрытый предохранитель."""
+        self.failures = failures
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.listeners = list(listeners)
+        self.state = CLOSED
+        self.failure_count = 0
+        self.changed_at = 0.0
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def subscribe(self, listener):
+        """Добавляем подписчика на переходы состояний."""
+        self.listeners.append(listener)
+
+    def _move(self, state):
+        old, self.state = self.state, state
+        self.changed_at = self.clock()
+        return old, state
+
+    def _notify(self, transition):
+        if transition is None:
+            return
+        for listener in self.listeners:
+            listener(*transition)
+
+    def before_call(self):
+        """Разрешаем запрос или бросаем CircuitOpenError."""
+        transition = None
+        with self.lock:
+            if self.state == OPEN:
+                wait = self.changed_at + self.reset_timeout - self.clock()
+                if wait > 0:
+                    raise CircuitOpenError(BREAKER_OPEN.format(wait=wait))
+                transition = self._move(HALF_OPEN)
+            elif self.state == HALF_OPEN and self.probing:
+                wait = self.changed_at + self.reset_timeout - self.clock()
+                if wait > 0:
+                    raise CircuitOpenError(BREAKER_OPEN.format(wait=wait))
+                self.changed_at = self.clock()
+            self.probing = self.state == HALF_OPEN
+        self._notify(transition)
+
+    def record_success(self):
+        """Запрос дошёл до API: закрываем предохранитель."""
+        transition = None
+        with self.lock:
+            self.failure_count = 0
+            self.probing = False
+            if self.state != CLOSED:
+                transition = self._move(CLOSED)
+        self._notify(transition)
+
+    def record_failure(self):
+        """Сбой соединения или 5xx: считаем и при необходимости открываем."""
+        transition = None
+        with self.lock:
+            self.failure_count += 1
+            self.probing = False
+            if self.state == HALF_OPEN or (
+                    self.state == CLOSED
+                    and self.failure_count >= self.failures):
+                transition = self._move(OPEN)
+            elif self.state == OPEN:
+                self.changed_at = self.clock()
+        self._notify(transition)
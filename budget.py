@@ -0,0 +1,96 @@
+"""Таймауты запросов к API и бюджет времени на один опрос аккаунта."""
+import logging
+import os
+import time
+
+from exceptions import DeadlineExceeded
+from metrics import BUDGET_EXCEEDED
+
+CONNECT_TIMEOUT = float(os.getenv('CONNECT_TIMEOUT', 5))
+READ_TIMEOUT = float(os.getenv('READ_TIMEOUT', 30))
+POLL_BUDGET = float(os.getenv('POLL_BUDGET', 30))
+READ_CHUNK = 65536
+DEFERRED = 'deferred'
+CANCELLED = 'cancelled'
+BUDGET_SPENT = 'Бюджет опроса исчерпан до запроса (опоздание {late:.1f} с)'
+BUDGET_CANCELLED = 'Запрос отменён: бюджет опроса {budget:.1f} с исчерпан'
+BODY_CANCELLED = (
+    'Чтение ответа прервано: бюджет опроса исчерпан '
+    '(прочитано {size} байт)'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def make_deadline(budget=POLL_BUDGET):
+    """Момент по time.monotonic, к которому опрос должен уложиться.
+
+    Бюджет 0 и меньше отключает ограничение: возвращаем None.
+    """
+    if budget <= 0:
+        return None
+    return time.monotonic() + budget
+
+
+def remaining(deadline):
+    """Остаток бюджета в секундах или DeadlineExceeded, если он исчерпан."""
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded(BUDGET_SPENT.format(late=-left))
+    return left
+
+
+def request_timeout(deadline=None, connect=CONNECT_TIMEOUT,
+                    read=READ_TIMEOUT):
+    """Таймауты (connect, read) запроса, урезанные до остатка бюджета.
+
+    Таймаут чтения в requests ограничивает ожидание каждого блока ответа,
+    а не всё тело, поэтому тело с бюджетом читается по блокам
+    (read_body).
+    """
+    if deadline is None:
+        return connect, read
+    left = remaining(deadline)
+    return min(connect, left), min(read, left)
+
+
+def read_body(response, deadline, chunk_size=READ_CHUNK):
+    """Читаем тело потокового ответа requests, проверяя остаток бюджета.
+
+    Остаток проверяется перед запросом и после каждого блока, поэтому
+    весь запрос превышает бюджет не больше чем на ожидание одного блока
+    (таймаут чтения, уже урезанный до остатка). Прочитанное тело
+    доступно как обычно через content и json(), соединение
+    возвращается в пул. Ответы без iter_content уже прочитаны и
+    возвращаются как есть; при исчерпанном бюджете ответ закрывается
+    и поднимается DeadlineExceeded.
+    """
+    iter_content = getattr(response, 'iter_content', None)
+    if deadline is None or iter_content is None:
+        return response
+    chunks = []
+    size = 0
+    try:
+        for chunk in iter_content(chunk_size):
+            chunks.append(chunk)
+            size += len(chunk)
+            if time.monotonic() >= deadline:
+                raise DeadlineExceeded(BODY_CANCELLED.format(size=size))
+    finally:
+        response.close()
+    response._content = b''.join(chunks)
+    return response
+
+
+def record_cancelled(deadline):
+    """Считаем запрос, прерванный из-за исчерпанного бюджета."""
+    if deadline is None or time.monotonic() < deadline:
+        return False
+    BUDGET_EXCEEDED.inc((CANCELLED,))
+    return True
+
+
+def record_deferred(error):
+    """Считаем опрос, отложенный без запроса из-за исчерпанного бюджета."""
+    BUDGET_EXCEEDED.inc((DEFERRED,))
+    logger.info(error)
@@ -0,0 +1,119 @@
+"""Кэш ответов API статусов: условные запросы и сравнение тела по хэшу."""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 10000))
+CURRENT_DATE = re.compile(rb'"current_date"\s*:\s*(-?\d+)')
+
+
+def body_digest(body):
+    """Хэш тела без current_date и само значение current_date.
+
+    current_date меняется в каждом ответе, поэтому в сравнение тел не
+    входит.
+    """
+    match = CURRENT_DATE.search(body)
+    if match is None:
+        return hashlib.blake2b(body, digest_size=16).digest(), None
+    stripped = body[:match.start()] + body[match.end():]
+    return (
+        hashlib.blake2b(stripped, digest_size=16).digest(), int(match[1])
+    )
+
+
+class CacheEntry:
+    """Валидаторы и разобранный ответ последнего опроса токена."""
+
+    __slots__ = ('etag', 'last_modified', 'digest', 'answer')
+
+    def __init__(self, etag, last_modified, digest, answer):
+        """Запоминаем валидаторы, хэш тела и разобранный ответ."""
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.answer = answer
+
+
+class ResponseCache:
+    """LRU-кэш последнего ответа каждого токена.
+
+    from_date меняется с каждым опросом, поэтому ключ — токен
+    (заголовок Authorization), и на токен хранится одна запись. ETag и
+    Last-Modified последнего ответа уходят в следующий запрос как
+    If-None-Match и If-Modified-Since. Если тело без current_date не
+    изменилось, JSON не разбирается повторно: берётся прошлый ответ с
+    новым current_date. Ответы из кэша общие, изменять их нельзя.
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        """Создаём пустой кэш не более чем на maxsize токенов."""
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def request_headers(self, token, headers):
+        """Заголовки запроса с валидаторами, если они известны."""
+        with self.lock:
+            entry = self.entries.get(token)
+        if entry is None:
+            return headers
+        conditional = dict(headers)
+        if entry.etag is not None:
+            conditional['If-None-Match'] = entry.etag
+        if entry.last_modified is not None:
+            conditional['If-Modified-Since'] = entry.last_modified
+        return conditional
+
+    def not_modified(self, token):
+        """Ответ для 304 Not Modified или None, если токен уже вытеснен."""
+        with self.lock:
+            entry = self.entries.get(token)
+            if entry is None:
+                return None
+            self.hits += 1
+            return entry.answer
+
+    def decode(self, token, body, response_headers, decode):
+        """Разбираем тело ответа, если оно изменилось с прошлого опроса.
+
+        decode вызывается без аргументов и возвращает разобранный ответ.
+        """
+        digest, current_date = body_digest(body)
+        with self.lock:
+            previous = self.entries.get(token)
+        if previous is not None and previous.digest == digest:
+            answer = previous.answer
+            if current_date is not None:
+                answer = {**answer, 'current_date': current_date}
+            with self.lock:
+                self.hits += 1
+        else:
+            answer = decode()
+            with self.lock:
+                self.misses += 1
+        entry = CacheEntry(
+            response_headers.get('ETag'),
+            response_headers.get('Last-Modified'),
+            digest,
+            answer,
+        )
+        with self.lock:
+            self.entries[token] = entry
+            self.entries.move_to_end(token)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return answer
+
+    def stats(self):
+        """Счётчики попаданий и промахов."""
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self.entries),
+            }
@@ -0,0 +1,241 @@
+"""Входящие команды бота: ответы из кэша статусов без запросов к API.
+
+Команды принимаются длинным опросом getUpdates (COMMANDS=polling) или
+вебхуком на локальном порту (COMMANDS=webhook). Ответ собирается из
+статусов, которые уже хранит опрос, поэтому занимает миллисекунды.
+Отвечаем только чатам, для которых есть аккаунт.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from homework import send_chat_message
+from metrics import COMMAND_LATENCY, COMMANDS, count_exception
+
+COMMANDS_MODE = os.getenv('COMMANDS', '')
+HISTORY_SIZE = int(os.getenv('HISTORY_SIZE', 20))
+LONG_POLL_TIMEOUT = int(os.getenv('LONG_POLL_TIMEOUT', 30))
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '127.0.0.1')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 8443))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+RETRY_DELAY = 5.0
+STATUS_EMPTY = 'Статусов работ пока нет'
+STATUS_LINE = '{name}: {status}'
+HISTORY_EMPTY = 'Изменений статусов пока не было'
+HISTORY_LINE = '{when:%d.%m %H:%M} {name}: {status}'
+HELP = (
+    '/status — текущие статусы работ\n'
+    '/history — последние изменения статусов'
+)
+UPDATES_ERROR = 'Сбой получения команд бота: {error}'
+COMMANDS_MODE_ERROR = 'Неизвестный режим команд COMMANDS={mode}'
+COMMANDS_STARTED = 'Команды бота принимаются: {mode}'
+
+logger = logging.getLogger(__name__)
+
+
+class StatusHistory:
+    """Последние size изменений статусов каждого аккаунта."""
+
+    def __init__(self, size=HISTORY_SIZE):
+        """Создаём пустую историю."""
+        self.size = size
+        self.changes = {}
+
+    def record(self, key, name, status, when=None):
+        """Добавляем изменение статуса работы аккаунта key."""
+        changes = self.changes.get(key)
+        if changes is None:
+            changes = self.changes[key] = deque(maxlen=self.size)
+        changes.append((time.time() if when is None else when, name, status))
+
+    def recent(self, key):
+        """Изменения аккаунта от старых к новым."""
+        return list(self.changes.get(key, ()))
+
+
+class CommandHandler:
+    """Ответы на команды по статусам аккаунтов чата."""
+
+    def __init__(self, accounts, history):
+        """Группируем аккаунты по чатам."""
+        self.history = history
+        self.chats = {}
+        for account in accounts:
+            self.chats.setdefault(str(account.chat_id), []).append(account)
+        self.commands = {
+            '/status': self.status,
+            '/history': self.recent,
+            '/start': self.help,
+            '/help': self.help,
+        }
+
+    def handle(self, chat_id, text):
+        """Текст ответа или None, если отвечать не нужно."""
+        accounts = self.chats.get(str(chat_id))
+        if not accounts or not text or not text.startswith('/'):
+            return None
+        command = text.split()[0].split('@')[0]
+        if command not in self.commands:
+            command = '/help'
+        COMMANDS.inc((command,))
+        with COMMAND_LATENCY.time():
+            return self.commands[command](accounts)
+
+    def status(self, accounts):
+        """Текущие статусы работ из кэша опроса."""
+        lines = [
+            STATUS_LINE.format(name=name, status=status)
+            for account in accounts
+            for name, status in sorted(dict(account.statuses).items())
+        ]
+        return '\n'.join(lines) or STATUS_EMPTY
+
+    def recent(self, accounts):
+        """Последние изменения статусов, новые внизу."""
+        changes = sorted(
+            change
+            for account in accounts
+            for change in self.history.recent(account.key)
+        )[-self.history.size:]
+        lines = [
+            HISTORY_LINE.format(
+                when=datetime.fromtimestamp(when), name=name, status=status
+            )
+            for when, name, status in changes
+        ]
+        return '\n'.join(lines) or HISTORY_EMPTY
+
+    def help(self, accounts):
+        """Список команд."""
+        return HELP
+
+
+def answer_update(handler, update):
+    """Пара (chat_id, текст ответа) на обновление Bot API или None."""
+    message = update.get('message') or {}
+    chat_id = (message.get('chat') or {}).get('id')
+    answer = handler.handle(chat_id, message.get('text'))
+    if answer is None:
+        return None
+    return chat_id, answer
+
+
+class CommandListener:
+    """Длинный опрос getUpdates в фоновом потоке."""
+
+    def __init__(self, bot, handler, timeout=LONG_POLL_TIMEOUT):
+        """Запоминаем бота и обработчик команд."""
+        self.bot = bot
+        self.handler = handler
+        self.timeout = timeout
+        self.offset = None
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Запускаем поток опроса."""
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Останавливаем опрос после текущего запроса getUpdates."""
+        self.stopped.set()
+
+    def poll_once(self):
+        """Один запрос getUpdates и ответы на полученные команды."""
+        updates = self.bot.get_updates(
+            offset=self.offset, timeout=self.timeout
+        )
+        for update in updates:
+            self.offset = update.update_id + 1
+            answer = answer_update(self.handler, update.to_dict())
+            if answer is not None:
+                send_chat_message(self.bot, *answer)
+
+    def run(self):
+        """Опрашиваем до остановки; сбои не прерывают поток."""
+        while not self.stopped.is_set():
+            try:
+                self.poll_once()
+            except Exception as error:
+                count_exception(error)
+                logger.error(UPDATES_ERROR.format(error=error))
+                self.stopped.wait(RETRY_DELAY)
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """Принимает обновления Bot API и отвечает sendMessage в теле ответа."""
+
+    def do_POST(self):
+        """Отвечаем на команду из обновления или пустым объектом."""
+        server = self.server
+        if self.path.split('?')[0] != server.path:
+            self.send_error(404)
+            return
+        if server.secret and self.headers.get(SECRET_HEADER) != server.secret:
+            self.send_error(403)
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            update = json.loads(self.rfile.read(length))
+        except ValueError:
+            self.send_error(400)
+            return
+        answer = answer_update(server.handler, update)
+        payload = {}
+        if answer is not None:
+            chat_id, text = answer
+            payload = {'method': 'sendMessage', 'chat_id': chat_id,
+                       'text': text}
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Не пишем каждое обновление в лог бота."""
+
+
+def start_webhook_server(handler, port=WEBHOOK_PORT, host=WEBHOOK_HOST,
+                         path=WEBHOOK_PATH, secret=WEBHOOK_SECRET):
+    """Запускаем приём вебхука в фоновом потоке.
+
+    Адрес вебхука регистрируется в Bot API отдельно (setWebhook), обычно
+    за обратным прокси с TLS.
+    """
+    server = ThreadingHTTPServer((host, int(port)), WebhookHandler)
+    server.daemon_threads = True
+    server.handler = handler
+    server.path = path
+    server.secret = secret
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_commands(bot, handler, mode=COMMANDS_MODE):
+    """Запускаем приём команд в фоновом потоке.
+
+    Возвращает поток опроса или сервер вебхука; None, если команды
+    отключены (COMMANDS не задан).
+    """
+    if not mode:
+        return None
+    if mode == 'polling':
+        receiver = CommandListener(bot, handler).start()
+    elif mode == 'webhook':
+        receiver = start_webhook_server(handler)
+    else:
+        raise ValueError(COMMANDS_MODE_ERROR.format(mode=mode))
+    logger.info(COMMANDS_STARTED.format(mode=mode))
+    return receiver
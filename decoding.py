@@ -0,0 +1,62 @@
+"""Разбор JSON-ответов API: orjson, ujson или стандартный json."""
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+JSON_DECODER = os.getenv('JSON_DECODER', 'auto')
+JSON_DECODER_ERROR = 'Неизвестный декодер JSON: {name}. Доступны: {available}'
+STREAM_FIELDS = frozenset((
+    'homeworks', 'current_date', 'homework_name', 'status', 'code', 'error'
+))
+
+
+def keep_fields(pairs):
+    """Объект JSON только с полями, которые читает бот."""
+    return {key: value for key, value in pairs if key in STREAM_FIELDS}
+
+
+def stream_loads(body):
+    """Разбираем ответ, оставляя только поля из STREAM_FIELDS.
+
+    Каждый объект отбрасывает ненужные поля сразу после разбора, поэтому
+    комментарии ревьюеров, названия уроков и прочее не копятся в памяти
+    вместе со всем ответом: для длинной истории работ остаются только
+    имена, статусы и current_date.
+    """
+    return json.loads(body, object_pairs_hook=keep_fields)
+
+
+DECODERS = {'json': json.loads, 'stream': stream_loads}
+if ujson is not None:
+    DECODERS['ujson'] = ujson.loads
+if orjson is not None:
+    DECODERS['orjson'] = orjson.loads
+
+
+def get_decoder(name=JSON_DECODER):
+    """Функция разбора JSON по имени.
+
+    auto выбирает orjson, если он установлен, затем ujson, иначе json;
+    stream — выборочный разбор stream_loads.
+    """
+    if name == 'auto':
+        name = next(
+            name for name in ('orjson', 'ujson', 'json') if name in DECODERS
+        )
+    if name not in DECODERS:
+        raise ValueError(JSON_DECODER_ERROR.format(
+            name=name, available=', '.join(sorted(DECODERS))
+        ))
+    return DECODERS[name]
+
+
+loads = get_decoder()
@@ -0,0 +1,285 @@
+"""Очередь доставки сообщений в Телеграм с объединением и лимитами."""
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+
+import telegram
+
+from exceptions import SendMessageError
+from homework import send_chat_message
+from metrics import count_exception
+
+DELIVERY_WORKERS = int(os.getenv('DELIVERY_WORKERS', 4))
+COALESCE_WINDOW = float(os.getenv('COALESCE_WINDOW', 2.0))
+GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 30))
+CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+CHAT_BURST = 3
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 1.0
+MESSAGE_LIMIT = 4096
+MESSAGE_SEPARATOR = '\n\n'
+CHAT_BUCKETS_LIMIT = 10000
+DELIVERY_RETRY = (
+    'Повторная отправка в чат {chat_id} через {delay:.1f} с: {error}'
+)
+DELIVERY_DROPPED = (
+    'Сообщения в чат {chat_id} не доставлены после {attempts} попыток: '
+    '{error}'
+)
+CALLBACK_ERROR = 'Сбой обработки итога доставки в чат {chat_id}: {error}'
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Корзина токенов: rate токенов в секунду, не более capacity."""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate, capacity, now):
+        """Создаём полную корзину."""
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now):
+        """Добавляем токены, накопившиеся с прошлого обращения."""
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def wait_time(self, now):
+        """Сколько ждать до появления токена; 0 — токен есть."""
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        """Забираем токен; перед этим wait_time должен вернуть 0."""
+        self.tokens -= 1
+
+    def is_full(self, now):
+        """Корзина полна: её можно забыть без потери лимита."""
+        self.refill(now)
+        return self.tokens >= self.capacity
+
+
+def coalesce(messages, limit=MESSAGE_LIMIT):
+    """Склеиваем сообщения в одно не длиннее limit.
+
+    Возвращает текст и список сообщений, которые не поместились.
+    """
+    text = messages[0][:limit]
+    taken = 1
+    for message in messages[1:]:
+        candidate = text + MESSAGE_SEPARATOR + message
+        if len(candidate) > limit:
+            break
+        text = candidate
+        taken += 1
+    return text, messages[taken:]
+
+
+class DeliveryQueue:
+    """Очередь исходящих сообщений с пулом потоков отправки.
+
+    submit не блокирует опрос: сообщение попадает в список ожидающих
+    для своего чата. Первое сообщение чата планирует отправку через
+    window секунд, всё, что придёт в этот чат до неё, уходит одним
+    сообщением. Перед отправкой берутся токены из общей корзины и
+    корзины чата; при RetryAfter и любых других ошибках отправки
+    сообщения возвращаются в очередь с задержкой, после max_attempts
+    попыток отбрасываются с записью в лог. Итог доставки каждого
+    сообщения передаётся его callback: True — отправлено, False —
+    отброшено.
+    """
+
+    def __init__(self, bot, workers=DELIVERY_WORKERS, window=COALESCE_WINDOW,
+                 global_rate=GLOBAL_RATE, chat_rate=CHAT_RATE,
+                 max_attempts=MAX_ATTEMPTS, send=send_chat_message,
+                 clock=time.monotonic):
+        """Настраиваем очередь; потоки запускает start."""
+        self.bot = bot
+        self.workers = workers
+        self.window = window
+        self.chat_rate = chat_rate
+        self.max_attempts = max_attempts
+        self.send = send
+        self.clock = clock
+        self.global_bucket = TokenBucket(global_rate, global_rate, clock())
+        self.chat_buckets = {}
+        self.pending = {}
+        self.attempts = {}
+        self.ready = []
+        self.scheduled = set()
+        self.in_flight = set()
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.stopping = False
+        self.threads = []
+
+    def start(self):
+        """Запускаем потоки отправки."""
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def submit(self, chat_id, message, callback=None):
+        """Ставим сообщение в очередь, не дожидаясь отправки.
+
+        callback(delivered) вызывается из потока отправки, когда
+        сообщение отправлено или отброшено.
+        """
+        with self.condition:
+            self.pending.setdefault(chat_id, []).append((message, callback))
+            self._schedule(chat_id, self.window)
+
+    def __len__(self):
+        """Число сообщений, ожидающих отправки."""
+        with self.condition:
+            return sum(len(entries) for entries in self.pending.values())
+
+    def _schedule(self, chat_id, delay):
+        if chat_id in self.scheduled or chat_id in self.in_flight:
+            return
+        self.scheduled.add(chat_id)
+        heapq.heappush(
+            self.ready, (self.clock() + delay, next(self.counter), chat_id)
+        )
+        self.condition.notify()
+
+    def _rate_wait(self, chat_id, now):
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, CHAT_BURST, now)
+            self.chat_buckets[chat_id] = bucket
+        wait = max(
+            bucket.wait_time(now), self.global_bucket.wait_time(now)
+        )
+        if wait == 0:
+            bucket.consume()
+            self.global_bucket.consume()
+        return wait
+
+    def _take(self):
+        with self.condition:
+            while True:
+                if not self.ready:
+                    if self.stopping:
+                        return None
+                    self.condition.wait()
+                    continue
+                due, _, chat_id = self.ready[0]
+                now = self.clock()
+                if due > now:
+                    self.condition.wait(due - now)
+                    continue
+                wait = self._rate_wait(chat_id, now)
+                heapq.heappop(self.ready)
+                if wait:
+                    heapq.heappush(
+                        self.ready, (now + wait, next(self.counter), chat_id)
+                    )
+                    continue
+                self.scheduled.discard(chat_id)
+                self.in_flight.add(chat_id)
+                return chat_id, self.pending.pop(chat_id)
+
+    def _work(self):
+        while True:
+            item = self._take()
+            if item is None:
+                return
+            self._deliver(*item)
+
+    def _deliver(self, chat_id, entries):
+        text, rest = coalesce([message for message, _ in entries])
+        sent = entries[:len(entries) - len(rest)]
+        try:
+            self.send(self.bot, chat_id, text)
+        except Exception as error:
+            if not isinstance(error, SendMessageError):
+                count_exception(error)
+            self._retry(chat_id, entries, error)
+            return
+        self._release(chat_id, entries[len(sent):], 0)
+        self._confirm(chat_id, sent, True)
+
+    def _confirm(self, chat_id, entries, delivered):
+        for _, callback in entries:
+            if callback is None:
+                continue
+            try:
+                callback(delivered)
+            except Exception as error:
+                count_exception(error)
+                logger.exception(CALLBACK_ERROR.format(
+                    chat_id=chat_id, error=error
+                ))
+
+    def _retry(self, chat_id, entries, error):
+        attempts = self.attempts.get(chat_id, 0) + 1
+        if attempts >= self.max_attempts:
+            logger.critical(DELIVERY_DROPPED.format(
+                chat_id=chat_id, attempts=attempts, error=error
+            ))
+            self._release(chat_id, [], 0)
+            self._confirm(chat_id, entries, False)
+            return
+        cause = error.__cause__
+        if isinstance(cause, telegram.error.RetryAfter):
+            delay = float(cause.retry_after)
+        else:
+            delay = RETRY_DELAY * 2 ** (attempts - 1)
+        logger.warning(DELIVERY_RETRY.format(
+            chat_id=chat_id, delay=delay, error=error
+        ))
+        self._release(chat_id, entries, delay, attempts)
+
+    def _release(self, chat_id, entries, delay, attempts=0):
+        with self.condition:
+            self.in_flight.discard(chat_id)
+            if attempts:
+                self.attempts[chat_id] = attempts
+            else:
+                self.attempts.pop(chat_id, None)
+            if entries:
+                self.pending[chat_id] = (
+                    entries + self.pending.get(chat_id, [])
+                )
+            if chat_id in self.pending:
+                self._schedule(chat_id, delay)
+            if len(self.chat_buckets) > CHAT_BUCKETS_LIMIT:
+                self._forget_idle_buckets()
+
+    def _forget_idle_buckets(self):
+        now = self.clock()
+        for chat_id in list(self.chat_buckets):
+            if chat_id not in self.pending and (
+                    self.chat_buckets[chat_id].is_full(now)):
+                del self.chat_buckets[chat_id]
+
+    def stop(self, timeout=None):
+        """Отправляем всё, что в очереди, и останавливаем потоки.
+
+        Окно объединения при остановке не выдерживается.
+        """
+        with self.condition:
+            self.stopping = True
+            now = self.clock()
+            self.ready = [
+                (min(due, now), index, chat_id)
+                for due, index, chat_id in self.ready
+            ]
+            heapq.heapify(self.ready)
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join(timeout)
@@ -0,0 +1,20 @@
+"""Поиск изменившихся статусов среди всех работ ответа API."""
+
+
+def diff_homeworks(statuses, homeworks):
+    """Работы, статус которых отличается от индекса statuses.
+
+    statuses — словарь {homework_name: status} последних отправленных
+    статусов. Один проход по списку, на каждую работу один поиск в
+    словаре. API отдаёт работы от новых к старым, поэтому возвращаем их
+    в обратном порядке: уведомления придут в хронологическом. Работы без
+    нужных ключей тоже попадают в результат, чтобы parse_status сообщил
+    об ошибке.
+    """
+    changed = []
+    for homework in reversed(homeworks):
+        name = homework.get('homework_name')
+        status = homework.get('status')
+        if name is None or status is None or statuses.get(name) != status:
+            changed.append(homework)
+    return changed
@@ -14,3 +14,15 @@ class SendMessageError(Exception):
     """Класс исключения при отправке сообщения через Телеграм."""
 
     pass
+
+
+class CircuitOpenError(ConnectionError):
+    """Класс исключения при открытом предохранителе эндпоинта API."""
+
+    pass
+
+
+class DeadlineExceeded(TimeoutError):
+    """Класс исключения при исчерпанном бюджете времени на опрос."""
+
+    pass
@@ -0,0 +1,70 @@
+"""Опрос аккаунтов пулом потоков на синхронном стеке requests.
+
+Запросы к API почти всё время ждут сеть, поэтому потоки опрашивают
+аккаунты параллельно и без asyncio. Одновременно выполняется не больше
+MAX_IN_FLIGHT опросов (по умолчанию по числу потоков POLL_WORKERS),
+результаты забираются в порядке завершения, а исключение одного опроса
+не прерывает остальные.
+"""
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+
+from metrics import count_exception
+
+POLL_WORKERS = int(os.getenv('POLL_WORKERS', 1))
+MAX_IN_FLIGHT = int(os.getenv('MAX_IN_FLIGHT', 0))
+THREAD_PREFIX = 'poll'
+POLL_CRASHED = 'Опрос {item!r} прерван ошибкой: {error}'
+
+logger = logging.getLogger(__name__)
+
+
+def in_flight_limit(workers, max_in_flight=MAX_IN_FLIGHT):
+    """Предел одновременных опросов: 0 — по числу потоков."""
+    return max(1, max_in_flight or workers)
+
+
+def make_executor(workers=POLL_WORKERS):
+    """Пул потоков опроса."""
+    return ThreadPoolExecutor(
+        max_workers=max(1, workers), thread_name_prefix=THREAD_PREFIX
+    )
+
+
+def outcome(future, item):
+    """Пара (результат, исключение) завершённого опроса item.
+
+    Исключение считается в метриках и пишется в лог с трассировкой.
+    """
+    error = future.exception()
+    if error is None:
+        return future.result(), None
+    count_exception(error)
+    logger.error(POLL_CRASHED.format(item=item, error=error), exc_info=error)
+    return None, error
+
+
+def fan_out(function, items, workers=POLL_WORKERS,
+            max_in_flight=MAX_IN_FLIGHT):
+    """Вызываем function(item) для всех items пулом потоков.
+
+    Отдаёт тройки (item, результат, исключение) в порядке завершения.
+    Новые вызовы ставятся в пул по мере завершения прежних, так что в
+    работе не больше max_in_flight вызовов, а items читаются лениво.
+    """
+    items = iter(items)
+    limit = in_flight_limit(workers, max_in_flight)
+    with make_executor(workers) as executor:
+        pending = {
+            executor.submit(function, item): item
+            for item in islice(items, limit)
+        }
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                for following in islice(items, 1):
+                    pending[executor.submit(function, following)] = following
+                yield (item, *outcome(future, item))
@@ -5,22 +5,56 @@ import os
 import sys
 import time
 
-from dotenv import load_dotenv
-import requests
-import telegram
-
+import decoding
+from alerts import ErrorAggregator
+from budget import read_body, record_cancelled, request_timeout
+from diff import diff_homeworks
+from logs import make_formatter, make_handlers
 from exceptions import (
+    DeadlineExceeded,
     ResponceError,
     SendMessageError,
 )
+from metrics import (
+    HTTP_RESPONSES,
+    MESSAGES,
+    POLL_LATENCY,
+    count_exception,
+    start_metrics_server,
+)
+from scheduling import AdaptivePolicy, PollActivity
+from state import account_key, open_state_backend
+from tracing import install_profiler, span
+
+
+def load_environment():
+    """Подгружаем переменные окружения из .env.
+
+    Файл ищется в текущем каталоге и рядом с модулем; без него dotenv не
+    импортируется.
+    """
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    for directory in (os.getcwd(), module_dir):
+        path = os.path.join(directory, '.env')
+        if os.path.isfile(path):
+            from dotenv import load_dotenv
+            load_dotenv(path)
+            return
+
 
-load_dotenv()
+load_environment()
 PRACTICUM_TOKEN = os.getenv('TOKEN_YP')
 TELEGRAM_TOKEN = os.getenv('TOKEN_BOT_TG')
 TELEGRAM_CHAT_ID = os.getenv('TG_CHAT_ID')
 
 RETRY_PERIOD = 600
-ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
+EXIT_NO_CHANGES = 0
+EXIT_ERROR = 1
+EXIT_CHANGES_SENT = 3
+ENDPOINT = os.getenv(
+    'PRACTICUM_ENDPOINT',
+    'https://practicum.yandex.ru/api/user_api/homework_statuses/'
+)
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 HOMEWORK_VERDICTS = {
     'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
@@ -64,9 +98,14 @@ CHECK_STATUS_UNDEFINED = (
 STATUS_DEBUG = 'Статус домашней работы не изменился.'
 HOMEWORK_NOT_SUBMITTED = 'Домашняя работа на проверку не отправлена.'
 EXCEPTION_MESSAGE = 'Сбой в работе программы: {error}'
+ERROR_DIGEST = '{name} x{count} за последние {minutes:g} мин'
 EXCEPTION_MESSAGE_NOT_SUBMITTED = (
     'Сообщение в телеграм чат не отправлено. {error}'
 )
+LOG_FORMAT = (
+    '%(asctime)s, %(levelname)s, Функция: %(funcName)s, '
+    'Строка: %(lineno)d, %(message)s.'
+)
 logger = logging.getLogger(__name__)
 
 
@@ -79,38 +118,79 @@ def check_tokens():
     logger.info(TOKEN_VALID)
 
 
-def send_message(bot, message):
-    """Отправляем сообщение в телеграмм."""
+def make_headers(token):
+    """Формируем заголовки запроса к API с токеном Практикума."""
+    return {'Authorization': f'OAuth {token}'}
+
+
+class LazyBot:
+    """Бот, который создаётся при первом обращении.
+
+    Пока сообщений нет, python-telegram-bot не импортируется: разовый
+    опрос без изменений обходится без него.
+    """
+
+    def __init__(self, token, pool_size=1):
+        """Запоминаем токен бота и размер пула соединений."""
+        self.token = token
+        self.pool_size = pool_size
+        self.bot = None
+
+    def __getattr__(self, name):
+        """Создаём бота и отдаём его атрибут."""
+        if self.bot is None:
+            self.bot = make_bot(self.token, self.pool_size)
+        return getattr(self.bot, name)
+
+
+def make_bot(token, pool_size=1, **kwargs):
+    """Бот с пулом из pool_size соединений к Bot API.
+
+    По умолчанию python-telegram-bot держит одно соединение, и отправка
+    из нескольких потоков открывает и выбрасывает лишние.
+    """
+    import telegram
+    from telegram.utils.request import Request
+    return telegram.Bot(
+        token=token, request=Request(con_pool_size=pool_size), **kwargs
+    )
+
+
+def send_chat_message(bot, chat_id, message):
+    """Отправляем сообщение в указанный чат телеграм."""
+    import telegram
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, message)
+        bot.send_message(chat_id, message)
+        MESSAGES.inc(('sent',))
         logger.debug(DEBUG_SEND_MESSAGE.format(message=message))
     except telegram.TelegramError as error:
+        MESSAGES.inc(('failed',))
         logger.exception(
             ERROR_SEND_MESSAGE.format(message=message, error=error)
         )
         raise SendMessageError(
             ERROR_SEND_MESSAGE.format(message=message, error=error)
-        )
+        ) from error
 
 
-def get_api_answer(timestamp):
-    """Отправляем запрос к endpoint API Yandex.Practicum."""
-    payload = {'from_date': timestamp}
-    response_check = {'code': None, 'error': None}
-    request_parameters = dict(url=ENDPOINT, headers=HEADERS, params=payload)
-    try:
-        response = requests.get(**request_parameters)
-    except requests.exceptions.RequestException as error:
-        raise ConnectionError(
-            ENDPOINT_RESPONSE_ERROR.format(error=error, **request_parameters)
-        )
-    if response.status_code != HTTPStatus.OK:
+def send_message(bot, message):
+    """Отправляем сообщение в телеграмм."""
+    send_chat_message(bot, TELEGRAM_CHAT_ID, message)
+
+
+def check_status_code(status_code, request_parameters):
+    """Проверяем код ответа эндпоинта."""
+    if status_code != HTTPStatus.OK:
         raise ResponceError(
             ENDPOINT_REQUEST_CODE_ERROR.format(
-                code=response.status_code, **request_parameters
+                code=status_code, **request_parameters
             )
         )
-    response = response.json()
+
+
+def check_api_error(response, request_parameters):
+    """Проверяем, что в теле ответа нет описания ошибки API."""
+    response_check = {'code': None, 'error': None}
     for key in response_check:
         if key in response:
             response_check[key] = response[key]
@@ -125,6 +205,112 @@ def get_api_answer(timestamp):
     return response
 
 
+def send_request(http, request_parameters, breaker=None, deadline=None):
+    """Отправляем GET к API, сообщая предохранителю об исходе.
+
+    Сбоем для предохранителя считаются ошибки соединения и ответы 5xx.
+    С бюджетом опроса deadline тело читается по блокам (budget.read_body);
+    таймаут или тело, не дочитанное до исчерпания бюджета, считаются
+    отменой.
+    """
+    import requests
+    if breaker is not None:
+        breaker.before_call()
+    with POLL_LATENCY.time():
+        try:
+            response = read_body(http.get(**request_parameters), deadline)
+        except (
+            requests.exceptions.RequestException, DeadlineExceeded
+        ) as error:
+            if breaker is not None:
+                breaker.record_failure()
+            if isinstance(error, (
+                requests.exceptions.Timeout, DeadlineExceeded
+            )):
+                record_cancelled(deadline)
+            raise ConnectionError(ENDPOINT_RESPONSE_ERROR.format(
+                error=error, **request_parameters
+            ))
+    HTTP_RESPONSES.inc((int(response.status_code),))
+    if breaker is not None:
+        if response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+    return response
+
+
+def request_api_answer(timestamp, headers, session=None, cache=None,
+                       breaker=None, deadline=None):
+    """Запрашиваем статусы работ с заданными заголовками авторизации.
+
+    Все аргументы, кроме timestamp и headers, необязательны: без них
+    запрос идёт напрямую через requests.
+    """
+    import requests
+    payload = {'from_date': timestamp}
+    request_parameters = dict(
+        url=ENDPOINT, headers=headers, params=payload,
+        timeout=request_timeout(deadline)
+    )
+    if deadline is not None:
+        request_parameters['stream'] = True
+    http = requests if session is None else session
+    if cache is not None:
+        key = headers['Authorization']
+        request_parameters['headers'] = cache.request_headers(key, headers)
+    with span('network'):
+        response = send_request(http, request_parameters, breaker, deadline)
+    if cache is None:
+        check_status_code(response.status_code, request_parameters)
+        with span('json'):
+            return check_api_error(response.json(), request_parameters)
+    if response.status_code == HTTPStatus.NOT_MODIFIED:
+        answer = cache.not_modified(key)
+        if answer is not None:
+            return answer
+    check_status_code(response.status_code, request_parameters)
+    with span('json'):
+        return cache.decode(
+            key, response.content, response.headers,
+            lambda: check_api_error(
+                decoding.loads(response.content), request_parameters
+            )
+        )
+
+
+def get_api_answer(timestamp):
+    """Отправляем запрос к endpoint API Yandex.Practicum."""
+    return request_api_answer(timestamp, HEADERS)
+
+
+def configure_logging(log_file):
+    """Настраиваем логирование в ротируемый файл и stdout.
+
+    LOG_MODE=queue переносит запись в фоновый поток, LOG_STYLE=json
+    включает JSON-строки, а LOG_SAMPLE_EVERY=N оставляет каждое N-е
+    сообщение о неизменившихся и неотправленных работах аккаунта.
+    """
+    formatter = make_formatter(LOG_FORMAT)
+    handlers = [
+        RotatingFileHandler(
+            log_file,
+            maxBytes=50000000,
+            backupCount=5,
+            encoding='utf-8'
+        ),
+        logging.StreamHandler(sys.stdout)
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    logging.basicConfig(
+        level=logging.DEBUG,
+        handlers=make_handlers(
+            handlers, sampled=(STATUS_DEBUG, HOMEWORK_NOT_SUBMITTED)
+        )
+    )
+
+
 def check_response(response):
     """Проверяем ответ от эндпоинт API на соответствие документации."""
     if not isinstance(response, dict):
@@ -157,56 +343,145 @@ def parse_status(homework):
     )
 
 
-def main():
-    """Основная логика работы бота."""
+def notify_homeworks(bot, homeworks, statuses, state, account):
+    """Отправляем по сообщению на каждую работу с изменившимся статусом.
+
+    Возвращает число отправленных сообщений. Последний отправленный
+    статус сохраняется в хранилище состояния, поэтому после перезапуска
+    повторных уведомлений нет.
+    """
+    changed = diff_homeworks(statuses, homeworks)
+    if not changed:
+        logger.debug(STATUS_DEBUG)
+    for homework in changed:
+        with span('parse_status'):
+            message = parse_status(homework)
+        with span('send_message'):
+            send_message(bot, message)
+        name, status = homework['homework_name'], homework['status']
+        statuses[name] = status
+        state.save_status(account, name, status)
+    return len(changed)
+
+
+def notify(bot, message):
+    """Отправляем служебное сообщение, не прерывая цикл при сбое."""
+    try:
+        send_message(bot, message)
+    except Exception as error:
+        count_exception(error)
+        logger.critical(EXCEPTION_MESSAGE_NOT_SUBMITTED.format(error=error))
+
+
+def report_error(bot, error, errors):
+    """Логируем ошибку и отправляем её в чат, если она новая.
+
+    Повторы в окне агрегатора errors не отправляются, а попадают в
+    дайджест.
+    """
+    message = EXCEPTION_MESSAGE.format(error=error)
+    logger.error(message)
+    count_exception(error)
+    if errors.admit(error):
+        notify(bot, message)
+
+
+def send_digests(bot, errors):
+    """Отправляем сводки по повторявшимся ошибкам."""
+    for _, name, count, minutes in errors.digests():
+        notify(bot, ERROR_DIGEST.format(
+            name=name, count=count, minutes=minutes
+        ))
+
+
+def load_cursor(state, account):
+    """Курсор и отправленные статусы аккаунта; без курсора — сейчас."""
+    timestamp, statuses = state.load(account)
+    if timestamp is None:
+        timestamp = int(time.time())
+    return timestamp, statuses
+
+
+def poll_cycle(bot, state, account, timestamp, statuses):
+    """Один цикл опроса: запрос, проверка, уведомления и курсор.
+
+    Возвращает новый курсор и число отправленных сообщений.
+    """
+    with span('get_api_answer'):
+        response = get_api_answer(timestamp - RETRY_PERIOD)
+    with span('check_response'):
+        homeworks = check_response(response)
+    changed = 0
+    if homeworks:
+        changed = notify_homeworks(bot, homeworks, statuses, state, account)
+    else:
+        logger.debug(HOMEWORK_NOT_SUBMITTED)
+    timestamp = response['current_date']
+    state.save_cursor(account, timestamp)
+    return timestamp, changed
+
+
+def run_once():
+    """Разовый опрос (--once) для запуска по расписанию.
+
+    Курсор и статусы читаются из хранилища и сохраняются в него, бот
+    создаётся только при отправке сообщения. Окна агрегации ошибок тоже
+    хранятся там: повтор ошибки в следующих запусках не отправляется, а
+    попадает в дайджест. Возвращает код выхода: EXIT_NO_CHANGES,
+    EXIT_CHANGES_SENT или EXIT_ERROR.
+    """
     check_tokens()
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    timestamp = int(time.time())
-    last_message = ''
-    last_error_message = ''
-    while True:
+    bot = LazyBot(TELEGRAM_TOKEN)
+    state = open_state_backend()
+    account = account_key(PRACTICUM_TOKEN)
+    try:
+        errors = ErrorAggregator(clock=time.time, store=state)
+        timestamp, statuses = load_cursor(state, account)
         try:
-            response = get_api_answer(timestamp - RETRY_PERIOD)
-            homeworks = check_response(response)
-            if homeworks:
-                message = parse_status(homeworks[0])
-                if message != last_message:
-                    send_message(bot, message)
-                    last_message = message
-                else:
-                    logger.debug(STATUS_DEBUG)
-            else:
-                logger.debug(HOMEWORK_NOT_SUBMITTED)
-            timestamp = response['current_date']
+            _, changed = poll_cycle(bot, state, account, timestamp, statuses)
         except Exception as error:
-            message = EXCEPTION_MESSAGE.format(error=error)
-            logger.error(message)
-            if message != last_error_message:
-                try:
-                    send_message(bot, message)
-                    last_error_message = message
-                except Exception as error_message:
-                    logger.critical(EXCEPTION_MESSAGE_NOT_SUBMITTED.format(
-                        error=error_message
-                    ))
+            report_error(bot, error, errors)
+            return EXIT_ERROR
         finally:
-            time.sleep(RETRY_PERIOD)
+            send_digests(bot, errors)
+    finally:
+        state.close()
+    return EXIT_CHANGES_SENT if changed else EXIT_NO_CHANGES
 
 
-if __name__ == '__main__':
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format=('%(asctime)s, %(levelname)s, Функция: %(funcName)s, '
-                'Строка: %(lineno)d, %(message)s.'),
-        handlers=[
-            RotatingFileHandler(
-                __file__ + '.log',
-                maxBytes=50000000,
-                backupCount=5,
-                encoding='utf-8'
-            ),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+def main():
+    """Основная логика работы бота."""
+    import telegram
+    check_tokens()
+    bot = telegram.Bot(token=TELEGRAM_TOKEN)
+    start_metrics_server()
+    state = open_state_backend()
+    account = account_key(PRACTICUM_TOKEN)
+    timestamp, statuses = load_cursor(state, account)
+    errors = ErrorAggregator()
+    policy = AdaptivePolicy(RETRY_PERIOD)
+    activity = PollActivity()
+    delay = RETRY_PERIOD
+    try:
+        while True:
+            try:
+                timestamp, changed = poll_cycle(
+                    bot, state, account, timestamp, statuses
+                )
+                delay = policy.after_success(activity, changed, statuses)
+            except Exception as error:
+                report_error(bot, error, errors)
+                delay = policy.after_failure(activity)
+            finally:
+                send_digests(bot, errors)
+                time.sleep(delay)
+    finally:
+        state.close()
 
+
+if __name__ == '__main__':
+    configure_logging(__file__ + '.log')
+    if '--once' in sys.argv[1:]:
+        sys.exit(run_once())
+    install_profiler()
     main()
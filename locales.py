@@ -0,0 +1,153 @@
+"""Шаблоны сообщений пользователям на разных языках.
+
+Шаблоны компилируются один раз при запуске: все поля, кроме одного
+изменяемого, подставляются заранее, и сообщение собирается одной
+склейкой строк. Локаль задаётся для чата (поле locale в файле
+аккаунтов), по умолчанию — LOCALE.
+"""
+import json
+import os
+from functools import lru_cache
+
+from homework import (
+    ERROR_DIGEST,
+    EXCEPTION_MESSAGE,
+    HOMEWORK_VERDICTS,
+    VERDICT,
+)
+
+LOCALE = os.getenv('LOCALE', 'ru')
+LOCALES_FILE = os.getenv('LOCALES_FILE')
+RENDER_CACHE_SIZE = int(os.getenv('RENDER_CACHE_SIZE', 4096))
+LOCALE_ERROR = 'Локаль по умолчанию {locale} не описана'
+LOCALES = {
+    'ru': {
+        'verdict': VERDICT,
+        'verdicts': HOMEWORK_VERDICTS,
+        'exception': EXCEPTION_MESSAGE,
+        'digest': ERROR_DIGEST,
+    },
+    'en': {
+        'verdict': (
+            'Homework "{homework_name}" review status changed: '
+            '"{status}". {verdict}'
+        ),
+        'verdicts': {
+            'approved': 'Reviewed: the reviewer liked everything. Hooray!',
+            'reviewing': 'The reviewer has started reviewing the homework.',
+            'rejected': 'Reviewed: the reviewer left comments.',
+        },
+        'exception': 'Program failure: {error}',
+        'digest': '{name} x{count} in last {minutes:g} min',
+    },
+}
+
+
+class CompiledTemplate:
+    """Шаблон str.format с одним изменяемым полем.
+
+    Остальные поля подставлены при компиляции. Если изменяемое поле
+    встречается в шаблоне не ровно один раз, остаётся обычный format.
+    """
+
+    __slots__ = ('prefix', 'suffix', 'template', 'field', 'values')
+
+    def __init__(self, template, field, **values):
+        """Подставляем values и делим шаблон по полю field."""
+        parts = template.split('{' + field + '}')
+        self.template = None if len(parts) == 2 else template
+        self.field = field
+        self.values = values
+        if self.template is None:
+            self.prefix, self.suffix = (
+                part.format(**values) for part in parts
+            )
+
+    def render(self, value):
+        """Сообщение с подставленным значением поля."""
+        if self.template is not None:
+            return self.template.format(**self.values, **{self.field: value})
+        return f'{self.prefix}{value}{self.suffix}'
+
+
+def load_locales(path=LOCALES_FILE, locales=LOCALES):
+    """Встроенные локали, дополненные локалями из JSON-файла path."""
+    merged = {locale: dict(templates) for locale, templates in locales.items()}
+    if path is None:
+        return merged
+    with open(path, encoding='utf-8') as file:
+        for locale, templates in json.load(file).items():
+            merged.setdefault(locale, {}).update(templates)
+    return merged
+
+
+class TemplateRegistry:
+    """Скомпилированные шаблоны всех локалей.
+
+    Если в локали нет шаблона или вердикта для статуса, используется
+    локаль по умолчанию.
+    """
+
+    def __init__(self, locales=None, default=LOCALE):
+        """Компилируем шаблоны всех локалей."""
+        if locales is None:
+            locales = load_locales()
+        if default not in locales:
+            raise ValueError(LOCALE_ERROR.format(locale=default))
+        self.default = default
+        self.statuses = {}
+        self.errors = {}
+        self.digests = {}
+        fallback = locales[default]
+        for locale, templates in locales.items():
+            verdict = templates.get('verdict', fallback['verdict'])
+            verdicts = {
+                **fallback['verdicts'], **templates.get('verdicts', {})
+            }
+            for status, text in verdicts.items():
+                self.statuses[locale, status] = CompiledTemplate(
+                    verdict, 'homework_name', status=status, verdict=text
+                )
+            self.errors[locale] = CompiledTemplate(
+                templates.get('exception', fallback['exception']), 'error'
+            )
+            self.digests[locale] = templates.get(
+                'digest', fallback['digest']
+            )
+
+    def locales(self):
+        """Имена описанных локалей."""
+        return sorted(self.errors)
+
+    def status(self, name, status, locale):
+        """Сообщение об изменении статуса работы."""
+        template = self.statuses.get((locale, status))
+        if template is None:
+            template = self.statuses[self.default, status]
+        return template.render(name)
+
+    def error(self, error, locale):
+        """Сообщение о сбое в работе программы."""
+        template = self.errors.get(locale)
+        if template is None:
+            template = self.errors[self.default]
+        return template.render(error)
+
+    def digest(self, name, count, minutes, locale):
+        """Сводка о повторах ошибки за окно агрегации."""
+        template = self.digests.get(locale, self.digests[self.default])
+        return template.format(name=name, count=count, minutes=minutes)
+
+
+TEMPLATES = TemplateRegistry()
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def render_status(name, status, locale=LOCALE):
+    """Сообщение о статусе работы из ограниченного LRU-кэша.
+
+    Вызывается только перед отправкой: в цикле опроса изменения остаются
+    парами (homework_name, status), а одинаковые пары у разных опросов
+    берут готовую строку из кэша.
+    """
+    return TEMPLATES.status(name, status, locale)
@@ -0,0 +1,156 @@
+"""Неблокирующее логирование через очередь, JSON-строки и сэмплирование."""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, RotatingFileHandler
+
+LOG_MODE = os.getenv('LOG_MODE', 'sync')
+LOG_STYLE = os.getenv('LOG_STYLE', 'text')
+LOG_SAMPLE_EVERY = int(os.getenv('LOG_SAMPLE_EVERY', 1))
+LOG_BATCH_SIZE = int(os.getenv('LOG_BATCH_SIZE', 256))
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись лога — одна строка JSON."""
+
+    def format(self, record):
+        """Сериализуем запись с местом вызова и аккаунтом, если он есть."""
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'function': record.funcName,
+            'line': record.lineno,
+            'message': record.getMessage(),
+        }
+        account = getattr(record, 'account', None)
+        if account is not None:
+            entry['account'] = account
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SampleFilter(logging.Filter):
+    """Пропускает каждое every-е повторяющееся DEBUG-сообщение аккаунта.
+
+    Аккаунт берётся из атрибута записи account (extra={'account': ...});
+    записи без него считаются записями одного аккаунта.
+    """
+
+    def __init__(self, messages, every=LOG_SAMPLE_EVERY):
+        """Запоминаем сэмплируемые шаблоны сообщений."""
+        super().__init__()
+        self.messages = frozenset(messages)
+        self.every = every
+        self.counts = {}
+
+    def filter(self, record):
+        """True, если запись нужно записать."""
+        if record.levelno != logging.DEBUG or record.msg not in self.messages:
+            return True
+        key = (getattr(record, 'account', None), record.msg)
+        count = self.counts.get(key, 0)
+        self.counts[key] = count + 1
+        return count % self.every == 0
+
+
+def write_batch(handler, records):
+    """Пишем пачку записей в поток обработчика и сбрасываем его один раз.
+
+    Обработчики без потока получают записи по одной.
+    """
+    records = [record for record in records if record.levelno >= handler.level]
+    if not records:
+        return
+    if not isinstance(handler, logging.StreamHandler):
+        for record in records:
+            handler.handle(record)
+        return
+    handler.acquire()
+    try:
+        for record in records:
+            if isinstance(handler, RotatingFileHandler) and (
+                    handler.shouldRollover(record)):
+                handler.doRollover()
+            handler.stream.write(handler.format(record) + handler.terminator)
+        handler.flush()
+    except Exception:
+        handler.handleError(records[-1])
+    finally:
+        handler.release()
+
+
+class LogListener:
+    """Фоновый поток, забирающий записи из очереди пачками."""
+
+    def __init__(self, records, handlers, batch_size=LOG_BATCH_SIZE):
+        """Запоминаем очередь и конечные обработчики."""
+        self.records = records
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.thread = None
+
+    def start(self):
+        """Запускаем поток записи."""
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Дописываем оставшиеся записи и останавливаем поток."""
+        if self.thread is None:
+            return
+        self.records.put(None)
+        self.thread.join()
+        self.thread = None
+
+    def drain(self):
+        """Ждём первую запись и добираем всё, что уже есть в очереди."""
+        batch = [self.records.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.records.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        """Пишем пачки, пока не встретим маркер остановки None."""
+        while True:
+            batch = self.drain()
+            records = [record for record in batch if record is not None]
+            for handler in self.handlers:
+                write_batch(handler, records)
+            if len(records) != len(batch):
+                return
+
+
+def make_formatter(log_format, style=LOG_STYLE):
+    """Текстовый форматтер с log_format или JSON при style='json'."""
+    if style == 'json':
+        return JsonFormatter()
+    return logging.Formatter(log_format)
+
+
+def make_handlers(handlers, sampled=(), mode=LOG_MODE,
+                  sample_every=LOG_SAMPLE_EVERY):
+    """Обработчики для корневого логгера.
+
+    В режиме queue поток опроса только кладёт запись в очередь, а в файл
+    и stdout её пишет LogListener. Сэмплирование отсекает запись до
+    очереди, поэтому пропущенные сообщения ничего не стоят.
+    """
+    if mode == 'queue':
+        records = queue.SimpleQueue()
+        atexit.register(LogListener(records, handlers).start().stop)
+        queue_handler = QueueHandler(records)
+        queue_handler.setFormatter(logging.Formatter())
+        handlers = [queue_handler]
+    if sampled and sample_every > 1:
+        for handler in handlers:
+            handler.addFilter(SampleFilter(sampled, sample_every))
+    return handlers
@@ -0,0 +1,266 @@
+"""Метрики бота в формате Prometheus и локальный HTTP-эндпоинт для них."""
+import bisect
+import os
+import threading
+import time
+
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = os.getenv('METRICS_PORT')
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def format_labels(names, values):
+    """Метки в синтаксисе Prometheus: {name="value",...}."""
+    if not names:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('"', '\\"'))
+        for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+class Metric:
+    """Общая часть метрик: имя, описание, имена меток и блокировка."""
+
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labels=()):
+        """Создаём метрику без значений."""
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def render(self):
+        """Строки метрики в текстовом формате Prometheus."""
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+        with self.lock:
+            values = sorted(self.values.items())
+        for labels, value in values:
+            lines.extend(self.render_value(labels, value))
+        return lines
+
+    def render_value(self, labels, value):
+        """Строки одного набора меток."""
+        return [f'{self.name}{format_labels(self.labels, labels)} {value}']
+
+
+class Counter(Metric):
+    """Монотонно растущий счётчик."""
+
+    kind = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        """Увеличиваем счётчик для набора значений меток."""
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def value(self, labels=()):
+        """Текущее значение счётчика."""
+        return self.values.get(labels, 0)
+
+
+class Gauge(Metric):
+    """Значение, которое может расти и убывать."""
+
+    kind = 'gauge'
+
+    def set(self, value, labels=()):
+        """Устанавливаем значение."""
+        self.values[labels] = value
+
+    def value(self, labels=()):
+        """Текущее значение."""
+        return self.values.get(labels, 0)
+
+
+class HistogramValue:
+    """Счётчики корзин, сумма и число наблюдений одного набора меток."""
+
+    __slots__ = ('buckets', 'sum', 'count')
+
+    def __init__(self, size):
+        """Создаём пустые корзины."""
+        self.buckets = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(Metric):
+    """Гистограмма с фиксированными границами корзин."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(),
+                 buckets=LATENCY_BUCKETS):
+        """Создаём гистограмму с заданными верхними границами корзин."""
+        super().__init__(name, documentation, labels)
+        self.bounds = tuple(buckets)
+
+    def observe(self, amount, labels=()):
+        """Добавляем наблюдение: одна корзина, сумма и счётчик."""
+        index = bisect.bisect_left(self.bounds, amount)
+        with self.lock:
+            value = self.values.get(labels)
+            if value is None:
+                value = self.values[labels] = HistogramValue(
+                    len(self.bounds) + 1
+                )
+            value.buckets[index] += 1
+            value.sum += amount
+            value.count += 1
+
+    def time(self, labels=()):
+        """Контекстный менеджер, измеряющий длительность блока."""
+        return Timer(self, labels)
+
+    def render_value(self, labels, value):
+        """Кумулятивные корзины, сумма и число наблюдений."""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + ('+Inf',), value.buckets):
+            cumulative += count
+            bucket_labels = format_labels(
+                self.labels + ('le',), labels + (bound,)
+            )
+            lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+        suffix = format_labels(self.labels, labels)
+        lines.append(f'{self.name}_sum{suffix} {value.sum}')
+        lines.append(f'{self.name}_count{suffix} {value.count}')
+        return lines
+
+
+class Timer:
+    """Измеряет время выполнения блока with и пишет его в гистограмму."""
+
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        """Запоминаем гистограмму и метки."""
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        """Засекаем время начала."""
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Пишем длительность, даже если блок завершился исключением."""
+        self.histogram.observe(
+            time.perf_counter() - self.started, self.labels
+        )
+
+
+class Registry:
+    """Набор метрик процесса."""
+
+    def __init__(self):
+        """Создаём пустой реестр."""
+        self.metrics = []
+
+    def register(self, metric):
+        """Добавляем метрику в реестр и возвращаем её."""
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        """Создаём и регистрируем счётчик."""
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        """Создаём и регистрируем gauge."""
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(),
+                  buckets=LATENCY_BUCKETS):
+        """Создаём и регистрируем гистограмму."""
+        return self.register(
+            Histogram(name, documentation, labels, buckets)
+        )
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus."""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+POLL_LATENCY = REGISTRY.histogram(
+    'homework_poll_latency_seconds', 'Время запроса к API статусов работ.'
+)
+HTTP_RESPONSES = REGISTRY.counter(
+    'homework_http_responses_total', 'Ответы API по коду статуса.', ('code',)
+)
+MESSAGES = REGISTRY.counter(
+    'homework_messages_total', 'Сообщения в Телеграм по результату.',
+    ('result',)
+)
+EXCEPTIONS = REGISTRY.counter(
+    'homework_exceptions_total', 'Ошибки цикла опроса по типу.', ('type',)
+)
+LOOP_LAG = REGISTRY.gauge(
+    'homework_loop_lag_seconds', 'Опоздание опроса относительно плана.'
+)
+BREAKER_STATE = REGISTRY.gauge(
+    'homework_breaker_state',
+    'Состояние предохранителя эндпоинта: 0 closed, 1 half_open, 2 open.'
+)
+BREAKER_TRANSITIONS = REGISTRY.counter(
+    'homework_breaker_transitions_total', 'Переходы предохранителя.',
+    ('from', 'to')
+)
+ERRORS_SUPPRESSED = REGISTRY.counter(
+    'homework_errors_suppressed_total',
+    'Повторы ошибок, сведённые в дайджест вместо отдельного сообщения.',
+    ('type',)
+)
+BUDGET_EXCEEDED = REGISTRY.counter(
+    'homework_poll_budget_exceeded_total',
+    'Опросы, не уложившиеся в бюджет: отложенные и отменённые.',
+    ('action',)
+)
+COMMANDS = REGISTRY.counter(
+    'homework_commands_total', 'Входящие команды бота.', ('command',)
+)
+COMMAND_LATENCY = REGISTRY.histogram(
+    'homework_command_latency_seconds', 'Время подготовки ответа на команду.'
+)
+STAGE_LATENCY = REGISTRY.histogram(
+    'homework_stage_latency_seconds', 'Время стадий цикла опроса.',
+    ('stage',)
+)
+
+
+def count_exception(error):
+    """Считаем ошибку по имени её типа."""
+    EXCEPTIONS.inc((type(error).__name__,))
+
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST,
+                         registry=REGISTRY):
+    """Запускаем эндпоинт метрик в фоновом потоке.
+
+    Без порта (METRICS_PORT не задан) сервер не запускается, а
+    http.server не импортируется.
+    """
+    if port is None:
+        return None
+    from http.server import ThreadingHTTPServer
+
+    from metrics_http import MetricsHandler
+    server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,23 @@
+"""HTTP-эндпоинт метрик: импортируется только при запуске сервера."""
+from http.server import BaseHTTPRequestHandler
+
+from metrics import CONTENT_TYPE
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Отдаёт содержимое реестра по GET /metrics."""
+
+    def do_GET(self):
+        """Отвечаем текстом метрик или 404."""
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Не пишем каждый запрос метрик в лог бота."""
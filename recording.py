@@ -0,0 +1,83 @@
+"""Запись ответов API и отправленных сообщений для воспроизведения.
+
+С RECORD_FILE опрос аккаунтов (accounts.py и async_homework.py)
+дописывает в этот файл JSONL: ответ или ошибку каждого запроса к API и
+каждое сообщение в чат. Записанное прогоняется через конвейер опроса
+командой python replay.py.
+"""
+import json
+import os
+import re
+import threading
+import time
+
+RECORD_FILE = os.getenv('RECORD_FILE')
+ANSWER = 'answer'
+ERROR = 'error'
+MESSAGE = 'message'
+REDACTED = '<token>'
+OAUTH_PATTERN = re.compile(r'OAuth [^\s\'",}\\]+')
+
+
+def redact(text, token=None):
+    """Текст без токена аккаунта и заголовков авторизации."""
+    if token:
+        text = text.replace(token, REDACTED)
+    return OAUTH_PATTERN.sub('OAuth ' + REDACTED, text)
+
+
+class Recorder:
+    """Пишет ответы API, ошибки и сообщения аккаунтов в JSONL.
+
+    Аккаунт в записи — ключ хранилища (хэш токена), chat_id не пишется,
+    токен и заголовки авторизации вырезаются из текста записи. Первая
+    запись аккаунта несёт его статусы на момент начала записи: с них
+    начинается воспроизведение. Писать можно из нескольких потоков.
+    """
+
+    def __init__(self, file, clock=time.time):
+        """Пишем в открытый текстовый файл file."""
+        self.file = file
+        self.clock = clock
+        self.seen = set()
+        self.lock = threading.Lock()
+
+    def write(self, account, kind, **fields):
+        """Дописываем запись kind об аккаунте."""
+        with self.lock:
+            record = {
+                'kind': kind, 'at': self.clock(), 'account': account.key,
+                'locale': account.locale, **fields
+            }
+            if account.key not in self.seen:
+                self.seen.add(account.key)
+                record['statuses'] = dict(account.statuses)
+            line = json.dumps(record, ensure_ascii=False)
+            self.file.write(redact(line, account.practicum_token) + '\n')
+            self.file.flush()
+
+    def answer(self, account, timestamp, answer):
+        """Записываем ответ API на запрос с from_date=timestamp."""
+        self.write(account, ANSWER, from_date=timestamp, answer=answer)
+
+    def error(self, account, timestamp, error):
+        """Записываем ошибку запроса с from_date=timestamp."""
+        self.write(
+            account, ERROR, from_date=timestamp,
+            error=type(error).__name__, message=str(error)
+        )
+
+    def message(self, account, text):
+        """Записываем сообщение, отправленное в чат аккаунта."""
+        self.write(account, MESSAGE, text=text)
+
+    def close(self):
+        """Закрываем файл записи."""
+        self.file.close()
+
+
+def open_recorder(path=RECORD_FILE):
+    """Запись в файл path или None, если запись не включена."""
+    if not path:
+        return None
+    return Recorder(open(path, 'a', encoding='utf-8'))
@@ -0,0 +1,265 @@
+"""Воспроизведение записанных ответов API через конвейер опроса.
+
+Записи из RECORD_FILE (recording.Recorder) по очереди проходят
+AccountPoller.poll: разбор тела, проверку ответа, поиск изменений,
+шаблоны сообщений, агрегацию ошибок и отправку боту, который только
+запоминает сообщения. Пауза между записями сокращается в speed раз,
+speed 0 — без пауз, для нагрузки. Агрегатор ошибок живёт по времени
+записи, поэтому дайджесты не зависят от скорости. Отправленные
+сообщения сравниваются с записанными; если в записи есть сообщения
+оператору (OPERATOR_CHAT_ID), общие ошибки воспроизводятся в его чат.
+
+Запуск из корня репозитория:
+    python replay.py record.jsonl --speed 60
+    python replay.py record.jsonl --speed 0 --copies 100
+
+Код выхода 1, если уведомления разошлись с записью.
+"""
+import argparse
+import builtins
+import json
+import sys
+import time
+from collections import defaultdict
+from difflib import unified_diff
+
+import exceptions
+from accounts import Account, AccountPoller, operator_account
+from alerts import ErrorAggregator
+from cache import ResponseCache
+from homework import make_headers, request_api_answer
+from recording import ERROR, MESSAGE, redact
+from state import account_key
+
+REPLAY_SPEED = 60.0
+REPLAY_SUMMARY = (
+    'Опросов: {polls} за {elapsed:.2f} с ({rate:.1f} в секунду), '
+    'сообщений: {messages}'
+)
+REPLAY_MATCH = 'Уведомления совпадают с записью'
+REPLAY_MISMATCH = 'Уведомления разошлись с записью у аккаунтов: {count}'
+REPLAY_UNCHECKED = 'С копиями аккаунтов уведомления не сравниваются'
+
+
+def load_records(path):
+    """Записи из файла JSONL в порядке записи."""
+    with open(path, encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def rebuild_error(record):
+    """Исключение того же типа и с тем же текстом, что в записи.
+
+    Неизвестные типы (например, из сторонних библиотек) становятся
+    RuntimeError.
+    """
+    error_type = (
+        getattr(exceptions, record['error'], None)
+        or getattr(builtins, record['error'], None)
+    )
+    if not isinstance(error_type, type) or not issubclass(
+        error_type, Exception
+    ):
+        error_type = RuntimeError
+    return error_type(record['message'])
+
+
+class ReplayResponse:
+    """Ответ API с записанным телом."""
+
+    status_code = 200
+
+    def __init__(self, content):
+        """Тело ответа в байтах."""
+        self.content = content
+        self.headers = {}
+
+    def json(self):
+        """Разбираем тело стандартным json, как requests."""
+        return json.loads(self.content)
+
+
+class ReplaySession:
+    """Сессия, которая вместо запроса отдаёт записанное тело."""
+
+    def __init__(self, answer):
+        """Кодируем записанный ответ обратно в JSON."""
+        self.content = json.dumps(answer, ensure_ascii=False).encode()
+
+    def get(self, **request_parameters):
+        """Ответ 200 с записанным телом."""
+        return ReplayResponse(self.content)
+
+
+class CollectingBot:
+    """Бот, который запоминает сообщения по чатам вместо отправки."""
+
+    def __init__(self):
+        """Создаём пустой журнал сообщений."""
+        self.sent = defaultdict(list)
+
+    def send_message(self, chat_id, text, **kwargs):
+        """Запоминаем сообщение."""
+        self.sent[chat_id].append(text)
+
+
+class ReplayPoller(AccountPoller):
+    """Опрос, в котором запрос к API отвечает текущей записью."""
+
+    record = None
+
+    def fetch(self, account, deadline=None):
+        """Отдаём записанный ответ через request_api_answer."""
+        if self.record['kind'] == ERROR:
+            raise rebuild_error(self.record)
+        return request_api_answer(
+            self.record['from_date'], make_headers(account.practicum_token),
+            ReplaySession(self.record['answer']), self.cache,
+            deadline=deadline
+        )
+
+
+class ReplayReport:
+    """Итоги воспроизведения и расхождения уведомлений с записью."""
+
+    def __init__(self, polls, elapsed, messages, expected, actual):
+        """Сообщения expected и actual сгруппированы по ключам аккаунтов."""
+        self.polls = polls
+        self.elapsed = elapsed
+        self.messages = messages
+        self.expected = expected
+        self.actual = actual
+
+    @property
+    def rate(self):
+        """Опросов в секунду."""
+        return self.polls / self.elapsed if self.elapsed else 0.0
+
+    def mismatched(self):
+        """Ключи аккаунтов, чьи уведомления разошлись с записью."""
+        return sorted(
+            key for key in self.expected.keys() | self.actual.keys()
+            if self.expected.get(key, []) != self.actual.get(key, [])
+        )
+
+    def diff(self):
+        """Строки unified diff уведомлений по разошедшимся аккаунтам."""
+        lines = []
+        for key in self.mismatched():
+            lines.extend(unified_diff(
+                self.expected.get(key, []), self.actual.get(key, []),
+                f'{key} (запись)', f'{key} (воспроизведение)', lineterm=''
+            ))
+        return lines
+
+    def summary(self):
+        """Строка с пропускной способностью."""
+        return REPLAY_SUMMARY.format(
+            polls=self.polls, elapsed=self.elapsed, rate=self.rate,
+            messages=self.messages
+        )
+
+
+class Replayer:
+    """Прогоняет записи через ReplayPoller с ускоренными часами.
+
+    copies размножает каждый аккаунт для нагрузки: копии опрашиваются
+    теми же ответами. Ошибки копий попадают в общие с исходными
+    аккаунтами дайджесты, поэтому с копиями уведомления не сравниваются.
+    """
+
+    def __init__(self, speed=REPLAY_SPEED, copies=1, sleep=time.sleep):
+        """Готовим опрос с ботом-журналом и часами записи."""
+        self.speed = speed
+        self.copies = copies
+        self.sleep = sleep
+        self.now = 0.0
+        self.bot = CollectingBot()
+        self.poller = ReplayPoller(
+            self.bot, cache=ResponseCache(), budget=0,
+            errors=ErrorAggregator(clock=lambda: self.now)
+        )
+        self.accounts = {}
+
+    def account(self, record, copy):
+        """Аккаунт записи; при первом появлении — с записанными статусами."""
+        chat_id = record['account'] if not copy else (
+            f"{record['account']}#{copy}"
+        )
+        account = self.accounts.get(chat_id)
+        if account is None:
+            account = Account(chat_id, chat_id, locale=record['locale'])
+            account.key = chat_id
+            account.statuses = dict(record.get('statuses', {}))
+            self.accounts[chat_id] = account
+        return account
+
+    def watch_operator(self, records):
+        """Заводим чат оператора, если в записи есть сообщения ему."""
+        key = account_key(None)
+        for record in records:
+            if record['account'] == key:
+                operator = operator_account(key, record['locale'])
+                self.poller.operator = operator
+                self.poller.targets[key] = operator
+                return
+
+    def wait(self, offset, started):
+        """Ждём момента записи offset с учётом ускорения."""
+        if self.speed <= 0:
+            return
+        delay = offset / self.speed - (time.perf_counter() - started)
+        if delay > 0:
+            self.sleep(delay)
+
+    def run(self, records):
+        """Воспроизводим записи и сравниваем уведомления с записанными."""
+        expected = defaultdict(list)
+        polls = 0
+        first = records[0]['at'] if records else 0.0
+        self.watch_operator(records)
+        started = time.perf_counter()
+        for record in records:
+            self.now = record['at']
+            if record['kind'] == MESSAGE:
+                expected[record['account']].append(record['text'])
+                continue
+            self.wait(record['at'] - first, started)
+            self.poller.record = record
+            for copy in range(self.copies):
+                self.poller.poll(self.account(record, copy))
+                polls += 1
+        elapsed = time.perf_counter() - started
+        messages = sum(len(texts) for texts in self.bot.sent.values())
+        if self.copies > 1:
+            return ReplayReport(polls, elapsed, messages, {}, {})
+        actual = {
+            key: [redact(text) for text in texts]
+            for key, texts in self.bot.sent.items()
+        }
+        return ReplayReport(polls, elapsed, messages, dict(expected), actual)
+
+
+def main(argv=None):
+    """Воспроизводим файл записи; код выхода 1 при расхождении."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('path')
+    parser.add_argument('--speed', type=float, default=REPLAY_SPEED)
+    parser.add_argument('--copies', type=int, default=1)
+    args = parser.parse_args(argv)
+    report = Replayer(args.speed, args.copies).run(load_records(args.path))
+    print(report.summary())
+    if args.copies > 1:
+        print(REPLAY_UNCHECKED)
+        return 0
+    mismatched = report.mismatched()
+    if not mismatched:
+        print(REPLAY_MATCH)
+        return 0
+    print(REPLAY_MISMATCH.format(count=len(mismatched)))
+    print('\n'.join(report.diff()))
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Адаптивный интервал опроса вместо фиксированного RETRY_PERIOD."""
+import os
+import random
+
+MIN_POLL_INTERVAL = int(os.getenv('MIN_POLL_INTERVAL', 60))
+MAX_POLL_INTERVAL = int(os.getenv('MAX_POLL_INTERVAL', 3600))
+REVIEW_POLL_INTERVAL = int(os.getenv('REVIEW_POLL_INTERVAL', 120))
+IDLE_POLLS = int(os.getenv('IDLE_POLLS', 6))
+BACKOFF_FACTOR = 2
+JITTER = 0.2
+MAX_BACKOFF_STEPS = 16
+REVIEWING = 'reviewing'
+
+
+class PollActivity:
+    """Счётчики подряд идущих ошибок и опросов без изменений."""
+
+    __slots__ = ('failures', 'idle_polls')
+
+    def __init__(self):
+        """Начинаем без ошибок и простоя."""
+        self.failures = 0
+        self.idle_polls = 0
+
+
+class AdaptivePolicy:
+    """Интервал до следующего опроса по итогам предыдущего.
+
+    - после ошибок интервал растёт экспоненциально от min_interval
+      со случайным разбросом ±jitter, чтобы аккаунты не били в API
+      одновременно после сбоя;
+    - пока хотя бы одна работа на проверке, опрашиваем раз в
+      review_interval;
+    - после каждых idle_polls опросов без изменений интервал
+      умножается на factor, начиная с base;
+    - в остальных случаях ждём base.
+
+    Результат всегда в пределах [min_interval, max_interval].
+    Счётчики хранятся в объекте activity (PollActivity или Account).
+    """
+
+    def __init__(self, base, min_interval=MIN_POLL_INTERVAL,
+                 max_interval=MAX_POLL_INTERVAL,
+                 review_interval=REVIEW_POLL_INTERVAL, idle_polls=IDLE_POLLS,
+                 factor=BACKOFF_FACTOR, jitter=JITTER, random=random.random):
+        """Запоминаем параметры политики; base — обычный интервал."""
+        self.base = base
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.review_interval = review_interval
+        self.idle_polls = idle_polls
+        self.factor = factor
+        self.jitter = jitter
+        self.random = random
+
+    def clamp(self, delay):
+        """Ограничиваем интервал настроенными пределами."""
+        return max(self.min_interval, min(self.max_interval, delay))
+
+    def growth(self, steps):
+        """Множитель роста интервала после steps шагов."""
+        return self.factor ** min(steps, MAX_BACKOFF_STEPS)
+
+    def after_success(self, activity, changed, statuses):
+        """Интервал после удачного опроса.
+
+        changed — число отправленных изменений, statuses — индекс
+        последних статусов работ аккаунта.
+        """
+        activity.failures = 0
+        activity.idle_polls = 0 if changed else activity.idle_polls + 1
+        if REVIEWING in statuses.values():
+            return self.clamp(self.review_interval)
+        return self.clamp(
+            self.base * self.growth(activity.idle_polls // self.idle_polls)
+        )
+
+    def after_failure(self, activity):
+        """Интервал после ошибки: экспоненциальный рост с разбросом."""
+        activity.failures += 1
+        delay = self.min_interval * self.growth(activity.failures - 1)
+        spread = 1 + self.jitter * (2 * self.random() - 1)
+        return self.clamp(min(delay, self.max_interval) * spread)
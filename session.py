@@ -0,0 +1,69 @@
+"""Общая HTTP-сессия с пулом keep-alive соединений к API Практикума."""
+import os
+import threading
+
+POOL_CONNECTIONS = int(os.getenv('POOL_CONNECTIONS', 10))
+POOL_MAXSIZE = int(os.getenv('POOL_MAXSIZE', 10))
+TRANSPORT_RETRIES = int(os.getenv('TRANSPORT_RETRIES', 3))
+RETRY_BACKOFF = 0.5
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def make_session(pool_connections=POOL_CONNECTIONS,
+                 pool_maxsize=POOL_MAXSIZE,
+                 retries=TRANSPORT_RETRIES):
+    """Создаём сессию с пулом соединений и повторами на уровне транспорта.
+
+    pool_connections — число хостов, для которых держим пулы,
+    pool_maxsize — предел соединений к одному хосту: при его достижении
+    запросы ждут свободное соединение, а не открывают новые.
+    Повторяются только ошибки установки соединения, ответы сервера
+    и обрывы чтения возвращаются как есть. requests импортируется при
+    создании первой сессии, а не при импорте модуля.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=True,
+        max_retries=Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=0,
+            redirect=0,
+            backoff_factor=RETRY_BACKOFF,
+        ),
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session(pool_maxsize=POOL_MAXSIZE):
+    """Сессия, общая для всех опрашиваемых аккаунтов процесса.
+
+    pool_maxsize учитывается при создании сессии, то есть первым
+    вызовом.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = make_session(pool_maxsize=pool_maxsize)
+    return _session
+
+
+def close_session():
+    """Закрываем общую сессию и её соединения."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
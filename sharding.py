@@ -0,0 +1,176 @@
+"""Распределение аккаунтов между процессами по согласованному хэшированию.
+
+Каждый воркер получает номер шарда и число шардов и опрашивает только
+свои аккаунты. Запуск одного шарда (например, на отдельной машине):
+    SHARD_INDEX=0 SHARD_COUNT=4 python accounts.py accounts.json
+Запуск шардов на всех ядрах одной машины:
+    python sharding.py accounts.json [число процессов]
+"""
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import re
+import signal
+import sys
+
+SHARD_REPLICAS = int(os.getenv('SHARD_REPLICAS', 128))
+SHARD_WORKERS = int(os.getenv('SHARD_WORKERS', os.cpu_count() or 1))
+SHARD_ERROR = 'Номер шарда {index} вне диапазона 0..{last}'
+ACCOUNTS_SHARD = 'Шард {index} из {count}: аккаунтов {owned} из {total}'
+SHARD_STOPPED = 'Процесс шарда {index} завершился с кодом {code}'
+DYNO_PATTERN = re.compile(r'^worker\.(\d+)$')
+
+logger = logging.getLogger(__name__)
+
+
+def shard_hash(value):
+    """64-битный хэш строки, одинаковый во всех процессах и на всех машинах.
+
+    Встроенный hash() для строк рандомизирован между процессами, поэтому
+    не подходит.
+    """
+    return int.from_bytes(
+        hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big'
+    )
+
+
+class HashRing:
+    """Кольцо согласованного хэширования с виртуальными узлами.
+
+    У каждого шарда replicas точек на кольце; аккаунт принадлежит шарду
+    первой точки по часовой стрелке от хэша его ключа. Когда шардов
+    становится N + 1, новый шард забирает около 1/(N + 1) аккаунтов,
+    а остальные аккаунты остаются на прежних шардах.
+    """
+
+    def __init__(self, count, replicas=SHARD_REPLICAS):
+        """Строим кольцо для count шардов."""
+        points = sorted(
+            (shard_hash(f'shard-{shard}-{replica}'), shard)
+            for shard in range(count)
+            for replica in range(replicas)
+        )
+        self.hashes = [point for point, _ in points]
+        self.shards = [shard for _, shard in points]
+
+    def shard_of(self, key):
+        """Номер шарда, которому принадлежит ключ."""
+        index = bisect.bisect(self.hashes, shard_hash(key))
+        return self.shards[index % len(self.shards)]
+
+
+def default_shard():
+    """Номер и число шардов из SHARD_INDEX и SHARD_COUNT.
+
+    На Heroku номер берётся из DYNO (worker.1 -> шард 0), если
+    SHARD_INDEX не задан.
+    """
+    index = os.getenv('SHARD_INDEX')
+    if index is None:
+        match = DYNO_PATTERN.match(os.getenv('DYNO', ''))
+        index = int(match[1]) - 1 if match else 0
+    return int(index), int(os.getenv('SHARD_COUNT', 1))
+
+
+SHARD_INDEX, SHARD_COUNT = default_shard()
+
+
+def shard_accounts(accounts, index=SHARD_INDEX, count=SHARD_COUNT):
+    """Аккаунты, которыми владеет шард index из count."""
+    if not 0 <= index < count:
+        raise ValueError(SHARD_ERROR.format(index=index, last=count - 1))
+    if count == 1:
+        owned = list(accounts)
+    else:
+        ring = HashRing(count)
+        owned = [
+            account for account in accounts
+            if ring.shard_of(account.key) == index
+        ]
+    logger.info(ACCOUNTS_SHARD.format(
+        index=index, count=count, owned=len(owned), total=len(accounts)
+    ))
+    return owned
+
+
+def shard_port(port, index):
+    """Порт метрик шарда: у каждого процесса на машине свой."""
+    if port is None:
+        return None
+    return int(port) + index
+
+
+def run_shard(path, index, count):
+    """Точка входа процесса шарда: свой лог и цикл опроса accounts.main."""
+    import accounts
+    from homework import configure_logging
+
+    configure_logging(f'{accounts.__file__}.shard{index}.log')
+    accounts.main(path, index, count)
+
+
+def stop_launcher(signum, frame):
+    """Превращаем SIGTERM в SystemExit, чтобы остановить шарды."""
+    sys.exit(0)
+
+
+def wait_shards(processes):
+    """Ждём, пока все шарды завершатся или один из них упадёт.
+
+    Шард, завершившийся с кодом 0, остальные не останавливает.
+    """
+    waiting = {process.sentinel: process for process in processes}
+    while waiting:
+        for sentinel in multiprocessing.connection.wait(list(waiting)):
+            process = waiting.pop(sentinel)
+            process.join()
+            if process.exitcode:
+                return
+
+
+def launch(path, workers=SHARD_WORKERS, target=run_shard):
+    """Запускаем workers процессов-шардов и ждём их завершения.
+
+    Процессы запускаются через spawn: они не наследуют от родителя ни
+    обработчики логов, ни потоки. Если один из шардов упал (ненулевой код
+    выхода) или родителю пришёл SIGTERM, остальные останавливаются; после
+    падения шарда возвращается код 1, и перезапуск целиком остаётся
+    супервизору (Procfile, systemd).
+    """
+    signal.signal(signal.SIGTERM, stop_launcher)
+    context = multiprocessing.get_context('spawn')
+    processes = [
+        context.Process(
+            target=target, args=(path, index, workers),
+            name=f'shard-{index}'
+        )
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        wait_shards(processes)
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for index, process in enumerate(processes):
+            process.join()
+            if process.exitcode:
+                logger.critical(SHARD_STOPPED.format(
+                    index=index, code=process.exitcode
+                ))
+    return int(any(process.exitcode for process in processes))
+
+
+if __name__ == '__main__':
+    from accounts import ACCOUNTS_FILE
+    from homework import configure_logging
+
+    configure_logging(__file__ + '.log')
+    path = sys.argv[1] if len(sys.argv) > 1 else ACCOUNTS_FILE
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else SHARD_WORKERS
+    sys.exit(launch(path, workers))
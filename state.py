@@ -0,0 +1,213 @@
+"""Хранилище состояния бота: курсор опроса и последние статусы работ."""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+
+STATE_BACKEND = os.getenv('STATE_BACKEND', 'sqlite')
+STATE_FILE = os.getenv('STATE_FILE', 'homework_state.sqlite3')
+STATE_FLUSH_INTERVAL = float(os.getenv('STATE_FLUSH_INTERVAL', 1.0))
+STATE_BACKEND_ERROR = 'Неизвестное хранилище состояния: {backend}'
+STATE_FLUSH_ERROR = 'Сбой при записи состояния: {error}'
+STATE_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cursors ('
+    'account TEXT PRIMARY KEY, timestamp INTEGER NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS statuses ('
+    'account TEXT NOT NULL, homework TEXT NOT NULL, status TEXT NOT NULL, '
+    'PRIMARY KEY (account, homework))',
+    'CREATE TABLE IF NOT EXISTS errors ('
+    'key TEXT PRIMARY KEY, name TEXT NOT NULL, target TEXT, '
+    'started REAL NOT NULL, seen REAL NOT NULL, count INTEGER NOT NULL, '
+    'suppressed INTEGER NOT NULL)',
+)
+
+logger = logging.getLogger(__name__)
+
+
+def account_key(token):
+    """Ключ аккаунта в хранилище: хэш токена, а не сам токен."""
+    return hashlib.blake2b(str(token).encode(), digest_size=8).hexdigest()
+
+
+class MemoryStateBackend:
+    """Состояние в памяти процесса: для тестов и одноразовых запусков."""
+
+    def __init__(self):
+        """Создаём пустое хранилище."""
+        self.cursors = {}
+        self.statuses = {}
+        self.errors = {}
+
+    def load(self, account):
+        """Курсор (или None) и словарь статусов работ аккаунта."""
+        return (
+            self.cursors.get(account),
+            dict(self.statuses.get(account, {}))
+        )
+
+    def save_cursor(self, account, timestamp):
+        """Запоминаем курсор опроса аккаунта."""
+        self.cursors[account] = timestamp
+
+    def save_status(self, account, homework, status):
+        """Запоминаем последний отправленный статус работы."""
+        self.statuses.setdefault(account, {})[homework] = status
+
+    def load_errors(self):
+        """Строки (key, name, target, started, seen, count, suppressed)."""
+        return [(key, *row) for key, row in self.errors.items()]
+
+    def save_error(self, key, *row):
+        """Запоминаем окно агрегации ошибки с отпечатком key."""
+        self.errors[key] = row
+
+    def delete_error(self, key):
+        """Забываем ошибку с отпечатком key."""
+        self.errors.pop(key, None)
+
+    def flush(self):
+        """Данные уже в памяти, записывать нечего."""
+
+    def close(self):
+        """Освобождать нечего."""
+
+
+class SqliteStateBackend:
+    """Состояние в файле SQLite с пакетной записью в фоновом потоке.
+
+    save_* только обновляют словари ожидающих записей под блокировкой,
+    поэтому не задерживают цикл опроса. Фоновый поток раз в interval
+    секунд пишет накопленное одной транзакцией; synchronous=FULL
+    гарантирует fsync при фиксации.
+    """
+
+    def __init__(self, path=STATE_FILE, interval=STATE_FLUSH_INTERVAL):
+        """Открываем файл, создаём таблицы и запускаем поток записи."""
+        self.path = path
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.db_lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.pending_cursors = {}
+        self.pending_statuses = {}
+        self.pending_errors = {}
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=FULL')
+        with self.connection:
+            for statement in STATE_SCHEMA:
+                self.connection.execute(statement)
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+
+    def load(self, account):
+        """Читаем курсор и статусы аккаунта из файла."""
+        self.flush()
+        with self.db_lock:
+            row = self.connection.execute(
+                'SELECT timestamp FROM cursors WHERE account = ?', (account,)
+            ).fetchone()
+            statuses = dict(self.connection.execute(
+                'SELECT homework, status FROM statuses WHERE account = ?',
+                (account,)
+            ))
+        return (row[0] if row else None), statuses
+
+    def save_cursor(self, account, timestamp):
+        """Ставим курсор в очередь на запись."""
+        with self.lock:
+            self.pending_cursors[account] = timestamp
+
+    def save_status(self, account, homework, status):
+        """Ставим статус работы в очередь на запись."""
+        with self.lock:
+            self.pending_statuses[(account, homework)] = status
+
+    def load_errors(self):
+        """Строки (key, name, target, started, seen, count, suppressed)."""
+        self.flush()
+        with self.db_lock:
+            return self.connection.execute('SELECT * FROM errors').fetchall()
+
+    def save_error(self, key, *row):
+        """Ставим окно агрегации ошибки с отпечатком key на запись."""
+        with self.lock:
+            self.pending_errors[key] = row
+
+    def delete_error(self, key):
+        """Ставим удаление ошибки с отпечатком key на запись."""
+        with self.lock:
+            self.pending_errors[key] = None
+
+    def flush(self):
+        """Записываем накопленные изменения одной транзакцией.
+
+        Ожидающие записи забираются под короткой блокировкой, сама
+        транзакция с fsync идёт без неё. При ошибке записи изменения
+        возвращаются в очередь.
+        """
+        with self.db_lock:
+            with self.lock:
+                pending = (
+                    self.pending_cursors, self.pending_statuses,
+                    self.pending_errors
+                )
+                self.pending_cursors = {}
+                self.pending_statuses = {}
+                self.pending_errors = {}
+            if not any(pending):
+                return
+            try:
+                with self.connection:
+                    self._write(*pending)
+            except sqlite3.Error:
+                with self.lock:
+                    for queued, failed in zip((
+                        self.pending_cursors, self.pending_statuses,
+                        self.pending_errors
+                    ), pending):
+                        for key, value in failed.items():
+                            queued.setdefault(key, value)
+                raise
+
+    def _write(self, cursors, statuses, errors):
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO cursors VALUES (?, ?)', cursors.items()
+        )
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO statuses VALUES (?, ?, ?)',
+            ((account, homework, status)
+             for (account, homework), status in statuses.items())
+        )
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO errors VALUES (?, ?, ?, ?, ?, ?, ?)',
+            ((key, *row) for key, row in errors.items() if row is not None)
+        )
+        self.connection.executemany(
+            'DELETE FROM errors WHERE key = ?',
+            ((key,) for key, row in errors.items() if row is None)
+        )
+
+    def _write_loop(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.flush()
+            except sqlite3.Error as error:
+                logger.error(STATE_FLUSH_ERROR.format(error=error))
+
+    def close(self):
+        """Останавливаем поток, дописываем хвост и закрываем файл."""
+        self.stopped.set()
+        self.writer.join()
+        self.flush()
+        self.connection.close()
+
+
+def open_state_backend(backend=STATE_BACKEND, path=STATE_FILE):
+    """Создаём хранилище состояния по имени: sqlite или memory."""
+    if backend == 'memory':
+        return MemoryStateBackend()
+    if backend == 'sqlite':
+        return SqliteStateBackend(path)
+    raise ValueError(STATE_BACKEND_ERROR.format(backend=backend))
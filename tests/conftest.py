@@ -26,3 +26,4 @@ os.environ['PRACTICUM_TOKEN'] = 'sometoken'
 os.environ['TELEGRAM_TOKEN'] = '1234:abcdefg'
 os.environ['TELEGRAM_CHAT_ID'] = '12345'
 
+os.environ['STATE_BACKEND'] = 'memory'
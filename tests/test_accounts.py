@@ -0,0 +1,125 @@
+import json
+from http import HTTPStatus
+
+import pytest
+import requests
+
+import utils
+
+
+def mock_response_get_with_data(data):
+    def mocked_response(*args, **kwargs):
+        response = utils.MockResponseGET(*args, http_status=HTTPStatus.OK)
+        response.json = lambda: data
+        return response
+    return mocked_response
+
+
+class TestAccounts:
+    HOMEWORK = {'homework_name': 'hw123', 'status': 'approved'}
+
+    @pytest.fixture
+    def accounts_module(self):
+        import accounts
+        return accounts
+
+    def test_load_accounts(self, tmp_path, accounts_module):
+        path = tmp_path / 'accounts.json'
+        path.write_text(json.dumps([
+            {'practicum_token': 'token1', 'chat_id': 1},
+            {'practicum_token': 'token2', 'chat_id': '2'},
+        ]))
+        loaded = accounts_module.load_accounts(str(path))
+        assert [account.chat_id for account in loaded] == ['1', '2']
+        assert loaded[0].practicum_token == 'token1'
+
+    def test_load_accounts_without_key(self, tmp_path, accounts_module):
+        path = tmp_path / 'accounts.json'
+        path.write_text(json.dumps([{'practicum_token': 'token1'}]))
+        with pytest.raises(KeyError):
+            accounts_module.load_accounts(str(path))
+
+    def test_account_has_no_dict(self, accounts_module):
+        account = accounts_module.Account('token', '1')
+        assert not hasattr(account, '__dict__')
+
+    def test_poll_account_sends_to_own_chat(self, monkeypatch,
+                                            random_timestamp,
+                                            accounts_module):
+        captured = {}
+
+        def mock_get(*args, **kwargs):
+            captured.update(kwargs)
+            return mock_response_get_with_data({
+                'homeworks': [self.HOMEWORK],
+                'current_date': random_timestamp,
+            })()
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        bot = utils.MockTelegramBot()
+        poller = accounts_module.AccountPoller(bot)
+        account = accounts_module.Account('token1', '777')
+        poller.poll(account)
+        assert captured['headers'] == {'Authorization': 'OAuth token1'}
+        assert bot.chat_id == '777'
+        assert account.timestamp == random_timestamp
+        bot.text = None
+        poller.poll(account)
+        assert bot.text is None
+
+    def test_restore_skips_already_sent_status(self, monkeypatch,
+                                               random_timestamp,
+                                               accounts_module):
+        monkeypatch.setattr(requests, 'get', mock_response_get_with_data({
+            'homeworks': [self.HOMEWORK],
+            'current_date': random_timestamp,
+        }))
+        from state import MemoryStateBackend
+
+        state = MemoryStateBackend()
+        first = accounts_module.AccountPoller(
+            utils.MockTelegramBot(), state=state
+        )
+        first.poll(accounts_module.Account('token1', '777'))
+        bot = utils.MockTelegramBot()
+        restarted = accounts_module.AccountPoller(bot, state=state)
+        account = accounts_module.Account('token1', '777')
+        restarted.restore([account])
+        assert account.timestamp == random_timestamp
+        restarted.poll(account)
+        assert not hasattr(bot, 'text')
+
+    def test_scheduler_spreads_and_reschedules(self, accounts_module):
+        now = [0.0]
+        sleeps = []
+
+        def sleep(delay):
+            sleeps.append(delay)
+            now[0] += delay
+
+        accounts = [accounts_module.Account(str(i), str(i)) for i in range(4)]
+        scheduler = accounts_module.PollScheduler(
+            accounts, period=100, clock=lambda: now[0], sleep=sleep
+        )
+        order = []
+        for _ in range(8):
+            account = scheduler.next_account()
+            order.append(account)
+            scheduler.schedule(account, 100)
+        assert order == accounts + accounts
+        assert sleeps == [25] * 7
+        account = scheduler.next_account()
+        scheduler.schedule(account, 1)
+        assert scheduler.next_account() is account
+        assert len(scheduler) == 3
+
+    def test_poll_returns_adaptive_delay(self, monkeypatch, accounts_module):
+        def mock_get_with_error(*args, **kwargs):
+            raise requests.RequestException('Something wrong')
+
+        monkeypatch.setattr(requests, 'get', mock_get_with_error)
+        poller = accounts_module.AccountPoller(utils.MockTelegramBot())
+        account = accounts_module.Account('token', '1')
+        delays = [poller.poll(account) for _ in range(3)]
+        assert account.failures == 3
+        assert delays[0] < delays[2]
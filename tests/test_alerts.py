@@ -0,0 +1,182 @@
+import pytest
+import requests
+
+import utils
+from exceptions import ResponceError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestErrorAggregator:
+
+    @pytest.fixture
+    def alerts_module(self):
+        import alerts
+        return alerts
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    @pytest.fixture
+    def errors(self, alerts_module, clock):
+        return alerts_module.ErrorAggregator(
+            window=600, capacity=3, clock=clock
+        )
+
+    def test_windows_survive_restart(self, alerts_module, clock):
+        from state import MemoryStateBackend
+
+        class Target:
+            key = 'account'
+
+        store = MemoryStateBackend()
+        errors = alerts_module.ErrorAggregator(
+            window=600, clock=clock, store=store
+        )
+        assert errors.admit(ResponceError('boom'), 'scope', Target())
+        clock.now = 300
+        restarted = alerts_module.ErrorAggregator(
+            window=600, clock=clock, store=store
+        )
+        assert not restarted.admit(ResponceError('boom'), 'scope')
+        clock.now = 600
+        restarted = alerts_module.ErrorAggregator(
+            window=600, clock=clock, store=store
+        )
+        assert restarted.digests() == [('account', 'ResponceError', 2, 10)]
+        clock.now = 1200
+        assert restarted.digests() == []
+        assert store.load_errors() == []
+
+    def test_fingerprint_ignores_tokens_and_timestamps(self, alerts_module):
+        first = ResponceError(
+            "Код ответа:502. headers={'Authorization': 'OAuth abc'}, "
+            "params={'from_date': 1700000000}"
+        )
+        second = ResponceError(
+            "Код ответа:502. headers={'Authorization': 'OAuth xyz'}, "
+            "params={'from_date': 1700000600}"
+        )
+        other = ResponceError(
+            "Код ответа:401. headers={'Authorization': 'OAuth abc'}, "
+            "params={'from_date': 1700000000}"
+        )
+        assert alerts_module.fingerprint(first) == (
+            alerts_module.fingerprint(second)
+        )
+        assert alerts_module.fingerprint(first) != (
+            alerts_module.fingerprint(other)
+        )
+        assert alerts_module.fingerprint(first, 'a') != (
+            alerts_module.fingerprint(first, 'b')
+        )
+
+    def test_alternating_errors_are_sent_once(self, errors):
+        admitted = [
+            errors.admit(ResponceError(message))
+            for message in ('first', 'second') * 5
+        ]
+        assert admitted == [True, True] + [False] * 8
+
+    def test_digest_after_window(self, errors, clock):
+        assert errors.admit(ResponceError('boom'), target='chat')
+        for _ in range(36):
+            clock.now += 10
+            errors.admit(ResponceError('boom'))
+        assert errors.digests() == []
+        clock.now = 600
+        assert errors.digests() == [('chat', 'ResponceError', 37, 10)]
+        clock.now = 1200
+        assert errors.digests() == []
+        assert len(errors) == 0
+        assert errors.admit(ResponceError('boom'))
+
+    def test_memory_is_bounded(self, errors):
+        for index in range(10):
+            errors.admit(ResponceError(f'error {index}'))
+        assert len(errors) == 3
+
+    def test_main_loop_digest_message(self, monkeypatch, homework_module,
+                                      alerts_module):
+        bot = utils.MockTelegramBot()
+        messages = []
+        monkeypatch.setattr(
+            homework_module, 'send_message',
+            lambda bot, message: messages.append(message)
+        )
+        clock = FakeClock()
+        errors = alerts_module.ErrorAggregator(window=60, clock=clock)
+        for _ in range(3):
+            homework_module.report_error(bot, ResponceError('boom'), errors)
+            homework_module.send_digests(bot, errors)
+        clock.now = 60
+        homework_module.send_digests(bot, errors)
+        assert messages == [
+            'Сбой в работе программы: boom',
+            'ResponceError x3 за последние 1 мин',
+        ]
+
+    def test_outage_goes_to_operator(self, monkeypatch, alerts_module):
+        from accounts import Account, AccountPoller, operator_account
+
+        def mock_get_with_error(*args, **kwargs):
+            raise requests.RequestException('Something wrong')
+
+        monkeypatch.setattr(requests, 'get', mock_get_with_error)
+        clock = FakeClock()
+        poller = AccountPoller(
+            utils.MockTelegramBot(), operator=operator_account('ops'),
+            errors=alerts_module.ErrorAggregator(window=60, clock=clock)
+        )
+        sent = []
+        poller.send = lambda account, message: sent.append(
+            (account.chat_id, message)
+        )
+        accounts = [Account(f'token{index}', str(index)) for index in range(5)]
+        for account in accounts:
+            poller.poll(account)
+        clock.now = 60
+        poller.poll(accounts[0])
+        assert [chat_id for chat_id, _ in sent] == ['ops', 'ops']
+        assert 'token0' not in sent[0][1]
+        assert sent[1][1] == 'ConnectionError x5 за последние 1 мин'
+
+    def test_outage_without_operator_reaches_each_chat(self, monkeypatch,
+                                                       alerts_module):
+        from accounts import Account, AccountPoller
+
+        def mock_get_with_error(*args, **kwargs):
+            raise requests.RequestException('Something wrong')
+
+        monkeypatch.setattr(requests, 'get', mock_get_with_error)
+        clock = FakeClock()
+        poller = AccountPoller(
+            utils.MockTelegramBot(),
+            errors=alerts_module.ErrorAggregator(window=60, clock=clock)
+        )
+        sent = []
+        poller.send = lambda account, message: sent.append(
+            (account.chat_id, message)
+        )
+        accounts = [Account(f'token{index}', str(index)) for index in range(3)]
+        for _ in range(2):
+            for account in accounts:
+                poller.poll(account)
+        assert [chat_id for chat_id, _ in sent] == ['0', '1', '2']
+        clock.now = 60
+        poller.poll(accounts[0])
+        digests = [
+            (chat_id, message) for chat_id, message in sent[3:]
+            if ' x' in message
+        ]
+        assert digests == [
+            (chat_id, 'ConnectionError x2 за последние 1 мин')
+            for chat_id in ('0', '1', '2')
+        ]
@@ -0,0 +1,72 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+import requests
+
+import utils
+
+
+class TestAsyncHomework:
+
+    @pytest.fixture
+    def async_module(self):
+        import async_homework
+        return async_homework
+
+    def test_request_without_session_uses_requests(self, monkeypatch,
+                                                   random_timestamp,
+                                                   async_module):
+        def mock_response_get(*args, **kwargs):
+            return utils.MockResponseGET(
+                *args, random_timestamp=random_timestamp, **kwargs
+            )
+
+        monkeypatch.setattr(requests, 'get', mock_response_get)
+        result = asyncio.run(
+            async_module.async_get_api_answer(None, random_timestamp)
+        )
+        assert result == {'homeworks': [], 'current_date': random_timestamp}
+
+    def test_request_error_is_raised(self, monkeypatch, current_timestamp,
+                                     async_module):
+        def mock_response_get(*args, **kwargs):
+            return utils.MockResponseGET(
+                http_status=HTTPStatus.INTERNAL_SERVER_ERROR
+            )
+
+        monkeypatch.setattr(requests, 'get', mock_response_get)
+        with pytest.raises(Exception):
+            asyncio.run(
+                async_module.async_get_api_answer(None, current_timestamp)
+            )
+
+    def test_poll_accounts_concurrently(self, monkeypatch, random_timestamp,
+                                        async_module):
+        data = {
+            'homeworks': [{'homework_name': 'hw123', 'status': 'approved'}],
+            'current_date': random_timestamp,
+        }
+
+        def mock_response_get(*args, **kwargs):
+            response = utils.MockResponseGET()
+            response.json = lambda: data
+            return response
+
+        monkeypatch.setattr(requests, 'get', mock_response_get)
+        from accounts import Account
+
+        bots = [utils.MockTelegramBot() for _ in range(3)]
+        accounts = [Account('token', str(index)) for index in range(3)]
+
+        async def poll_all():
+            await asyncio.gather(*(
+                async_module.AsyncAccountPoller(bot).poll(account)
+                for bot, account in zip(bots, accounts)
+            ))
+
+        asyncio.run(poll_all())
+        assert [bot.chat_id for bot in bots] == ['0', '1', '2']
+        assert all(
+            account.timestamp == random_timestamp for account in accounts
+        )
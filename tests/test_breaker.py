@@ -0,0 +1,113 @@
+from http import HTTPStatus
+
+import pytest
+import requests
+
+import utils
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class MockSession:
+    def __init__(self, http_status=HTTPStatus.OK, error=None):
+        self.http_status = http_status
+        self.error = error
+        self.calls = 0
+
+    def get(self, **kwargs):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return utils.MockResponseGET(http_status=self.http_status)
+
+
+class TestCircuitBreaker:
+
+    @pytest.fixture
+    def breaker_module(self):
+        import breaker
+        return breaker
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    @pytest.fixture
+    def events(self):
+        return []
+
+    @pytest.fixture
+    def breaker(self, breaker_module, clock, events):
+        return breaker_module.CircuitBreaker(
+            failures=2, reset_timeout=10, clock=clock,
+            listeners=(lambda old, new: events.append((old, new)),)
+        )
+
+    def test_states(self, breaker, clock, events):
+        from exceptions import CircuitOpenError
+
+        for _ in range(2):
+            breaker.before_call()
+            breaker.record_failure()
+        assert breaker.state == 'open'
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        clock.now = 10
+        breaker.before_call()
+        assert breaker.state == 'half_open'
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_failure()
+        assert breaker.state == 'open'
+        clock.now = 20
+        breaker.before_call()
+        breaker.record_success()
+        assert events == [
+            ('closed', 'open'), ('open', 'half_open'),
+            ('half_open', 'open'), ('open', 'half_open'),
+            ('half_open', 'closed'),
+        ]
+
+    def test_client_errors_do_not_open(self, breaker, homework_module):
+        session = MockSession(HTTPStatus.UNAUTHORIZED)
+        for _ in range(5):
+            with pytest.raises(Exception):
+                homework_module.request_api_answer(
+                    0, {}, session, breaker=breaker
+                )
+        assert breaker.state == 'closed'
+
+    def test_transitions_are_counted(self, breaker_module, clock):
+        from metrics import BREAKER_STATE, BREAKER_TRANSITIONS
+
+        opened = BREAKER_TRANSITIONS.value(('closed', 'open'))
+        breaker = breaker_module.CircuitBreaker(failures=1, clock=clock)
+        breaker.record_failure()
+        assert BREAKER_TRANSITIONS.value(('closed', 'open')) == opened + 1
+        assert BREAKER_STATE.value() == breaker_module.STATE_VALUES['open']
+
+    def test_outage_costs_one_probe(self, breaker, clock):
+        from accounts import Account, AccountPoller, operator_account
+
+        bot = utils.MockTelegramBot()
+        session = MockSession(error=requests.exceptions.ConnectTimeout())
+        poller = AccountPoller(
+            bot, session, breaker=breaker, operator=operator_account('ops')
+        )
+        sent = []
+        poller.send = lambda account, message: sent.append(account.chat_id)
+        accounts = [Account(f'token{index}', str(index)) for index in range(10)]
+        for account in accounts:
+            poller.poll(account)
+        assert session.calls == 2
+        assert sent == ['ops']
+        clock.now = 10
+        for account in accounts:
+            poller.poll(account)
+        assert session.calls == 3
@@ -0,0 +1,182 @@
+import asyncio
+import io
+import json
+import time
+
+import pytest
+import requests
+
+import utils
+
+
+class SlowSession:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.timeouts = []
+
+    def get(self, **kwargs):
+        self.timeouts.append(kwargs['timeout'])
+        time.sleep(self.delay)
+        raise requests.exceptions.ReadTimeout('read timed out')
+
+
+class SlowBody(io.BytesIO):
+    def __init__(self, body, delay):
+        super().__init__(body)
+        self.delay = delay
+
+    def read(self, size=-1):
+        time.sleep(self.delay)
+        return super().read(min(size, 16))
+
+
+class StreamingSession:
+    def __init__(self, body, delay=0.0):
+        self.body = body
+        self.delay = delay
+        self.calls = []
+        self.responses = []
+
+    def get(self, **kwargs):
+        self.calls.append(kwargs)
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = SlowBody(self.body, self.delay)
+        self.responses.append(response)
+        return response
+
+
+class TestBudget:
+
+    @pytest.fixture
+    def budget_module(self):
+        import budget
+        return budget
+
+    def test_single_account_request_has_timeout(self, monkeypatch,
+                                                homework_module,
+                                                budget_module):
+        calls = []
+
+        def mock_response_get(*args, **kwargs):
+            calls.append(kwargs)
+            return utils.MockResponseGET()
+
+        monkeypatch.setattr(requests, 'get', mock_response_get)
+        homework_module.get_api_answer(0)
+        assert calls[0]['timeout'] == (
+            budget_module.CONNECT_TIMEOUT, budget_module.READ_TIMEOUT
+        )
+
+    def test_timeouts_capped_by_deadline(self, budget_module):
+        deadline = time.monotonic() + 1
+        connect, read = budget_module.request_timeout(deadline, 5, 30)
+        assert 0 < connect <= 1 and 0 < read <= 1
+        assert budget_module.request_timeout(None, 5, 30) == (5, 30)
+
+    def test_spent_budget_defers_poll(self, budget_module):
+        from accounts import Account, AccountPoller
+        from metrics import BUDGET_EXCEEDED
+
+        session = SlowSession()
+        poller = AccountPoller(utils.MockTelegramBot(), session)
+        sent = []
+        poller.send = lambda account, message: sent.append(message)
+        account = Account('token', '1')
+        deferred = BUDGET_EXCEEDED.value((budget_module.DEFERRED,))
+        delay = poller.poll(account, time.monotonic() - 1)
+        assert delay == poller.policy.min_interval
+        assert session.timeouts == []
+        assert sent == []
+        assert account.failures == 0
+        assert BUDGET_EXCEEDED.value((budget_module.DEFERRED,)) == (
+            deferred + 1
+        )
+
+    def test_timeout_after_deadline_is_cancelled(self, budget_module):
+        from accounts import Account, AccountPoller
+        from metrics import BUDGET_EXCEEDED
+
+        session = SlowSession(delay=0.05)
+        poller = AccountPoller(utils.MockTelegramBot(), session, budget=0.02)
+        poller.send = lambda account, message: None
+        account = Account('token', '1')
+        cancelled = BUDGET_EXCEEDED.value((budget_module.CANCELLED,))
+        poller.poll(account)
+        assert max(session.timeouts[0]) <= 0.02
+        assert account.failures == 1
+        assert BUDGET_EXCEEDED.value((budget_module.CANCELLED,)) == (
+            cancelled + 1
+        )
+
+    def test_slow_account_does_not_delay_others(self, monkeypatch,
+                                                budget_module):
+        import async_homework
+        from accounts import Account
+        from async_homework import AsyncAccountPoller
+        from metrics import BUDGET_EXCEEDED
+
+        class Poller(AsyncAccountPoller):
+            async def send(self, account, message):
+                pass
+
+        async def fake_request(session, timestamp, headers, *args):
+            if headers['Authorization'] == 'OAuth slow':
+                await asyncio.sleep(10)
+            return {'homeworks': [], 'current_date': timestamp}
+
+        async def run():
+            poller = Poller(utils.MockTelegramBot(), budget=0.05)
+            accounts = [Account('slow', '1'), Account('fast', '2')]
+            started = time.monotonic()
+            await asyncio.gather(*(
+                poller.poll(account) for account in accounts
+            ))
+            return accounts, time.monotonic() - started
+
+        monkeypatch.setattr(
+            async_homework, 'async_request_api_answer', fake_request
+        )
+        cancelled = BUDGET_EXCEEDED.value((budget_module.CANCELLED,))
+        (slow, fast), elapsed = asyncio.run(run())
+        assert elapsed < 1
+        assert slow.failures == 1
+        assert fast.failures == 0
+        assert BUDGET_EXCEEDED.value((budget_module.CANCELLED,)) == (
+            cancelled + 1
+        )
+
+    def test_body_is_streamed_within_budget(self, random_timestamp):
+        from accounts import Account, AccountPoller
+
+        body = json.dumps({
+            'homeworks': [{'homework_name': 'hw1', 'status': 'approved'}],
+            'current_date': random_timestamp,
+        }).encode()
+        session = StreamingSession(body)
+        poller = AccountPoller(utils.MockTelegramBot(), session, budget=5)
+        poller.send = lambda account, message, callback=None: None
+        account = Account('token', '1')
+        poller.poll(account)
+        assert session.calls[0]['stream'] is True
+        assert account.failures == 0
+        assert account.statuses == {'hw1': 'approved'}
+        assert account.timestamp == random_timestamp
+
+    def test_slow_body_is_cancelled_at_deadline(self, budget_module):
+        from accounts import Account, AccountPoller
+        from metrics import BUDGET_EXCEEDED
+
+        session = StreamingSession(b' ' * 4096, delay=0.01)
+        poller = AccountPoller(utils.MockTelegramBot(), session, budget=0.05)
+        poller.send = lambda account, message, callback=None: None
+        account = Account('token', '1')
+        cancelled = BUDGET_EXCEEDED.value((budget_module.CANCELLED,))
+        started = time.monotonic()
+        poller.poll(account)
+        assert time.monotonic() - started < 0.5
+        assert account.failures == 1
+        assert session.responses[0].raw.closed
+        assert BUDGET_EXCEEDED.value((budget_module.CANCELLED,)) == (
+            cancelled + 1
+        )
@@ -0,0 +1,114 @@
+import json
+from http import HTTPStatus
+
+import pytest
+
+import utils
+
+
+class MockSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.sent_headers = []
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        self.sent_headers.append(headers)
+        return self.responses.pop(0)
+
+
+def make_response(data, http_status=HTTPStatus.OK, headers=None):
+    response = utils.MockResponseGET(http_status=http_status)
+    response.content = json.dumps(data).encode()
+    response.headers = headers or {}
+    response.json_calls = 0
+
+    def mock_json():
+        response.json_calls += 1
+        return data
+
+    response.json = mock_json
+    return response
+
+
+class TestResponseCache:
+    DATA = {
+        'homeworks': [{'homework_name': 'hw123', 'status': 'approved'}],
+        'current_date': 1000198000,
+    }
+
+    @pytest.fixture
+    def cache(self):
+        from cache import ResponseCache
+        return ResponseCache(maxsize=2)
+
+    def test_same_body_is_not_decoded_again(self, monkeypatch, cache,
+                                            homework_module):
+        import decoding
+
+        bodies = []
+
+        def mock_loads(body):
+            bodies.append(body)
+            return json.loads(body)
+
+        monkeypatch.setattr(decoding, 'loads', mock_loads)
+        first, second = make_response(self.DATA), make_response(self.DATA)
+        session = MockSession([first, second])
+        headers = homework_module.make_headers('token')
+        for timestamp in (1, 2):
+            result = homework_module.request_api_answer(
+                timestamp, headers, session, cache
+            )
+            assert result == self.DATA
+        assert bodies == [first.content]
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+
+    def test_conditional_request_not_modified(self, cache, homework_module):
+        session = MockSession([
+            make_response(self.DATA, headers={'ETag': '"v1"'}),
+            make_response({}, http_status=HTTPStatus.NOT_MODIFIED),
+        ])
+        headers = homework_module.make_headers('token')
+        homework_module.request_api_answer(1, headers, session, cache)
+        result = homework_module.request_api_answer(1, headers, session, cache)
+        assert result == self.DATA
+        assert 'If-None-Match' not in session.sent_headers[0]
+        assert session.sent_headers[1]['If-None-Match'] == '"v1"'
+
+    def test_cache_is_bounded(self, cache):
+        for token in ('a', 'b', 'c'):
+            for _ in range(2):
+                cache.decode(token, token.encode(), {'ETag': token},
+                             lambda: {})
+        assert cache.stats()['entries'] == 2
+
+    def test_polls_with_advancing_current_date(self, cache):
+        from accounts import Account, AccountPoller
+
+        class AdvancingSession:
+            def __init__(self):
+                self.current_date = 1000198000
+                self.sent_headers = []
+
+            def get(self, headers=None, params=None, **kwargs):
+                self.sent_headers.append(headers)
+                self.current_date += 600
+                data = dict(
+                    TestResponseCache.DATA, current_date=self.current_date
+                )
+                return make_response(data, headers={'ETag': '"v1"'})
+
+        session = AdvancingSession()
+        poller = AccountPoller(utils.MockTelegramBot(), session, cache)
+        poller.send = lambda account, message, callback=None: None
+        account = Account('token', '1')
+        for _ in range(5):
+            poller.poll(account)
+        assert cache.stats() == {'hits': 4, 'misses': 1, 'entries': 1}
+        assert account.timestamp == session.current_date
+        assert 'If-None-Match' not in session.sent_headers[0]
+        assert all(
+            headers['If-None-Match'] == '"v1"'
+            for headers in session.sent_headers[1:]
+        )
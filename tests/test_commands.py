@@ -0,0 +1,131 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+import requests
+
+import utils
+
+
+class FakeUpdate:
+    def __init__(self, update_id, chat_id, text):
+        self.update_id = update_id
+        self.data = {
+            'update_id': update_id,
+            'message': {'chat': {'id': chat_id}, 'text': text},
+        }
+
+    def to_dict(self):
+        return self.data
+
+
+class UpdatesBot(utils.MockTelegramBot):
+    def __init__(self, updates):
+        super().__init__()
+        self.updates = updates
+        self.offsets = []
+        self.sent = []
+
+    def get_updates(self, offset=None, timeout=0):
+        self.offsets.append(offset)
+        updates, self.updates = self.updates, []
+        return updates
+
+    def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+
+class TestCommands:
+
+    @pytest.fixture
+    def commands_module(self):
+        import commands
+        return commands
+
+    @pytest.fixture
+    def handler(self, commands_module):
+        from accounts import Account
+
+        account = Account('token', 42)
+        account.statuses = {'hw2': 'reviewing', 'hw1': 'approved'}
+        history = commands_module.StatusHistory(size=2)
+        for when, status in enumerate(('reviewing', 'rejected', 'approved')):
+            history.record(account.key, 'hw1', status, when=when)
+        return commands_module.CommandHandler([account], history)
+
+    def test_status_from_cache(self, monkeypatch, handler):
+        def mock_get(*args, **kwargs):
+            raise AssertionError('API не должен вызываться')
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        assert handler.handle('42', '/status') == (
+            'hw1: approved\nhw2: reviewing'
+        )
+
+    def test_history_is_bounded(self, handler):
+        lines = handler.handle(42, '/history@homework_bot').split('\n')
+        assert [line.split(' ', 2)[2] for line in lines] == [
+            'hw1: rejected', 'hw1: approved'
+        ]
+
+    def test_unknown_chat_and_text(self, handler, commands_module):
+        assert handler.handle(7, '/status') is None
+        assert handler.handle(42, 'привет') is None
+        assert handler.handle(42, '/what') == commands_module.HELP
+
+    def test_poller_records_history(self, monkeypatch, random_timestamp,
+                                    commands_module):
+        from accounts import Account, AccountPoller
+
+        def mock_response_get(*args, **kwargs):
+            response = utils.MockResponseGET()
+            response.json = lambda: {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': random_timestamp,
+            }
+            return response
+
+        monkeypatch.setattr(requests, 'get', mock_response_get)
+        history = commands_module.StatusHistory()
+        poller = AccountPoller(utils.MockTelegramBot(), history=history)
+        account = Account('token', '1')
+        poller.poll(account)
+        assert [change[1:] for change in history.recent(account.key)] == [
+            ('hw', 'approved')
+        ]
+
+    def test_long_polling_answers(self, handler, commands_module):
+        bot = UpdatesBot([
+            FakeUpdate(10, 42, '/status'), FakeUpdate(11, 7, '/status')
+        ])
+        listener = commands_module.CommandListener(bot, handler)
+        listener.poll_once()
+        listener.poll_once()
+        assert bot.sent == [(42, 'hw1: approved\nhw2: reviewing')]
+        assert bot.offsets == [None, 12]
+
+    def test_webhook_replies_in_body(self, handler, commands_module):
+        server = commands_module.start_webhook_server(
+            handler, port=0, path='/hook', secret='s3cret'
+        )
+        url = 'http://127.0.0.1:{}/hook'.format(server.server_address[1])
+        update = FakeUpdate(1, 42, '/status').to_dict()
+        try:
+            request = urllib.request.Request(
+                url, data=json.dumps(update).encode(),
+                headers={commands_module.SECRET_HEADER: 's3cret'}
+            )
+            with urllib.request.urlopen(request, timeout=5) as response:
+                answer = json.loads(response.read())
+            forbidden = urllib.request.Request(
+                url, data=json.dumps(update).encode()
+            )
+            with pytest.raises(urllib.error.HTTPError):
+                urllib.request.urlopen(forbidden, timeout=5)
+        finally:
+            server.shutdown()
+        assert answer == {
+            'method': 'sendMessage', 'chat_id': 42,
+            'text': 'hw1: approved\nhw2: reviewing',
+        }
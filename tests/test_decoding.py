@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+
+class TestDecoding:
+    BODY = json.dumps({
+        'homeworks': [{
+            'id': 1,
+            'homework_name': 'hw',
+            'status': 'approved',
+            'reviewer_comment': 'Комментарий',
+            'lesson_name': 'Урок',
+        }],
+        'current_date': 1000198000,
+    }, ensure_ascii=False).encode()
+
+    @pytest.fixture
+    def decoding_module(self):
+        import decoding
+        return decoding
+
+    def test_decoders_agree(self, decoding_module):
+        for name in decoding_module.DECODERS:
+            if name == 'stream':
+                continue
+            decoder = decoding_module.get_decoder(name)
+            assert decoder(self.BODY) == json.loads(self.BODY)
+
+    def test_auto_prefers_orjson(self, decoding_module):
+        if decoding_module.orjson is None:
+            pytest.skip('orjson не установлен')
+        assert decoding_module.get_decoder('auto') is (
+            decoding_module.orjson.loads
+        )
+
+    def test_unknown_decoder(self, decoding_module):
+        with pytest.raises(ValueError):
+            decoding_module.get_decoder('simdjson')
+
+    def test_stream_keeps_only_used_fields(self, decoding_module):
+        answer = decoding_module.get_decoder('stream')(self.BODY)
+        assert answer == {
+            'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+            'current_date': 1000198000,
+        }
+
+    def test_stream_keeps_api_error(self, decoding_module):
+        body = b'{"code": "UnknownError", "error": {"error": "Wrong"}}'
+        answer = decoding_module.stream_loads(body)
+        assert answer == {'code': 'UnknownError', 'error': {'error': 'Wrong'}}
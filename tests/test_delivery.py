@@ -0,0 +1,185 @@
+import threading
+
+import pytest
+import telegram
+
+import utils
+
+
+class RecordingSender:
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.sent = []
+        self.done = threading.Event()
+
+    def __call__(self, bot, chat_id, text):
+        from exceptions import SendMessageError
+
+        if self.failures:
+            error = self.failures.pop(0)
+            raise SendMessageError(str(error)) from error
+        self.sent.append((chat_id, text))
+        self.done.set()
+
+
+class TestDeliveryQueue:
+
+    @pytest.fixture
+    def delivery_module(self):
+        import delivery
+        return delivery
+
+    def test_messages_to_one_chat_are_coalesced(self, delivery_module):
+        sender = RecordingSender()
+        queue = delivery_module.DeliveryQueue(
+            utils.MockTelegramBot(), workers=2, window=0.1, send=sender
+        ).start()
+        queue.submit('1', 'first')
+        queue.submit('1', 'second')
+        queue.submit('2', 'other')
+        queue.stop(timeout=5)
+        assert sorted(sender.sent) == [
+            ('1', 'first\n\nsecond'), ('2', 'other')
+        ]
+        assert len(queue) == 0
+
+    def test_retry_after_is_honored(self, delivery_module):
+        sender = RecordingSender(failures=[telegram.error.RetryAfter(0.05)])
+        queue = delivery_module.DeliveryQueue(
+            utils.MockTelegramBot(), workers=1, window=0, send=sender
+        ).start()
+        queue.submit('1', 'message')
+        assert sender.done.wait(5)
+        queue.stop(timeout=5)
+        assert sender.sent == [('1', 'message')]
+
+    def test_messages_dropped_after_max_attempts(self, delivery_module):
+        sender = RecordingSender(failures=[
+            telegram.error.RetryAfter(0), telegram.error.RetryAfter(0)
+        ])
+        queue = delivery_module.DeliveryQueue(
+            utils.MockTelegramBot(), workers=1, window=0, send=sender,
+            max_attempts=2
+        ).start()
+        queue.submit('1', 'message')
+        queue.stop(timeout=5)
+        assert sender.sent == []
+        assert len(queue) == 0
+
+    def test_token_bucket(self, delivery_module):
+        bucket = delivery_module.TokenBucket(rate=1, capacity=2, now=0)
+        for _ in range(2):
+            assert bucket.wait_time(0) == 0
+            bucket.consume()
+        assert bucket.wait_time(0) == pytest.approx(1)
+        assert bucket.wait_time(0.5) == pytest.approx(0.5)
+        assert bucket.is_full(10)
+
+    def test_coalesce_respects_message_limit(self, delivery_module):
+        text, rest = delivery_module.coalesce(['a' * 6, 'b' * 6], limit=10)
+        assert (text, rest) == ('a' * 6, ['b' * 6])
+
+    def test_poller_does_not_wait_for_delivery(self, monkeypatch,
+                                               random_timestamp,
+                                               delivery_module):
+        import requests
+
+        from accounts import Account, AccountPoller
+
+        def mock_response_get(*args, **kwargs):
+            response = utils.MockResponseGET()
+            response.json = lambda: {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': random_timestamp,
+            }
+            return response
+
+        monkeypatch.setattr(requests, 'get', mock_response_get)
+        queue = delivery_module.DeliveryQueue(
+            utils.MockTelegramBot(), send=RecordingSender()
+        )
+        poller = AccountPoller(None, delivery=queue)
+        account = Account('token', '1')
+        poller.poll(account)
+        assert len(queue) == 1
+        assert '"hw"' in queue.pending['1'][0][0]
+        assert account.statuses == {'hw': 'approved'}
+        assert poller.state.load(account.key) == (None, {})
+        queue.start().stop(timeout=5)
+        assert poller.state.load(account.key) == (
+            random_timestamp, {'hw': 'approved'}
+        )
+
+    def test_dropped_status_is_sent_again(self, monkeypatch,
+                                          random_timestamp, delivery_module):
+        import requests
+
+        from accounts import Account, AccountPoller
+
+        def mock_response_get(*args, **kwargs):
+            response = utils.MockResponseGET()
+            response.json = lambda: {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': random_timestamp,
+            }
+            return response
+
+        monkeypatch.setattr(requests, 'get', mock_response_get)
+        sender = RecordingSender(failures=[telegram.error.RetryAfter(0)])
+        queue = delivery_module.DeliveryQueue(
+            utils.MockTelegramBot(), workers=1, window=0, send=sender,
+            max_attempts=1
+        )
+        poller = AccountPoller(None, delivery=queue)
+        account = Account('token', '1', timestamp=100)
+        poller.poll(account)
+        queue.start().stop(timeout=5)
+        assert account.statuses == {}
+        assert account.timestamp == 100
+        assert poller.state.load(account.key) == (None, {})
+        queue = poller.delivery = delivery_module.DeliveryQueue(
+            utils.MockTelegramBot(), workers=1, window=0, send=sender
+        )
+        poller.poll(account)
+        queue.start().stop(timeout=5)
+        assert sender.sent == [('1', sender.sent[0][1])]
+        assert poller.state.load(account.key)[1] == {'hw': 'approved'}
+
+    def test_callback_gets_delivery_outcome(self, delivery_module):
+        outcomes = []
+        sender = RecordingSender(failures=[telegram.error.RetryAfter(0)])
+        queue = delivery_module.DeliveryQueue(
+            utils.MockTelegramBot(), workers=1, window=0, send=sender,
+            max_attempts=1
+        ).start()
+        queue.submit('1', 'lost', outcomes.append)
+        queue.stop(timeout=5)
+        queue = delivery_module.DeliveryQueue(
+            utils.MockTelegramBot(), workers=1, window=0, send=sender
+        ).start()
+        queue.submit('1', 'sent', outcomes.append)
+        queue.stop(timeout=5)
+        assert outcomes == [False, True]
+
+    def test_unexpected_error_releases_chat(self, monkeypatch,
+                                            delivery_module):
+        sender = RecordingSender()
+        calls = []
+
+        def send(bot, chat_id, text):
+            calls.append(text)
+            if len(calls) == 1:
+                raise RuntimeError('boom')
+            sender(bot, chat_id, text)
+
+        queue = delivery_module.DeliveryQueue(
+            utils.MockTelegramBot(), workers=1, window=0, send=send
+        )
+        monkeypatch.setattr(delivery_module, 'RETRY_DELAY', 0)
+        queue.start()
+        queue.submit('1', 'first')
+        assert sender.done.wait(5)
+        queue.submit('1', 'second')
+        queue.stop(timeout=5)
+        assert [text for _, text in sender.sent] == ['first', 'second']
+        assert not any(thread.is_alive() for thread in queue.threads)
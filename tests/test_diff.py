@@ -0,0 +1,59 @@
+import time
+
+import pytest
+import telegram
+
+import utils
+
+
+class TestDiffHomeworks:
+    HOMEWORKS = [
+        {'homework_name': 'hw3', 'status': 'reviewing'},
+        {'homework_name': 'hw2', 'status': 'approved'},
+        {'homework_name': 'hw1', 'status': 'rejected'},
+    ]
+
+    @pytest.fixture
+    def diff_module(self):
+        import diff
+        return diff
+
+    def test_all_new_homeworks_oldest_first(self, diff_module):
+        changed = diff_module.diff_homeworks({}, self.HOMEWORKS)
+        assert [hw['homework_name'] for hw in changed] == [
+            'hw1', 'hw2', 'hw3'
+        ]
+
+    def test_only_changed_homeworks(self, diff_module):
+        statuses = {'hw1': 'rejected', 'hw2': 'reviewing', 'hw3': 'reviewing'}
+        changed = diff_module.diff_homeworks(statuses, self.HOMEWORKS)
+        assert changed == [{'homework_name': 'hw2', 'status': 'approved'}]
+
+    def test_invalid_homework_is_reported(self, diff_module):
+        changed = diff_module.diff_homeworks({'hw1': 'approved'}, [{}])
+        assert changed == [{}]
+
+    def test_main_sends_every_changed_homework(self, monkeypatch,
+                                               random_timestamp,
+                                               homework_module):
+        response = {'homeworks': self.HOMEWORKS,
+                    'current_date': random_timestamp}
+        sent = []
+
+        def sleep_to_interrupt(secs):
+            raise utils.BreakInfiniteLoop('break')
+
+        monkeypatch.setattr(time, 'sleep', sleep_to_interrupt)
+        monkeypatch.setattr(telegram, 'Bot',
+                            lambda **kwargs: utils.MockTelegramBot())
+        monkeypatch.setattr(homework_module, 'get_api_answer',
+                            lambda timestamp: response)
+        monkeypatch.setattr(homework_module, 'send_message',
+                            lambda bot, message: sent.append(message))
+        monkeypatch.setattr(homework_module, 'PRACTICUM_TOKEN', 'sometoken')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_TOKEN', '1234:abc')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_CHAT_ID', '12345')
+        with pytest.raises(utils.BreakInfiniteLoop):
+            homework_module.main()
+        assert len(sent) == 3
+        assert '"hw1"' in sent[0] and '"hw3"' in sent[2]
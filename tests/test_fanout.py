@@ -0,0 +1,132 @@
+import threading
+import time
+
+import pytest
+
+
+class Stop(Exception):
+    pass
+
+
+class ConcurrencyProbe:
+    def __init__(self, delays=None, errors=(), result=lambda item: item * 10):
+        self.delays = delays or {}
+        self.result = result
+        self.errors = set(errors)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.calls = []
+
+    def __call__(self, item):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.calls.append(item)
+        try:
+            time.sleep(self.delays.get(item, 0.01))
+            if item in self.errors:
+                raise RuntimeError(f'boom {item}')
+            return self.result(item)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+class TestFanOut:
+
+    @pytest.fixture
+    def fanout_module(self):
+        import fanout
+        return fanout
+
+    def test_results_in_completion_order(self, fanout_module):
+        probe = ConcurrencyProbe({1: 0.15, 2: 0.01, 3: 0.08})
+        results = list(fanout_module.fan_out(probe, [1, 2, 3], workers=3))
+        assert [item for item, _, _ in results] == [2, 3, 1]
+        assert [result for _, result, _ in results] == [20, 30, 10]
+
+    def test_error_does_not_stop_others(self, fanout_module):
+        from metrics import EXCEPTIONS
+
+        before = EXCEPTIONS.value(('RuntimeError',))
+        probe = ConcurrencyProbe(errors={2})
+        results = {
+            item: (result, error)
+            for item, result, error in fanout_module.fan_out(
+                probe, range(5), workers=2
+            )
+        }
+        assert sorted(results) == [0, 1, 2, 3, 4]
+        assert results[2][0] is None
+        assert isinstance(results[2][1], RuntimeError)
+        assert results[4] == (40, None)
+        assert EXCEPTIONS.value(('RuntimeError',)) == before + 1
+
+    def test_max_in_flight(self, fanout_module):
+        probe = ConcurrencyProbe()
+        results = list(fanout_module.fan_out(
+            probe, range(20), workers=8, max_in_flight=3
+        ))
+        assert len(results) == 20
+        assert probe.peak <= 3
+
+    def test_items_are_read_lazily(self, fanout_module):
+        read = []
+
+        def items():
+            for item in range(10):
+                read.append(item)
+                yield item
+
+        results = fanout_module.fan_out(
+            ConcurrencyProbe(), items(), workers=2
+        )
+        next(results)
+        assert len(read) <= 3
+        results.close()
+
+
+class TestPoolScheduler:
+
+    def test_run_pool_polls_each_account_once_per_period(self):
+        from accounts import Account, PollScheduler
+
+        accounts = [Account(f'token{i}', str(i)) for i in range(6)]
+        probe = ConcurrencyProbe(
+            errors={accounts[1]}, result=lambda account: 60
+        )
+
+        def sleep(delay):
+            if len(probe.calls) == len(accounts):
+                raise Stop
+            time.sleep(min(delay, 0.01))
+
+        scheduler = PollScheduler(accounts, period=0.05, sleep=sleep)
+        with pytest.raises(Stop):
+            scheduler.run_pool(probe, workers=4, max_in_flight=2)
+        assert sorted(probe.calls, key=accounts.index) == accounts
+        assert probe.peak <= 2
+        assert len(scheduler) == len(accounts)
+        delays = {
+            account: due - scheduler.clock()
+            for due, _, account in scheduler.queue
+        }
+        assert delays[accounts[1]] < 1
+        assert delays[accounts[0]] > 50
+
+
+class TestPoolSize:
+
+    def test_pools_fit_requests_in_flight(self):
+        from accounts import pool_size
+        from homework import make_bot
+        from session import POOL_MAXSIZE, make_session
+
+        assert pool_size(1, 0) == POOL_MAXSIZE
+        assert pool_size(32, 0) == max(POOL_MAXSIZE, 32)
+        assert pool_size(128, 48) == max(POOL_MAXSIZE, 48)
+        session = make_session(pool_maxsize=pool_size(64, 0))
+        adapter = session.get_adapter('https://practicum.yandex.ru/')
+        assert adapter._pool_maxsize == 64
+        assert make_bot('1234:abcdefg', 64).request.con_pool_size == 64
@@ -0,0 +1,96 @@
+import json
+
+import pytest
+import requests
+
+import utils
+
+
+class TestLocales:
+
+    @pytest.fixture
+    def locales_module(self):
+        import locales
+        return locales
+
+    def test_russian_matches_parse_status(self, homework_module,
+                                          locales_module):
+        for status in homework_module.HOMEWORK_VERDICTS:
+            homework = {'homework_name': 'hw {1}', 'status': status}
+            assert locales_module.TEMPLATES.status(
+                'hw {1}', status, 'ru'
+            ) == homework_module.parse_status(homework)
+
+    def test_unknown_locale_falls_back(self, locales_module):
+        templates = locales_module.TEMPLATES
+        assert templates.status('hw', 'approved', 'xx') == (
+            templates.status('hw', 'approved', 'ru')
+        )
+        assert templates.error('boom', 'en') == 'Program failure: boom'
+
+    def test_locales_file(self, tmp_path, locales_module):
+        path = tmp_path / 'locales.json'
+        path.write_text(json.dumps({'de': {
+            'verdict': '{homework_name}: {verdict} ({homework_name})',
+            'verdicts': {'approved': 'Angenommen {ok}'},
+        }}), encoding='utf-8')
+        registry = locales_module.TemplateRegistry(
+            locales_module.load_locales(str(path)), default='ru'
+        )
+        assert registry.status('hw', 'approved', 'de') == (
+            'hw: Angenommen {ok} (hw)'
+        )
+        assert 'Работа взята на проверку' in registry.status(
+            'hw', 'reviewing', 'de'
+        )
+        assert registry.locales() == ['de', 'en', 'ru']
+
+    def test_default_locale_must_exist(self, locales_module):
+        with pytest.raises(ValueError):
+            locales_module.TemplateRegistry(default='xx')
+
+    def test_account_locale_from_file(self, tmp_path):
+        from accounts import load_accounts
+
+        path = tmp_path / 'accounts.json'
+        path.write_text(json.dumps([
+            {'practicum_token': 'a', 'chat_id': 1, 'locale': 'en'},
+            {'practicum_token': 'b', 'chat_id': 2},
+        ]))
+        assert [account.locale for account in load_accounts(path)] == [
+            'en', 'ru'
+        ]
+
+    def test_render_cache_is_bounded(self, locales_module):
+        info = locales_module.render_status.cache_info()
+        assert info.maxsize == locales_module.RENDER_CACHE_SIZE
+
+    def test_message_rendered_only_on_send(self, monkeypatch,
+                                           random_timestamp,
+                                           locales_module):
+        from accounts import Account, AccountPoller
+
+        def mock_response_get(*args, **kwargs):
+            response = utils.MockResponseGET()
+            response.json = lambda: {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': random_timestamp,
+            }
+            return response
+
+        monkeypatch.setattr(requests, 'get', mock_response_get)
+        bot = utils.MockTelegramBot()
+        poller = AccountPoller(bot)
+        account = Account('token', '1', locale='en')
+        render_status = locales_module.render_status
+        before = render_status.cache_info()
+        poller.poll(account)
+        after_send = render_status.cache_info()
+        poller.poll(account)
+        after_idle = render_status.cache_info()
+        assert after_send.hits + after_send.misses == (
+            before.hits + before.misses + 1
+        )
+        assert after_idle == after_send
+        assert bot.text == render_status('hw', 'approved', 'en')
+        assert bot.text.startswith('Homework "hw"')
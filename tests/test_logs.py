@@ -0,0 +1,77 @@
+import io
+import json
+import logging
+import logging.handlers
+import queue
+
+import pytest
+
+
+def make_record(message, level=logging.DEBUG, account=None):
+    record = logging.LogRecord(
+        'homework', level, __file__, 1, message, None, None, 'main'
+    )
+    if account is not None:
+        record.account = account
+    return record
+
+
+class TestLogs:
+
+    @pytest.fixture
+    def logs_module(self):
+        import logs
+        return logs
+
+    def test_sampling_is_per_account(self, logs_module):
+        sample = logs_module.SampleFilter(['repeat'], every=3)
+        passed = [
+            sample.filter(make_record('repeat', account=account))
+            for account in ('a', 'b') * 4
+        ]
+        assert passed == [True, True, False, False, False, False, True, True]
+
+    def test_sampling_keeps_other_records(self, logs_module):
+        sample = logs_module.SampleFilter(['repeat'], every=100)
+        sample.filter(make_record('repeat'))
+        assert sample.filter(make_record('repeat', level=logging.ERROR))
+        assert sample.filter(make_record('other'))
+
+    def test_json_formatter(self, logs_module):
+        line = logs_module.JsonFormatter().format(
+            make_record('Статус', level=logging.INFO, account='key')
+        )
+        entry = json.loads(line)
+        assert entry['message'] == 'Статус'
+        assert entry['level'] == 'INFO'
+        assert entry['account'] == 'key'
+        assert entry['function'] == 'main'
+
+    def test_listener_writes_batches(self, logs_module):
+        stream = io.StringIO()
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        flushes = []
+        handler.flush = lambda: flushes.append(stream.getvalue())
+        records = queue.SimpleQueue()
+        for index in range(5):
+            records.put(make_record(f'line {index}'))
+        listener = logs_module.LogListener(records, [handler], batch_size=3)
+        listener.start()
+        listener.stop()
+        assert stream.getvalue().splitlines() == [
+            f'line {index}' for index in range(5)
+        ]
+        assert len(flushes) == 2
+
+    def test_queue_mode_does_not_write_in_caller(self, logs_module):
+        stream = io.StringIO()
+        target = logging.StreamHandler(stream)
+        target.setFormatter(logging.Formatter('%(message)s'))
+        [handler] = logs_module.make_handlers(
+            [target], sampled=['repeat'], mode='queue', sample_every=2
+        )
+        assert isinstance(handler, logging.handlers.QueueHandler)
+        for _ in range(3):
+            handler.handle(make_record('repeat'))
+        assert handler.queue.qsize() == 2
@@ -0,0 +1,87 @@
+import time
+import urllib.request
+from http import HTTPStatus
+
+import pytest
+import requests
+
+import utils
+
+
+class TestMetrics:
+
+    @pytest.fixture
+    def metrics_module(self):
+        import metrics
+        return metrics
+
+    @pytest.fixture
+    def registry(self, metrics_module):
+        return metrics_module.Registry()
+
+    def test_counter_render(self, registry):
+        counter = registry.counter('test_total', 'Тест.', ('code',))
+        counter.inc((200,))
+        counter.inc((200,))
+        counter.inc((500,))
+        text = registry.render()
+        assert '# TYPE test_total counter' in text
+        assert 'test_total{code="200"} 2' in text
+        assert 'test_total{code="500"} 1' in text
+
+    def test_histogram_buckets_are_cumulative(self, registry):
+        histogram = registry.histogram(
+            'latency_seconds', 'Тест.', buckets=(0.1, 1.0)
+        )
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value)
+        text = registry.render()
+        assert 'latency_seconds_bucket{le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{le="1.0"} 2' in text
+        assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+        assert 'latency_seconds_count 3' in text
+
+    def test_request_api_answer_is_instrumented(self, monkeypatch,
+                                                metrics_module,
+                                                homework_module):
+        def mock_response_get(*args, **kwargs):
+            return utils.MockResponseGET(
+                http_status=HTTPStatus.INTERNAL_SERVER_ERROR
+            )
+
+        monkeypatch.setattr(requests, 'get', mock_response_get)
+        errors = metrics_module.HTTP_RESPONSES.value((500,))
+        polls = metrics_module.POLL_LATENCY.values[()].count if (
+            () in metrics_module.POLL_LATENCY.values) else 0
+        with pytest.raises(Exception):
+            homework_module.get_api_answer(0)
+        assert metrics_module.HTTP_RESPONSES.value((500,)) == errors + 1
+        assert metrics_module.POLL_LATENCY.values[()].count == polls + 1
+
+    def test_metrics_endpoint(self, registry, metrics_module):
+        registry.counter('endpoint_total', 'Тест.').inc()
+        server = metrics_module.start_metrics_server(
+            port=0, registry=registry
+        )
+        try:
+            url = 'http://{}:{}/metrics'.format(*server.server_address)
+            with urllib.request.urlopen(url) as response:
+                body = response.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert 'endpoint_total 1' in body
+
+    def test_server_is_disabled_without_port(self, metrics_module):
+        assert metrics_module.start_metrics_server(port=None) is None
+
+    def test_hot_path_overhead(self, registry):
+        counter = registry.counter('overhead_total', 'Тест.', ('type',))
+        histogram = registry.histogram('overhead_seconds', 'Тест.')
+        number = 10000
+        started = time.perf_counter()
+        for _ in range(number):
+            counter.inc(('ResponceError',))
+            histogram.observe(0.2)
+        per_call = (time.perf_counter() - started) / number
+        assert per_call < 50e-6
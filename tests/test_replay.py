@@ -0,0 +1,177 @@
+import asyncio
+import json
+
+import pytest
+import requests
+
+import utils
+
+
+class ScriptedSession:
+    def __init__(self, answers):
+        self.answers = list(answers)
+
+    def get(self, **kwargs):
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        response = utils.MockResponseGET()
+        response.json = lambda: answer
+        return response
+
+
+class TestReplay:
+    TOKENS = ('secrettoken1', 'secrettoken2')
+
+    @pytest.fixture
+    def record_path(self, tmp_path, random_timestamp):
+        return self.record(tmp_path, random_timestamp)
+
+    def record(self, tmp_path, random_timestamp, operator=None):
+        from accounts import Account, AccountPoller
+        from recording import Recorder
+
+        answer = {
+            'homeworks': [{'homework_name': 'hw1', 'status': 'reviewing'}],
+            'current_date': random_timestamp,
+        }
+        session = ScriptedSession([
+            answer, answer,
+            requests.ConnectionError('refused'),
+            requests.ConnectionError('refused'),
+        ])
+        path = tmp_path / 'record.jsonl'
+        now = iter(range(100))
+        recorder = Recorder(
+            open(path, 'w', encoding='utf-8'), clock=lambda: next(now)
+        )
+        poller = AccountPoller(
+            utils.MockTelegramBot(), session, recorder=recorder,
+            operator=operator
+        )
+        accounts = [
+            Account(token, str(index)) for index, token in enumerate(
+                self.TOKENS
+            )
+        ]
+        for _ in range(2):
+            for account in accounts:
+                poller.poll(account)
+        recorder.close()
+        return path
+
+    def test_record_is_redacted(self, record_path):
+        from recording import ANSWER, ERROR, MESSAGE
+
+        text = record_path.read_text(encoding='utf-8')
+        for token in self.TOKENS:
+            assert token not in text
+        records = [json.loads(line) for line in text.splitlines()]
+        assert [record['kind'] for record in records] == [
+            ANSWER, MESSAGE, ANSWER, MESSAGE, ERROR, MESSAGE, ERROR, MESSAGE
+        ]
+        assert 'OAuth <token>' in records[4]['message']
+        assert records[0]['statuses'] == {}
+        assert 'statuses' in records[2]
+        assert 'statuses' not in records[4]
+
+    def test_replay_matches_record(self, record_path):
+        import replay
+
+        report = replay.Replayer(speed=0).run(
+            replay.load_records(record_path)
+        )
+        assert report.polls == 4
+        assert report.messages == 4
+        assert report.mismatched() == []
+        assert replay.main([str(record_path), '--speed', '0']) == 0
+
+    def test_replay_reports_changed_notifications(self, record_path):
+        import replay
+
+        records = replay.load_records(record_path)
+        records[0]['answer']['homeworks'][0]['status'] = 'approved'
+        report = replay.Replayer(speed=0).run(records)
+        assert report.mismatched() == [records[0]['account']]
+        assert any(line.startswith('+') for line in report.diff())
+
+    def test_replay_copies_for_load(self, record_path):
+        import replay
+
+        report = replay.Replayer(speed=0, copies=3).run(
+            replay.load_records(record_path)
+        )
+        assert report.polls == 12
+        assert report.mismatched() == []
+
+    def test_replay_keeps_recorded_pace(self, record_path):
+        import replay
+
+        sleeps = []
+        replay.Replayer(speed=2, sleep=sleeps.append).run(
+            replay.load_records(record_path)
+        )
+        assert len(sleeps) == 3
+        assert sleeps[-1] == pytest.approx(3, abs=0.1)
+
+    def test_replay_sends_outage_to_operator(self, tmp_path,
+                                             random_timestamp):
+        import replay
+        from accounts import operator_account
+
+        path = self.record(
+            tmp_path, random_timestamp, operator_account('ops')
+        )
+        report = replay.Replayer(speed=0).run(replay.load_records(path))
+        assert report.messages == 3
+        assert report.mismatched() == []
+
+    def test_async_poller_records(self, monkeypatch, tmp_path,
+                                  random_timestamp):
+        import async_homework
+        import replay
+        from accounts import Account
+        from recording import ANSWER, ERROR, MESSAGE, Recorder
+
+        answers = [
+            {
+                'homeworks': [{'homework_name': 'hw1', 'status': status}],
+                'current_date': random_timestamp,
+            }
+            for status in ('reviewing', 'approved')
+        ]
+
+        async def fake_request(session, timestamp, headers, *args):
+            if not answers:
+                raise ConnectionError('refused')
+            return answers.pop(0)
+
+        async def fake_send(session, bot, chat_id, message):
+            pass
+
+        monkeypatch.setattr(
+            async_homework, 'async_request_api_answer', fake_request
+        )
+        monkeypatch.setattr(
+            async_homework, 'async_send_chat_message', fake_send
+        )
+        path = tmp_path / 'record.jsonl'
+        recorder = Recorder(open(path, 'w', encoding='utf-8'))
+        poller = async_homework.AsyncAccountPoller(
+            utils.MockTelegramBot(), recorder=recorder
+        )
+        account = Account(self.TOKENS[0], '1')
+
+        async def run():
+            for _ in range(3):
+                await poller.poll(account)
+
+        asyncio.run(run())
+        recorder.close()
+        records = replay.load_records(path)
+        assert [record['kind'] for record in records] == [
+            ANSWER, MESSAGE, ANSWER, MESSAGE, ERROR, MESSAGE
+        ]
+        assert self.TOKENS[0] not in path.read_text(encoding='utf-8')
+        report = replay.Replayer(speed=0).run(records)
+        assert report.mismatched() == []
@@ -0,0 +1,46 @@
+import pytest
+
+
+class TestAdaptivePolicy:
+
+    @pytest.fixture
+    def policy(self):
+        from scheduling import AdaptivePolicy
+        return AdaptivePolicy(
+            600, min_interval=60, max_interval=3600, review_interval=120,
+            idle_polls=3, factor=2, jitter=0.2, random=lambda: 0.5
+        )
+
+    @pytest.fixture
+    def activity(self):
+        from scheduling import PollActivity
+        return PollActivity()
+
+    def test_success_keeps_retry_period(self, policy, activity):
+        assert policy.after_success(activity, 1, {'hw': 'approved'}) == 600
+        assert policy.after_success(activity, 0, {'hw': 'approved'}) == 600
+
+    def test_reviewing_polls_faster(self, policy, activity):
+        statuses = {'hw1': 'approved', 'hw2': 'reviewing'}
+        assert policy.after_success(activity, 0, statuses) == 120
+
+    def test_idle_account_slows_down(self, policy, activity):
+        delays = [policy.after_success(activity, 0, {}) for _ in range(12)]
+        assert delays[:2] == [600, 600]
+        assert delays[2] == 1200
+        assert delays[5] == 2400
+        assert delays[-1] == 3600
+        assert policy.after_success(activity, 1, {}) == 600
+
+    def test_failures_back_off_exponentially(self, policy, activity):
+        delays = [policy.after_failure(activity) for _ in range(8)]
+        assert delays[:4] == [60, 120, 240, 480]
+        assert delays[-1] == 3600
+        policy.after_success(activity, 0, {})
+        assert activity.failures == 0
+
+    def test_jitter_stays_within_limits(self, policy, activity):
+        policy.random = lambda: 0.0
+        assert policy.after_failure(activity) == 60
+        policy.random = lambda: 1.0
+        assert policy.after_failure(activity) == pytest.approx(144)
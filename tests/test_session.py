@@ -0,0 +1,45 @@
+import pytest
+import requests
+
+import utils
+
+
+class TestSession:
+
+    @pytest.fixture
+    def session_module(self):
+        import session
+        yield session
+        session.close_session()
+
+    def test_make_session_pool_settings(self, session_module):
+        session = session_module.make_session(
+            pool_connections=2, pool_maxsize=7, retries=4
+        )
+        adapter = session.get_adapter('https://practicum.yandex.ru/')
+        assert adapter._pool_connections == 2
+        assert adapter._pool_maxsize == 7
+        assert adapter._pool_block is True
+        assert adapter.max_retries.connect == 4
+        assert adapter.max_retries.read == 0
+
+    def test_get_session_is_shared(self, session_module):
+        assert session_module.get_session() is session_module.get_session()
+
+    def test_request_api_answer_uses_session(self, monkeypatch,
+                                             random_timestamp,
+                                             homework_module):
+        def unexpected_get(*args, **kwargs):
+            raise AssertionError('requests.get не должен вызываться')
+
+        class MockSession:
+            def get(self, *args, **kwargs):
+                return utils.MockResponseGET(
+                    *args, random_timestamp=random_timestamp, **kwargs
+                )
+
+        monkeypatch.setattr(requests, 'get', unexpected_get)
+        result = homework_module.request_api_answer(
+            random_timestamp, homework_module.HEADERS, MockSession()
+        )
+        assert result['current_date'] == random_timestamp
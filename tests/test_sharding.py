@@ -0,0 +1,115 @@
+import json
+import sys
+import time
+
+import pytest
+
+
+def finish_shard(path, index, count):
+    from accounts import load_accounts
+    from sharding import shard_accounts
+
+    if shard_accounts(load_accounts(path), index, count):
+        time.sleep(0.5)
+
+
+def crash_first_shard(path, index, count):
+    if index == 0:
+        sys.exit(1)
+    time.sleep(30)
+
+
+class Stop(Exception):
+    pass
+
+
+class TestSharding:
+
+    @pytest.fixture
+    def sharding_module(self):
+        import sharding
+        return sharding
+
+    @pytest.fixture
+    def accounts(self):
+        from accounts import Account
+        return [Account(f'token{index}', str(index)) for index in range(2000)]
+
+    def test_shards_partition_accounts(self, sharding_module, accounts):
+        shards = [
+            sharding_module.shard_accounts(accounts, index, 4)
+            for index in range(4)
+        ]
+        owned = [account for shard in shards for account in shard]
+        assert sorted(owned, key=id) == sorted(accounts, key=id)
+        for shard in shards:
+            assert 0.15 < len(shard) / len(accounts) < 0.35
+
+    def test_new_shard_moves_about_one_nth(self, sharding_module, accounts):
+        before = sharding_module.HashRing(4)
+        after = sharding_module.HashRing(5)
+        moved = [
+            account for account in accounts
+            if before.shard_of(account.key) != after.shard_of(account.key)
+        ]
+        assert 0.1 < len(moved) / len(accounts) < 0.3
+        assert {after.shard_of(account.key) for account in moved} == {4}
+
+    def test_shard_index_is_validated(self, sharding_module, accounts):
+        with pytest.raises(ValueError):
+            sharding_module.shard_accounts(accounts, 2, 2)
+
+    def test_shard_index_from_dyno(self, monkeypatch, sharding_module):
+        monkeypatch.delenv('SHARD_INDEX', raising=False)
+        monkeypatch.setenv('DYNO', 'worker.3')
+        monkeypatch.setenv('SHARD_COUNT', '4')
+        assert sharding_module.default_shard() == (2, 4)
+
+    def test_shard_port(self, sharding_module):
+        assert sharding_module.shard_port('9100', 2) == 9102
+        assert sharding_module.shard_port(None, 2) is None
+
+    @pytest.fixture
+    def accounts_path(self, tmp_path):
+        path = tmp_path / 'accounts.json'
+        path.write_text(json.dumps([
+            {'practicum_token': 'token0', 'chat_id': 1},
+            {'practicum_token': 'token1', 'chat_id': 2},
+        ]))
+        return str(path)
+
+    def test_empty_shards_do_not_stop_others(self, sharding_module,
+                                             accounts_path):
+        started = time.monotonic()
+        assert sharding_module.launch(accounts_path, 4, finish_shard) == 0
+        assert time.monotonic() - started >= 0.5
+
+    def test_crashed_shard_stops_others(self, sharding_module,
+                                        accounts_path):
+        started = time.monotonic()
+        assert sharding_module.launch(
+            accounts_path, 3, crash_first_shard
+        ) == 1
+        assert time.monotonic() - started < 20
+
+    def test_empty_shard_idles(self, monkeypatch, accounts_path):
+        import accounts
+
+        owned = [
+            index for index in range(4)
+            if accounts.shard_accounts(
+                accounts.load_accounts(accounts_path), index, 4
+            )
+        ]
+        empty = min(set(range(4)) - set(owned))
+        sleeps = []
+
+        def sleep(delay):
+            sleeps.append(delay)
+            raise Stop
+
+        monkeypatch.setattr(time, 'sleep', sleep)
+        monkeypatch.setattr(accounts, 'TELEGRAM_TOKEN', '1234:abc')
+        with pytest.raises(Stop):
+            accounts.main(accounts_path, empty, 4)
+        assert sleeps == [accounts.RETRY_PERIOD]
@@ -0,0 +1,147 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+import requests
+import telegram
+
+import utils
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestStartup:
+
+    @pytest.mark.parametrize('module', ['homework', 'accounts'])
+    def test_import_skips_telegram_and_requests(self, module):
+        result = subprocess.run(
+            [sys.executable, '-c',
+             f'import sys, {module}; '
+             'print(sorted({"telegram", "requests", "http.server"} '
+             '& set(sys.modules)))'],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        assert result.stdout.strip() == '[]'
+
+    @pytest.fixture
+    def once(self, monkeypatch, homework_module):
+        from state import MemoryStateBackend
+
+        state = MemoryStateBackend()
+        state.close = lambda: None
+        bots = []
+
+        def mock_bot(**kwargs):
+            bots.append(utils.MockTelegramBot())
+            return bots[-1]
+
+        monkeypatch.setattr(telegram, 'Bot', mock_bot)
+        monkeypatch.setattr(homework_module, 'PRACTICUM_TOKEN', 'sometoken')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_TOKEN', '1234:abc')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_CHAT_ID', '12345')
+        monkeypatch.setattr(
+            homework_module, 'open_state_backend', lambda: state
+        )
+        return state, bots
+
+    def test_once_without_changes_creates_no_bot(self, monkeypatch, once,
+                                                 random_timestamp,
+                                                 homework_module):
+        state, bots = once
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer',
+            lambda timestamp: {'homeworks': [],
+                               'current_date': random_timestamp}
+        )
+        assert homework_module.run_once() == homework_module.EXIT_NO_CHANGES
+        assert bots == []
+        account = homework_module.account_key(homework_module.PRACTICUM_TOKEN)
+        assert state.load(account)[0] == random_timestamp
+
+    def test_once_sends_changes(self, monkeypatch, once, random_timestamp,
+                                homework_module):
+        state, bots = once
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer',
+            lambda timestamp: {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': random_timestamp,
+            }
+        )
+        assert homework_module.run_once() == (
+            homework_module.EXIT_CHANGES_SENT
+        )
+        assert len(bots) == 1 and bots[0].is_message_sent
+
+    def test_once_error_exit_code(self, monkeypatch, once, homework_module):
+        def mock_get_api_answer(timestamp):
+            raise ConnectionError('boom')
+
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer', mock_get_api_answer
+        )
+        monkeypatch.setattr(
+            homework_module, 'send_message', lambda bot, message: None
+        )
+        assert homework_module.run_once() == homework_module.EXIT_ERROR
+
+    def test_once_repeated_error_is_not_resent(self, monkeypatch, once,
+                                               homework_module):
+        sent = []
+
+        def mock_get_api_answer(timestamp):
+            raise ConnectionError('boom')
+
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer', mock_get_api_answer
+        )
+        monkeypatch.setattr(
+            homework_module, 'send_message',
+            lambda bot, message: sent.append(message)
+        )
+        for _ in range(3):
+            assert homework_module.run_once() == homework_module.EXIT_ERROR
+        assert len(sent) == 1
+
+    def test_accounts_once_batch(self, monkeypatch, tmp_path, once,
+                                 random_timestamp):
+        import accounts
+        from homework import EXIT_CHANGES_SENT, EXIT_ERROR
+
+        state, bots = once
+        monkeypatch.setattr(accounts, 'open_state_backend', lambda: state)
+        monkeypatch.setattr(accounts, 'get_session', lambda *args: None)
+        path = tmp_path / 'accounts.json'
+        path.write_text(json.dumps([
+            {'practicum_token': 'good', 'chat_id': 1},
+            {'practicum_token': 'bad', 'chat_id': 2},
+        ]))
+
+        def mock_response_get(*args, headers=None, **kwargs):
+            if headers['Authorization'] == 'OAuth bad':
+                raise requests.ConnectionError('refused')
+            response = utils.MockResponseGET()
+            response.json = lambda: {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': random_timestamp,
+            }
+            return response
+
+        monkeypatch.setattr(requests, 'get', mock_response_get)
+        monkeypatch.setattr(accounts, 'TELEGRAM_TOKEN', '1234:abc')
+        sent = []
+        monkeypatch.setattr(
+            accounts, 'send_chat_message',
+            lambda bot, chat_id, message: sent.append((chat_id, message))
+        )
+        assert accounts.run_once(str(path)) == EXIT_ERROR
+        assert accounts.run_once(str(path)) == EXIT_ERROR
+        assert [chat_id for chat_id, _ in sent] == ['1', '2']
+        assert state.load(accounts.account_key('good'))[0] == (
+            random_timestamp
+        )
+        assert accounts.exit_code(
+            {'changed': 1, 'unchanged': 0, 'failed': 0, 'deferred': 0}
+        ) == EXIT_CHANGES_SENT
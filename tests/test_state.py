@@ -0,0 +1,68 @@
+import pytest
+
+
+class TestStateBackend:
+
+    @pytest.fixture
+    def state_module(self):
+        import state
+        return state
+
+    def test_sqlite_survives_restart(self, tmp_path, state_module):
+        path = str(tmp_path / 'state.sqlite3')
+        backend = state_module.SqliteStateBackend(path, interval=60)
+        backend.save_cursor('account', 1000198000)
+        backend.save_status('account', 'hw123', 'reviewing')
+        backend.save_status('account', 'hw123', 'approved')
+        backend.close()
+
+        restarted = state_module.SqliteStateBackend(path, interval=60)
+        try:
+            assert restarted.load('account') == (
+                1000198000, {'hw123': 'approved'}
+            )
+            assert restarted.load('other') == (None, {})
+        finally:
+            restarted.close()
+
+    def test_sqlite_writes_are_batched(self, tmp_path, state_module):
+        path = str(tmp_path / 'state.sqlite3')
+        backend = state_module.SqliteStateBackend(path, interval=60)
+        try:
+            backend.save_cursor('account', 1)
+            assert backend.pending_cursors == {'account': 1}
+            backend.flush()
+            assert backend.pending_cursors == {}
+        finally:
+            backend.close()
+
+    def test_sqlite_keeps_error_windows(self, tmp_path, state_module):
+        path = str(tmp_path / 'state.sqlite3')
+        backend = state_module.SqliteStateBackend(path, interval=60)
+        backend.save_error('first', 'ConnectionError', 'chat', 1.0, 2.0, 3, 2)
+        backend.save_error('second', 'ValueError', None, 1.0, 1.0, 1, 0)
+        backend.delete_error('second')
+        backend.close()
+
+        restarted = state_module.SqliteStateBackend(path, interval=60)
+        try:
+            assert restarted.load_errors() == [
+                ('first', 'ConnectionError', 'chat', 1.0, 2.0, 3, 2)
+            ]
+        finally:
+            restarted.close()
+
+    def test_memory_backend(self, state_module):
+        backend = state_module.open_state_backend('memory')
+        backend.save_cursor('account', 1)
+        backend.save_status('account', 'hw123', 'approved')
+        assert backend.load('account') == (1, {'hw123': 'approved'})
+
+    def test_unknown_backend(self, state_module):
+        with pytest.raises(ValueError):
+            state_module.open_state_backend('redis')
+
+    def test_account_key_hides_token(self, state_module):
+        key = state_module.account_key('secret-token')
+        assert 'secret' not in key
+        assert key == state_module.account_key('secret-token')
@@ -0,0 +1,91 @@
+import os
+import time
+
+import pytest
+import requests
+
+import utils
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTracing:
+
+    @pytest.fixture
+    def tracing_module(self):
+        import tracing
+        return tracing
+
+    def test_disabled_span_is_shared(self, tracing_module):
+        tracer = tracing_module.Tracer(enabled=False)
+        assert tracer.span('network') is tracing_module.NULL_SPAN
+        with tracer.span('network'):
+            pass
+        assert tracer.folded() == []
+
+    def test_folded_stacks_hold_own_time(self, tracing_module):
+        clock = FakeClock()
+        tracer = tracing_module.Tracer(enabled=True, clock=clock)
+        with tracer.span('get_api_answer'):
+            clock.now += 0.001
+            with tracer.span('network'):
+                clock.now += 0.003
+            with tracer.span('json'):
+                clock.now += 0.002
+        assert tracer.folded() == [
+            'get_api_answer 1000',
+            'get_api_answer;json 2000',
+            'get_api_answer;network 3000',
+        ]
+
+    def test_poll_stages_are_traced(self, monkeypatch, random_timestamp,
+                                    tracing_module):
+        from accounts import Account, AccountPoller
+        from metrics import STAGE_LATENCY
+
+        def mock_response_get(*args, **kwargs):
+            response = utils.MockResponseGET()
+            response.json = lambda: {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': random_timestamp,
+            }
+            return response
+
+        monkeypatch.setattr(requests, 'get', mock_response_get)
+        monkeypatch.setattr(tracing_module.TRACER, 'enabled', True)
+        tracing_module.TRACER.totals.clear()
+        poller = AccountPoller(utils.MockTelegramBot())
+        poller.poll(Account('token', '1'))
+        paths = [line.rsplit(' ', 1)[0]
+                 for line in tracing_module.TRACER.folded()]
+        tracing_module.TRACER.totals.clear()
+        for path in ('get_api_answer;network', 'get_api_answer;json',
+                     'check_response', 'parse_status', 'send_message'):
+            assert path in paths
+        assert STAGE_LATENCY.values[('network',)].count > 0
+
+    @pytest.mark.parametrize('kind, suffix', [
+        ('sampling', '.folded'), ('cprofile', '.prof'),
+    ])
+    def test_toggle_writes_profile(self, tmp_path, tracing_module,
+                                   kind, suffix):
+        tracer = tracing_module.Tracer(enabled=False)
+        toggle = tracing_module.ProfilerToggle(kind, str(tmp_path), tracer)
+        assert toggle.toggle() is None
+        assert tracer.enabled
+        with tracer.span('busy'):
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+        path = toggle.toggle()
+        assert path.endswith(suffix) and os.path.getsize(path) > 0
+        assert not tracer.enabled
+        spans = path[:-len(suffix)] + '.spans.folded'
+        with open(spans, encoding='utf-8') as file:
+            assert file.read().startswith('busy ')
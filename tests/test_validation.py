@@ -0,0 +1,57 @@
+import pytest
+
+
+def legacy_validate(homework_module, response):
+    homeworks = homework_module.check_response(response)
+    for homework in reversed(homeworks):
+        homework_module.parse_status(homework)
+    return response['current_date']
+
+
+class TestValidation:
+    INVALID_RESPONSES = [
+        [],
+        {},
+        {'homeworks': {}},
+        {'homeworks': [{'status': 'approved'}]},
+        {'homeworks': [{'homework_name': 'hw'}]},
+        {'homeworks': ['hw']},
+        {'homeworks': [{'homework_name': 'hw', 'status': 'unknown'}]},
+        {'homeworks': [
+            {'homework_name': 'hw2', 'status': 'unknown'},
+            {'homework_name': 'hw1'},
+        ]},
+        {'homeworks': []},
+    ]
+
+    @pytest.fixture
+    def validation_module(self):
+        import validation
+        return validation
+
+    @pytest.mark.parametrize('response', INVALID_RESPONSES)
+    def test_same_errors_as_check_response(self, response, homework_module,
+                                           validation_module):
+        with pytest.raises(Exception) as expected:
+            legacy_validate(homework_module, response)
+        with pytest.raises(type(expected.value)) as actual:
+            validation_module.validate_response(response, {})
+        assert str(actual.value) == str(expected.value)
+
+    def test_changed_are_oldest_first(self, homework_module,
+                                      validation_module):
+        homeworks = [
+            {'homework_name': 'hw2', 'status': 'reviewing'},
+            {'homework_name': 'hw1', 'status': 'approved'},
+        ]
+        result = validation_module.validate_response(
+            {'homeworks': homeworks, 'current_date': 1}, {'hw2': 'reviewing'}
+        )
+        assert result.current_date == 1
+        assert result.changed == [('hw1', 'approved')]
+        result = validation_module.validate_response(
+            {'homeworks': homeworks, 'current_date': 1}, {}
+        )
+        assert result.changed == [
+            ('hw1', 'approved'), ('hw2', 'reviewing')
+        ]
@@ -0,0 +1,252 @@
+"""Замеры стадий цикла опроса и профилировщик, включаемый сигналом.
+
+Стадии размечаются span(name): при выключенной трассировке возвращается
+общий пустой контекст, и цена разметки — вызов функции. Включённая
+трассировка пишет длительности в homework_stage_latency_seconds и
+копит собственное время стадий по стекам в свёрнутом формате
+flamegraph ("get_api_answer;network 1234", микросекунды).
+
+Сигнал PROFILE_SIGNAL (SIGUSR1) включает профилировщик и трассировку,
+повторный сигнал выключает их и сохраняет результат в PROFILE_DIR.
+Стек стадий хранится в потоке, поэтому размечается синхронный код.
+"""
+import cProfile
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from metrics import STAGE_LATENCY
+
+TRACE = os.getenv('TRACE', '') not in ('', '0')
+PROFILER = os.getenv('PROFILER', 'sampling')
+PROFILE_DIR = os.getenv('PROFILE_DIR', '.')
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', 0.005))
+PROFILE_SIGNAL = 'SIGUSR1'
+PROFILE_STARTED = 'Профилирование включено ({kind})'
+PROFILE_SAVED = 'Профиль сохранён: {path}'
+PROFILER_ERROR = 'Неизвестный профилировщик PROFILER={kind}'
+
+logger = logging.getLogger(__name__)
+
+
+class NullSpan:
+    """Пустой контекст для выключенной трассировки."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        """Ничего не замеряем."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Исключения не подавляем."""
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    """Замер одной стадии с учётом вложенных стадий."""
+
+    __slots__ = ('tracer', 'name', 'started', 'children')
+
+    def __init__(self, tracer, name):
+        """Запоминаем трассировщик и имя стадии."""
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        """Кладём стадию на стек потока и засекаем время."""
+        self.children = 0.0
+        self.tracer.stack().append(self)
+        self.started = self.tracer.clock()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Снимаем стадию со стека и отдаём замер трассировщику."""
+        elapsed = self.tracer.clock() - self.started
+        stack = self.tracer.stack()
+        path = ';'.join(span.name for span in stack)
+        stack.pop()
+        if stack:
+            stack[-1].children += elapsed
+        self.tracer.record(path, self.name, elapsed, elapsed - self.children)
+        return False
+
+
+class Tracer:
+    """Трассировщик стадий: гистограмма и свёрнутые стеки."""
+
+    def __init__(self, enabled=TRACE, clock=time.perf_counter):
+        """Создаём трассировщик; enabled можно менять на ходу."""
+        self.enabled = enabled
+        self.clock = clock
+        self.local = threading.local()
+        self.totals = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def span(self, name):
+        """Контекст замера стадии name."""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name)
+
+    def stack(self):
+        """Стек открытых стадий текущего потока."""
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def record(self, path, name, elapsed, own):
+        """Учитываем замер: полное время в метрику, собственное — в стек."""
+        STAGE_LATENCY.observe(elapsed, (name,))
+        with self.lock:
+            self.totals[path] += own
+
+    def folded(self):
+        """Строки свёрнутого формата flamegraph, вес — микросекунды."""
+        with self.lock:
+            totals = sorted(self.totals.items())
+        return [
+            f'{path} {round(own * 1e6)}' for path, own in totals
+            if own > 0
+        ]
+
+    def dump(self, path):
+        """Сохраняем свёрнутые стеки стадий и начинаем копить заново."""
+        lines = self.folded()
+        with self.lock:
+            self.totals.clear()
+        write_lines(path, lines)
+
+
+TRACER = Tracer()
+span = TRACER.span
+
+
+def write_lines(path, lines):
+    """Пишем строки в файл, по одной на строку."""
+    with open(path, 'w', encoding='utf-8') as file:
+        file.writelines(line + '\n' for line in lines)
+
+
+def frame_stack(frame):
+    """Стек кадров в свёрнутом формате: от корня к листу."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(
+            f'{os.path.basename(code.co_filename)}:{code.co_name}'
+        )
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SamplingProfiler:
+    """Семплирующий профилировщик стека одного потока."""
+
+    suffix = '.folded'
+
+    def __init__(self, interval=PROFILE_INTERVAL, thread_id=None):
+        """По умолчанию семплируем главный поток."""
+        self.interval = interval
+        self.thread_id = (
+            threading.main_thread().ident if thread_id is None else thread_id
+        )
+        self.counts = Counter()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Запускаем поток семплирования."""
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """Раз в interval секунд снимаем стек потока."""
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.counts[frame_stack(frame)] += 1
+
+    def stop(self, path):
+        """Останавливаем семплирование и пишем свёрнутые стеки."""
+        self.stopped.set()
+        self.thread.join()
+        write_lines(path, [
+            f'{stack} {count}' for stack, count in sorted(self.counts.items())
+        ])
+
+
+class CProfileProfiler:
+    """Детерминированный профилировщик cProfile для pstats и snakeviz."""
+
+    suffix = '.prof'
+
+    def start(self):
+        """Включаем профилирование текущего потока."""
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self, path):
+        """Выключаем профилирование и сохраняем статистику."""
+        self.profile.disable()
+        self.profile.dump_stats(path)
+
+
+PROFILERS = {'sampling': SamplingProfiler, 'cprofile': CProfileProfiler}
+
+
+class ProfilerToggle:
+    """Переключатель профилировщика и трассировки по сигналу."""
+
+    def __init__(self, kind=PROFILER, directory=PROFILE_DIR, tracer=TRACER):
+        """Проверяем тип профилировщика."""
+        if kind not in PROFILERS:
+            raise ValueError(PROFILER_ERROR.format(kind=kind))
+        self.kind = kind
+        self.directory = directory
+        self.tracer = tracer
+        self.profiler = None
+        self.traced = tracer.enabled
+
+    def toggle(self, signum=None, frame=None):
+        """Включаем профилирование или завершаем его и сохраняем файлы.
+
+        Возвращает путь к профилю при выключении.
+        """
+        if self.profiler is None:
+            self.traced = self.tracer.enabled
+            self.tracer.enabled = True
+            self.profiler = PROFILERS[self.kind]()
+            self.profiler.start()
+            logger.info(PROFILE_STARTED.format(kind=self.kind))
+            return None
+        stem = os.path.join(
+            self.directory, f'profile-{os.getpid()}-{int(time.time())}'
+        )
+        path = stem + self.profiler.suffix
+        self.profiler.stop(path)
+        self.profiler = None
+        self.tracer.enabled = self.traced
+        self.tracer.dump(stem + '.spans.folded')
+        logger.info(PROFILE_SAVED.format(path=path))
+        return path
+
+
+def install_profiler(signal_name=PROFILE_SIGNAL, kind=PROFILER):
+    """Назначаем переключение профилировщика на сигнал.
+
+    На платформах без сигнала (Windows) ничего не делаем.
+    """
+    if not hasattr(signal, signal_name):
+        return None
+    toggle = ProfilerToggle(kind)
+    signal.signal(getattr(signal, signal_name), toggle.toggle)
+    return toggle
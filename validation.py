@@ -0,0 +1,60 @@
+"""Однопроходная проверка ответа homework_statuses."""
+from collections import namedtuple
+
+from homework import (
+    CHECK_STATUS_UNDEFINED,
+    HOMEWORK_VERDICTS,
+    KEY_IN_DICT_HOMEWORK_NOT_FOUND,
+    check_response,
+)
+
+ValidatedResponse = namedtuple(
+    'ValidatedResponse', ('homeworks', 'current_date', 'changed')
+)
+HOMEWORK_KEYS = ('homework_name', 'status')
+
+
+def missing_key_error(homework):
+    """Ошибка KeyError из parse_status для работы без обязательного ключа."""
+    for key in HOMEWORK_KEYS:
+        if key not in homework:
+            return KeyError(KEY_IN_DICT_HOMEWORK_NOT_FOUND.format(key=key))
+    return None
+
+
+def compile_validator(verdicts=HOMEWORK_VERDICTS):
+    """Собираем функцию проверки ответа API под известные статусы.
+
+    validate(response, statuses) проверяет то же, что check_response и
+    parse_status для каждой работы, с теми же исключениями и текстами, и
+    в том же проходе сравнивает статусы с индексом statuses
+    {homework_name: status}. changed — пары (homework_name, status)
+    изменившихся работ от старых к новым; при нескольких ошибках
+    сообщается ошибка самой старой работы, как при последовательной
+    отправке. Статус, совпадающий с уже отправленным, заведомо известен,
+    поэтому проверяется только статус изменившихся работ.
+    """
+    known = frozenset(verdicts)
+
+    def validate(response, statuses):
+        homeworks = check_response(response)
+        changed = []
+        sent = statuses.get
+        for homework in reversed(homeworks):
+            try:
+                name = homework['homework_name']
+                status = homework['status']
+            except (KeyError, TypeError):
+                raise missing_key_error(homework) from None
+            if sent(name) != status:
+                if status not in known:
+                    raise ValueError(
+                        CHECK_STATUS_UNDEFINED.format(status=status)
+                    )
+                changed.append((name, status))
+        return ValidatedResponse(homeworks, response['current_date'], changed)
+
+    return validate
+
+
+validate_response = compile_validator()